@@ -0,0 +1,72 @@
+import json
+import random
+import time
+from ethio_agri_advisor.agents.privacy_auditor import AUDIT_TIERS, PrivacyAuditorAgent
+from ethio_agri_advisor.config import settings
+from ethio_agri_advisor.core.llm_registry import LocalFakeChatModel
+from ethio_agri_advisor.tools.guideline_index import split_passages
+from typing import List
+
+INJECTIONS = [
+    "Contact the farmer Abebe on +251911223344 for seed.",
+    "This variety is guaranteed to double your yield.",
+    "Traditional practices are backward and should be abandoned.",
+    "Your harvest will surely be twice as big this year.",
+    "Farmers who keep old customs are holding the village back.",
+]
+
+class AuditEvaluator:
+    """
+    Audits synthetic plans assembled from the bundled guideline passages, some with an
+    injected leak, over-promise or insensitive sentence, and reports the share of audits
+    settled at each tier and their mean latency. The LLM auditor is the local fake model
+    with a fixed latency standing in for a hosted model.
+    """
+
+    def __init__(self, n_plans: int = 200, injected_share: float = 0.3, llm_latency_seconds: float = 0.05, seed: int = 0):
+        self.n_plans = n_plans
+        self.injected_share = injected_share
+        self.llm_latency_seconds = llm_latency_seconds
+        self.seed = seed
+
+    def _plans(self) -> List[str]:
+        rng = random.Random(self.seed)
+        with open(settings.GUIDELINES_CORPUS_FILE, "r", encoding="utf-8") as f:
+            sentences = [s for line in f if line.strip()
+                         for s in split_passages(json.loads(line)["content"], max_words=1)]
+        plans = []
+        for _ in range(self.n_plans):
+            plan = rng.sample(sentences, 4)
+            if rng.random() < self.injected_share:
+                plan.insert(rng.randrange(len(plan) + 1), rng.choice(INJECTIONS))
+            plans.append(" ".join(plan))
+        return plans
+
+    def run_benchmark(self):
+        print("--- Tiered Audit Benchmark ---")
+        auditor = PrivacyAuditorAgent(model_name="fake", use_cache=False)
+        auditor.llm = LocalFakeChatModel(response="VERDICT: APPROVE", latency_seconds=self.llm_latency_seconds)
+        auditor.classifier  # train outside the timed loop
+
+        seconds = {tier: 0.0 for tier in AUDIT_TIERS}
+        rejected = {tier: 0 for tier in AUDIT_TIERS}
+        start_all = time.perf_counter()
+        for plan in self._plans():
+            start = time.perf_counter()
+            verdict = auditor.audit(plan)
+            seconds[verdict["tier"]] += time.perf_counter() - start
+            rejected[verdict["tier"]] += not verdict["is_approved"]
+        total = time.perf_counter() - start_all
+
+        stats = auditor.audit_stats()
+        print(f"{'Tier':<10} | {'Audits':<6} | {'Share':<6} | {'Rejected':<8} | {'Mean (ms)':<9}")
+        print("-" * 50)
+        for tier in AUDIT_TIERS:
+            mean_ms = seconds[tier] / stats[tier] * 1e3 if stats[tier] else 0.0
+            print(f"{tier:<10} | {stats[tier]:<6} | {stats[tier + '_share']:<6.0%} | {rejected[tier]:<8} | {mean_ms:<9.3f}")
+        all_llm = self.n_plans * self.llm_latency_seconds
+        print(f"\nTotal audit time: {total:.2f}s (an LLM call for every plan: ~{all_llm:.2f}s)")
+
+if __name__ == "__main__":
+    evaluator = AuditEvaluator()
+    evaluator.run_benchmark()
@@ -0,0 +1,55 @@
+import contextlib
+import io
+import time
+from typing import List
+from ethio_agri_advisor.config import settings
+from stubs import StubSearchTool, StubWeatherServer
+
+class BatchThroughputEvaluator:
+    """
+    Measures AgriAdvisorGraph.run_batch throughput (farms/min) against concurrency,
+    using the local fake LLM and stub weather/search services.
+    """
+
+    def __init__(self, num_farms: int = 48, concurrency_levels: List[int] = [1, 4, 8, 16],
+                 llm_latency: float = 0.05, service_latency: float = 0.02):
+        self.num_farms = num_farms
+        self.concurrency_levels = concurrency_levels
+        self.llm_latency = llm_latency
+        self.service_latency = service_latency
+
+    def _build_graph(self, weather_url: str):
+        from ethio_agri_advisor.core.cache import MemoryCache
+        from ethio_agri_advisor.core.graph import AgriAdvisorGraph
+        from ethio_agri_advisor.core.weather_service import WeatherService
+
+        # Distinct prompts per farm would miss anyway; disabling the cache keeps runs comparable.
+        settings.DEFAULT_MODEL_NAME = "fake"
+        settings.FAKE_LLM_LATENCY_SECONDS = self.llm_latency
+        settings.LLM_CACHE_ENABLED = False
+        settings.LLM_MAX_CONCURRENCY = max(self.concurrency_levels) * 4
+        settings.TAVILY_API_KEY = settings.TAVILY_API_KEY or "stub"
+        graph = AgriAdvisorGraph()
+        graph.crop_planner.search_tool = StubSearchTool(delay=self.service_latency)
+        graph.crop_planner.weather_service = WeatherService(cache=MemoryCache(), base_url=weather_url)
+        return graph
+
+    def run_benchmark(self):
+        print("--- Batch Throughput Benchmark: Farms/min vs. Concurrency (stub LLM) ---")
+        print(f"{'Concurrency':<12} | {'Farms':<6} | {'Failures':<8} | {'Wall (s)':<10} | {'Farms/min':<10}")
+        print("-" * 58)
+        with StubWeatherServer(delay=self.service_latency) as weather:
+            graph = self._build_graph(weather.url)
+            inputs = [f"Farmer {i} in East Gojjam, Amhara plants teff on 2 hectares." for i in range(self.num_farms)]
+            for concurrency in self.concurrency_levels:
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results = graph.run_batch(inputs, max_concurrency=concurrency)
+                elapsed = time.perf_counter() - start
+                failures = sum(1 for r in results if not r["ok"])
+                print(f"{concurrency:<12} | {len(inputs):<6} | {failures:<8} | {elapsed:<10.2f} | {len(inputs) / elapsed * 60:<10.0f}")
+        print(f"\nNote: fake LLM latency {self.llm_latency}s per call; search/weather stubs {self.service_latency}s.")
+
+if __name__ == "__main__":
+    evaluator = BatchThroughputEvaluator()
+    evaluator.run_benchmark()
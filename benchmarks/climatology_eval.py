@@ -0,0 +1,61 @@
+import tempfile
+import time
+import numpy as np
+from ethio_agri_advisor.tools.climatology import ClimatologyStore, DEKADS_PER_YEAR
+from typing import List
+
+class ClimatologyEvaluator:
+    """
+    Builds a synthetic CHIRPS-sized store over Ethiopia's bounding box and times
+    ingest, cold open (mmap) and per-farm seasonal lookups.
+    The rainfall values are random; only the sizes are realistic.
+    """
+
+    def __init__(self, resolutions: List[float] = [0.5, 0.25, 0.1], n_years: int = 30,
+                 lookups: int = 20000, seed: int = 0):
+        self.resolutions = resolutions
+        self.n_years = n_years
+        self.lookups = lookups
+        self.seed = seed
+
+    def _synthetic_rain(self, resolution: float, rng: np.random.Generator) -> np.ndarray:
+        n_lat = int(round((15.0 - 3.0) / resolution))
+        n_lon = int(round((48.0 - 33.0) / resolution))
+        shape = (n_lat, n_lon, self.n_years, DEKADS_PER_YEAR)
+        return rng.gamma(2.0, 15.0, shape).astype(np.float32)
+
+    def run_benchmark(self):
+        print("--- Climatology Store Benchmark ---")
+        print(f"{'Grid (deg)':<10} | {'Cells':<7} | {'Size (MB)':<9} | {'Build (s)':<9} | {'Open (ms)':<9} | {'Stats (µs)':<10} | {'Pctl (µs)':<9}")
+        print("-" * 80)
+        rng = np.random.default_rng(self.seed)
+        for resolution in self.resolutions:
+            rain = self._synthetic_rain(resolution, rng)
+            with tempfile.TemporaryDirectory() as tmp:
+                start = time.perf_counter()
+                ClimatologyStore.build(rain, 3.0 + resolution / 2, 33.0 + resolution / 2, resolution,
+                                       list(range(1991, 1991 + self.n_years)), path=tmp)
+                build = time.perf_counter() - start
+
+                start = time.perf_counter()
+                store = ClimatologyStore(tmp)
+                open_ms = (time.perf_counter() - start) * 1e3
+
+                lats = rng.uniform(3.5, 14.5, self.lookups)
+                lons = rng.uniform(33.5, 47.5, self.lookups)
+                start = time.perf_counter()
+                for lat, lon in zip(lats.tolist(), lons.tolist()):
+                    store.season_stats(lat, lon, "kiremt")
+                stats_us = (time.perf_counter() - start) / self.lookups * 1e6
+                start = time.perf_counter()
+                for lat, lon in zip(lats.tolist(), lons.tolist()):
+                    store.percentile(lat, lon, "kiremt", 400.0)
+                pctl_us = (time.perf_counter() - start) / self.lookups * 1e6
+
+                print(f"{resolution:<10} | {rain.shape[0] * rain.shape[1]:<7} | {rain.nbytes / 2**20:<9.1f} | "
+                      f"{build:<9.2f} | {open_ms:<9.2f} | {stats_us:<10.1f} | {pctl_us:<9.1f}")
+                del store
+
+if __name__ == "__main__":
+    evaluator = ClimatologyEvaluator()
+    evaluator.run_benchmark()
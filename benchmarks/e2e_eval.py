@@ -0,0 +1,224 @@
+import contextlib
+import io
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from ethio_agri_advisor.config import settings
+from stubs import FakeTavily, StubWeatherServer
+from typing import Any, Dict, List, Optional
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results" / "e2e"
+
+ZONES = ["East Gojjam", "Arsi", "Jimma", "Sidama", "North Shewa", "Wolaita", "West Hararghe", "Bale"]
+CROPS = ["teff", "maize", "wheat", "sorghum", "barley"]
+
+# Metrics compared across commits, and whether higher is better.
+COMPARED = {"session_p50_s": False, "session_p95_s": False, "session_p99_s": False,
+            "peak_throughput_sessions_per_s": True, "peak_rss_mb": False}
+
+class EndToEndEvaluator:
+    """
+    Runs AgriAdvisorGraph end to end against the local fake chat model (fixed latency per
+    call), a local Open-Meteo stub and a fake Tavily client behind the real ClimateSearchTool.
+    Reports session latency percentiles, batch throughput per concurrency level, peak RSS
+    and a per-node breakdown from the built-in instrumentation. Results are saved as JSON
+    under benchmarks/results/e2e/<git sha>.json and compared with a baseline run.
+    """
+
+    def __init__(self, sessions: int = 40, concurrency_levels: List[int] = [1, 4, 8], batch_size: int = 32,
+                 llm_latency: float = 0.02, weather_latency: float = 0.01, search_latency: float = 0.03):
+        self.sessions = sessions
+        self.concurrency_levels = concurrency_levels
+        self.batch_size = batch_size
+        self.llm_latency = llm_latency
+        self.weather_latency = weather_latency
+        self.search_latency = search_latency
+
+    @staticmethod
+    def git_sha() -> str:
+        """Short HEAD sha, suffixed with -dirty when tracked files have uncommitted changes."""
+        try:
+            sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+            dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                   capture_output=True, text=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return "unknown"
+        return f"{sha}-dirty" if dirty else sha
+
+    @staticmethod
+    def peak_rss_mb() -> float:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS.
+        return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+    def _inputs(self, n: int, offset: int = 0) -> List[str]:
+        # Distinct inputs, so no session is served from another's work.
+        return [f"Farmer {offset + i} in {ZONES[i % len(ZONES)]} grows {CROPS[i % len(CROPS)]} on {1 + i % 4} hectares."
+                for i in range(n)]
+
+    def _build_graph(self, weather_url: str, workdir: Path):
+        from ethio_agri_advisor.core.cache import MemoryCache
+        from ethio_agri_advisor.core.graph import AgriAdvisorGraph
+        from ethio_agri_advisor.core.snapshot_store import SnapshotStore
+        from ethio_agri_advisor.core.weather_service import WeatherService
+        from ethio_agri_advisor.tools.climate_search import ClimateSearchTool
+
+        settings.DEFAULT_MODEL_NAME = "fake"
+        settings.FAKE_LLM_LATENCY_SECONDS = self.llm_latency
+        settings.LLM_CACHE_ENABLED = False
+        settings.LLM_MAX_CONCURRENCY = max(self.concurrency_levels) * 4
+        settings.TAVILY_API_KEY = settings.TAVILY_API_KEY or "stub"
+        settings.GUIDELINE_INDEX_ENABLED = False  # every session pays for a (fake) live search
+        settings.PRIVACY_LEDGER_PATH = workdir / "privacy_ledger.jsonl"
+        # Hundreds of sessions would spend the regions' budgets and get short-circuited refusals.
+        settings.PRIVACY_ACCOUNTING_ENABLED = False
+        settings.METRICS_DUMP_DIR = ""  # the snapshot goes into the result file instead
+        graph = AgriAdvisorGraph()
+        search_tool = ClimateSearchTool(snapshots=SnapshotStore(workdir / "snapshots.sqlite"), offline=False)
+        search_tool.search = FakeTavily(delay=self.search_latency)
+        graph.crop_planner.search_tool = search_tool
+        graph.crop_planner.weather_service = WeatherService(cache=MemoryCache(), base_url=weather_url, offline=False)
+        return graph
+
+    @staticmethod
+    def _node_breakdown(snapshot: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+        breakdown = {}
+        for family, label in (("advisor_node_seconds", "node"), ("advisor_external_seconds", "service"),
+                              ("advisor_llm_seconds", "model")):
+            for h in snapshot["histograms"].get(family, []):
+                breakdown[f"{label}:{h['labels'][label]}"] = {
+                    "count": h["count"], "mean_s": h["mean_seconds"], "p50_s": h["p50_seconds"], "p95_s": h["p95_seconds"]
+                }
+        return breakdown
+
+    @staticmethod
+    def _check_not_refused(states: List[Optional[Dict[str, Any]]], stage: str):
+        """Raises if any session was refused federated insights; its latency would not be comparable."""
+        refused = sum(1 for state in states
+                      if state and "withheld" in state.get("regional_insights", {}).get("description", ""))
+        if refused:
+            raise RuntimeError(f"{refused} of {len(states)} {stage} sessions were refused by the privacy accountant.")
+
+    def measure(self) -> Dict[str, Any]:
+        from ethio_agri_advisor.core.instrumentation import get_instrumentation
+        metrics = get_instrumentation()
+        with StubWeatherServer(delay=self.weather_latency) as weather, tempfile.TemporaryDirectory() as tmp:
+            graph = self._build_graph(weather.url, Path(tmp))
+            with contextlib.redirect_stdout(io.StringIO()):
+                graph.run(self._inputs(1, offset=10**6)[0])  # warm-up: lazy agents, clients, classifier
+            metrics.reset()
+
+            latencies, states = [], []
+            with contextlib.redirect_stdout(io.StringIO()):
+                for user_input in self._inputs(self.sessions):
+                    start = time.perf_counter()
+                    states.append(graph.run(user_input))
+                    latencies.append(time.perf_counter() - start)
+            self._check_not_refused(states, "sequential")
+            breakdown = self._node_breakdown(metrics.snapshot())
+
+            throughput = {}
+            offset = self.sessions
+            for concurrency in self.concurrency_levels:
+                inputs = self._inputs(self.batch_size, offset)
+                offset += self.batch_size
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results = graph.run_batch(inputs, max_concurrency=concurrency)
+                elapsed = time.perf_counter() - start
+                self._check_not_refused([r["state"] for r in results], f"concurrency {concurrency}")
+                throughput[str(concurrency)] = {
+                    "sessions_per_s": len(inputs) / elapsed,
+                    "failures": sum(1 for r in results if not r["ok"])
+                }
+
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return {
+            "git_sha": self.git_sha(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "config": {"sessions": self.sessions, "batch_size": self.batch_size, "llm_latency_s": self.llm_latency,
+                       "weather_latency_s": self.weather_latency, "search_latency_s": self.search_latency},
+            "session_p50_s": float(p50),
+            "session_p95_s": float(p95),
+            "session_p99_s": float(p99),
+            "session_mean_s": float(np.mean(latencies)),
+            "throughput": throughput,
+            "peak_throughput_sessions_per_s": max(t["sessions_per_s"] for t in throughput.values()),
+            "peak_rss_mb": self.peak_rss_mb(),
+            "breakdown": breakdown
+        }
+
+    @staticmethod
+    def save(result: Dict[str, Any]) -> Path:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        path = RESULTS_DIR / f"{result['git_sha']}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        return path
+
+    @staticmethod
+    def load_baseline(ref: Optional[str], current_sha: str) -> Optional[Dict[str, Any]]:
+        """A saved result by sha or path; by default the most recent one from another commit."""
+        if ref:
+            path = Path(ref) if ref.endswith(".json") else RESULTS_DIR / f"{ref}.json"
+        else:
+            others = [p for p in RESULTS_DIR.glob("*.json") if p.stem != current_sha]
+            path = max(others, key=lambda p: p.stat().st_mtime) if others else None
+        if path is None or not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def compare(result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.10) -> List[str]:
+        """Prints each compared metric against the baseline; returns those worse by more than tolerance."""
+        print(f"\nComparison with {baseline['git_sha']} ({baseline['timestamp']}):")
+        print(f"{'Metric':<32} | {'Baseline':<10} | {'Current':<10} | {'Change':<8}")
+        print("-" * 70)
+        regressions = []
+        for metric, higher_is_better in COMPARED.items():
+            old, new = baseline.get(metric), result[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if worse > tolerance else ""
+            if flag:
+                regressions.append(metric)
+            print(f"{metric:<32} | {old:<10.4f} | {new:<10.4f} | {change:<+8.1%}{flag}")
+        return regressions
+
+    def run_benchmark(self, baseline_ref: Optional[str] = None):
+        print("--- End-to-End Benchmark: AgriAdvisorGraph with Stub LLM and Services ---")
+        result = self.measure()
+        print(f"Commit {result['git_sha']}: {self.sessions} sequential sessions "
+              f"(LLM {self.llm_latency}s/call, weather {self.weather_latency}s, search {self.search_latency}s)")
+        print(f"Session latency: p50 {result['session_p50_s']:.3f}s | p95 {result['session_p95_s']:.3f}s | "
+              f"p99 {result['session_p99_s']:.3f}s | peak RSS {result['peak_rss_mb']:.0f} MB")
+
+        print(f"\n{'Concurrency':<12} | {'Sessions/s':<10} | {'Failures':<8}")
+        print("-" * 36)
+        for concurrency, t in result["throughput"].items():
+            print(f"{concurrency:<12} | {t['sessions_per_s']:<10.2f} | {t['failures']:<8}")
+
+        print(f"\n{'Stage':<32} | {'Calls':<6} | {'Mean (ms)':<9} | {'p50 (ms)':<9} | {'p95 (ms)':<9}")
+        print("-" * 76)
+        for stage, b in result["breakdown"].items():
+            print(f"{stage:<32} | {b['count']:<6} | {b['mean_s'] * 1e3:<9.1f} | {b['p50_s'] * 1e3:<9.1f} | {b['p95_s'] * 1e3:<9.1f}")
+
+        baseline = self.load_baseline(baseline_ref, result["git_sha"])
+        print(f"\nSaved {self.save(result)}")
+        if baseline is not None:
+            self.compare(result, baseline)
+
+# Compare with a specific run: python e2e_eval.py <sha or results json>
+if __name__ == "__main__":
+    evaluator = EndToEndEvaluator()
+    evaluator.run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,61 @@
+import os
+import time
+from ethio_agri_advisor.tools.local_model import FederatedYieldTrainer
+from typing import List
+
+class FederatedTrainingEvaluator:
+    """
+    Measures federated training of the on-device yield model: rounds per second as the
+    number of simulated farms grows (in-process batched vs. process pool), and convergence
+    of the global model against a centralized least-squares baseline.
+    """
+
+    def __init__(self, farm_counts: List[int] = [1000, 10000, 50000], rounds: int = 5,
+                 convergence_farms: int = 2000, convergence_rounds: int = 60, fraction: float = 0.2,
+                 workers: int = 4, seed: int = 0):
+        self.farm_counts = farm_counts
+        self.rounds = rounds
+        self.convergence_farms = convergence_farms
+        self.convergence_rounds = convergence_rounds
+        self.fraction = fraction
+        self.workers = workers
+        self.seed = seed
+
+    def rounds_per_second(self, trainer: FederatedYieldTrainer) -> float:
+        start = time.perf_counter()
+        for _ in range(self.rounds):
+            trainer.run_round()
+        return self.rounds / (time.perf_counter() - start)
+
+    def run_throughput(self):
+        print(f"--- Federated Training Throughput (full participation, {self.rounds} rounds) ---")
+        print(f"{'Farms':<8} | {'Batched rounds/s':<17} | {f'Pool x{self.workers} rounds/s':<17} | {'Farm updates/s':<15}")
+        print("-" * 66)
+        for n in self.farm_counts:
+            batched = FederatedYieldTrainer.synthetic(n, seed=self.seed, max_workers=1)
+            pooled = FederatedYieldTrainer(batched.X, batched.y, seed=self.seed, max_workers=self.workers, parallel_min_farms=0)
+            batched_rate = self.rounds_per_second(batched)
+            pooled_rate = self.rounds_per_second(pooled)
+            print(f"{n:<8} | {batched_rate:<17.2f} | {pooled_rate:<17.2f} | {max(batched_rate, pooled_rate) * n:<15.0f}")
+        print(f"\n(This machine has {os.cpu_count()} CPU(s); the pool only helps with several cores.)")
+
+    def run_convergence(self):
+        trainer = FederatedYieldTrainer.synthetic(self.convergence_farms, seed=self.seed, max_workers=1)
+        _, baseline = trainer.centralized_baseline()
+        print(f"\n--- Convergence ({self.convergence_farms} farms, {self.fraction:.0%} sampled per round) ---")
+        print(f"{'Round':<6} | {'Global MSE':<11} | {'Centralized MSE':<16} | {'Gap':<8}")
+        print("-" * 50)
+        print(f"{0:<6} | {trainer.evaluate():<11.4f} | {baseline:<16.4f} | {trainer.evaluate() / baseline:<7.2f}x")
+        for r in range(1, self.convergence_rounds + 1):
+            trainer.run_round(fraction=self.fraction)
+            if r in (1, 5, 10, 20, 40) or r == self.convergence_rounds:
+                mse = trainer.evaluate()
+                print(f"{r:<6} | {mse:<11.4f} | {baseline:<16.4f} | {mse / baseline:<7.2f}x")
+
+    def run_benchmark(self):
+        self.run_throughput()
+        self.run_convergence()
+
+if __name__ == "__main__":
+    evaluator = FederatedTrainingEvaluator()
+    evaluator.run_benchmark()
@@ -0,0 +1,44 @@
+import tempfile
+import time
+from pathlib import Path
+from ethio_agri_advisor.tools.gazetteer import Gazetteer
+from typing import List
+
+class GazetteerEvaluator:
+    """
+    Measures gazetteer start-up (CSV compile vs mapped index) and per-lookup latency.
+    """
+
+    def __init__(self, queries: List[str] = ["East Gojjam", "Machakel woreda", "west", "Wolayta", "Illubabur", "Atlantis"],
+                 repeats: int = 2000):
+        self.queries = queries
+        self.repeats = repeats
+
+    @staticmethod
+    def _timed(fn, repeats: int = 1) -> float:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn()
+        return (time.perf_counter() - start) / repeats
+
+    def run_benchmark(self):
+        print("--- Gazetteer Benchmark ---")
+        with tempfile.TemporaryDirectory() as tmp:
+            index = Path(tmp) / "gazetteer.npy"
+            cold = self._timed(lambda: Gazetteer(index_path=index))
+            warm = self._timed(lambda: Gazetteer(index_path=index), 20)
+            print(f"Start-up: {cold * 1e3:.2f} ms compiling the CSV, {warm * 1e3:.2f} ms mapping the index "
+                  f"({len(Gazetteer(index_path=index))} places)")
+
+            gazetteer = Gazetteer(index_path=index)
+            print(f"{'Query':<16} | {'Match':<16} | {'Uncached (µs)':<13} | {'Cached (µs)':<11}")
+            print("-" * 66)
+            for query in self.queries:
+                place = gazetteer.lookup(query)
+                uncached = self._timed(lambda: gazetteer._lookup(query), max(1, self.repeats // 10))
+                cached = self._timed(lambda: gazetteer.lookup(query), self.repeats)
+                print(f"{query:<16} | {place.name if place else '-':<16} | {uncached * 1e6:<13.1f} | {cached * 1e6:<11.2f}")
+
+if __name__ == "__main__":
+    evaluator = GazetteerEvaluator()
+    evaluator.run_benchmark()
@@ -0,0 +1,67 @@
+import random
+import tempfile
+import time
+from pathlib import Path
+from ethio_agri_advisor.tools.guideline_index import GuidelineIndex
+from typing import List
+
+CROPS = ["teff", "maize", "sorghum", "wheat", "barley", "haricot bean", "chickpea", "coffee", "enset", "sesame"]
+PRACTICES = ["row planting", "drought tolerant varieties", "tied ridges", "mulching", "compost", "lime acidic soils",
+             "early weeding", "intercropping", "supplementary irrigation", "seed treatment", "terracing", "fall armyworm"]
+ZONES = ["North Shewa", "East Gojjam", "Arsi", "Bale", "Jimma", "Sidama", "West Hararghe", "Wolaita", "Tigray", "Afar"]
+
+class GuidelineSearchEvaluator:
+    """
+    Indexes a synthetic guideline corpus of growing size and times incremental adds,
+    cold open and top-k queries, BM25 only and hybrid with the quantized vector index.
+    The documents are generated from crop/practice/zone vocabularies; only the sizes are realistic.
+    """
+
+    def __init__(self, corpus_sizes: List[int] = [100, 1000, 5000], queries: int = 500, seed: int = 0):
+        self.corpus_sizes = corpus_sizes
+        self.queries = queries
+        self.seed = seed
+
+    def _document(self, rng: random.Random, i: int) -> dict:
+        sentences = [f"For {rng.choice(CROPS)} in {rng.choice(ZONES)}, use {rng.choice(PRACTICES)} "
+                     f"and {rng.choice(PRACTICES)} before the {rng.choice(['belg', 'kiremt'])} rains."
+                     for _ in range(rng.randint(5, 20))]
+        return {"url": f"local://bench/{i}", "title": f"Guideline {i}", "content": " ".join(sentences)}
+
+    def _query(self, rng: random.Random) -> str:
+        return f"{rng.choice(PRACTICES)} {rng.choice(CROPS)} {rng.choice(ZONES)}"
+
+    def _time_queries(self, index: GuidelineIndex, queries: List[str], hybrid: bool) -> float:
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query, hybrid=hybrid)
+        return (time.perf_counter() - start) / len(queries) * 1e3
+
+    def run_benchmark(self):
+        print("--- Guideline Search Benchmark ---")
+        print(f"{'Docs':<6} | {'Passages':<8} | {'Add (s)':<7} | {'Open (ms)':<9} | {'BM25 (ms)':<9} | {'Hybrid (ms)':<11}")
+        print("-" * 66)
+        rng = random.Random(self.seed)
+        queries = [self._query(rng) for _ in range(self.queries)]
+        for size in self.corpus_sizes:
+            docs = [self._document(rng, i) for i in range(size)]
+            with tempfile.TemporaryDirectory() as tmp:
+                path = Path(tmp) / "guidelines.sqlite"
+                start = time.perf_counter()
+                index = GuidelineIndex(path, vectors=True)
+                for i in range(0, size, 50):
+                    index.add_documents(docs[i:i + 50])
+                add = time.perf_counter() - start
+
+                start = time.perf_counter()
+                index = GuidelineIndex(path, vectors=True)
+                open_ms = (time.perf_counter() - start) * 1e3
+
+                index.search(queries[0])
+                bm25_ms = self._time_queries(index, queries, hybrid=False)
+                hybrid_ms = self._time_queries(index, queries, hybrid=True)
+                print(f"{size:<6} | {len(index):<8} | {add:<7.2f} | {open_ms:<9.1f} | {bm25_ms:<9.3f} | {hybrid_ms:<11.3f}")
+
+if __name__ == "__main__":
+    evaluator = GuidelineSearchEvaluator()
+    evaluator.run_benchmark()
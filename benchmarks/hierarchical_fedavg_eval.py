@@ -0,0 +1,66 @@
+import os
+import time
+import numpy as np
+from ethio_agri_advisor.tools.hierarchical_aggregator import HierarchicalAggregator
+from ethio_agri_advisor.tools.privacy_engine import PrivacyEngine
+from typing import Dict, List, Tuple
+
+class HierarchicalFedAvgEvaluator:
+    """
+    Compares re-averaging every farm in one flat list against the zone/region/national
+    tree: full builds (serial and process pool) and incremental single-zone updates.
+    """
+
+    def __init__(self, farm_counts: List[int] = [10**4, 10**5, 10**6], n_zones: int = 100, n_regions: int = 12,
+                 n_features: int = 4, workers: int = 4, seed: int = 0):
+        self.farm_counts = farm_counts
+        self.n_zones = n_zones
+        self.n_regions = n_regions
+        self.keys = [f"feature_{j}" for j in range(n_features)]
+        self.workers = workers
+        self.rng = np.random.default_rng(seed)
+
+    def _make_zones(self, n_farms: int) -> Dict[str, Tuple[str, List[Dict[str, float]]]]:
+        per_zone = n_farms // self.n_zones
+        zones = {}
+        for z in range(self.n_zones):
+            values = self.rng.uniform(0, 1, (per_zone, len(self.keys))).tolist()
+            zones[f"zone_{z}"] = (f"region_{z % self.n_regions}", [dict(zip(self.keys, row)) for row in values])
+        return zones
+
+    def _tree(self, max_workers: int) -> HierarchicalAggregator:
+        return HierarchicalAggregator(keys=self.keys, privacy_engine=PrivacyEngine(epsilon=1.0),
+                                      noise_level="region", max_workers=max_workers, parallel_min_farms=0,
+                                      max_farms_per_zone=max(self.farm_counts))
+
+    @staticmethod
+    def _timed(fn, *args) -> float:
+        start = time.perf_counter()
+        fn(*args)
+        return time.perf_counter() - start
+
+    def run_benchmark(self):
+        print(f"--- Hierarchical FedAvg Benchmark ({self.n_zones} zones, {self.n_regions} regions) ---")
+        print(f"{'Farms':<9} | {'Flat (s)':<9} | {'Tree serial (s)':<15} | {f'Tree {self.workers} procs (s)':<18} | {'1-zone update (ms)':<18} | {'vs flat':<8}")
+        print("-" * 92)
+        for n in self.farm_counts:
+            zones = self._make_zones(n)
+            all_updates = [u for _, updates in zones.values() for u in updates]
+            flat = self._timed(PrivacyEngine(epsilon=1.0).aggregate_updates, all_updates)
+
+            serial_tree = self._tree(max_workers=1)
+            serial = self._timed(serial_tree.update_zones, zones)
+            parallel = self._timed(self._tree(max_workers=self.workers).update_zones, zones)
+
+            zone, (region, updates) = next(iter(zones.items()))
+            changed = [dict(u, feature_0=u["feature_0"] * 0.9) for u in updates]
+            incremental = self._timed(serial_tree.update_zone, zone, region, changed)
+            print(f"{n:<9} | {flat:<9.3f} | {serial:<15.3f} | {parallel:<18.3f} | {incremental * 1e3:<18.2f} | {flat / incremental:<7.0f}x")
+        print("\nFlat re-averages every farm after any change; the tree recomputes one zone and")
+        print("pushes the delta to its region and the national total.")
+        print("Process-pool builds pickle every farm update to the workers; they only pay off with several")
+        print(f"cores (this machine: {os.cpu_count()}) or CPU-heavy zone rounds such as secure aggregation.")
+
+if __name__ == "__main__":
+    evaluator = HierarchicalFedAvgEvaluator()
+    evaluator.run_benchmark()
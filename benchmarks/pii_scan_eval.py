@@ -0,0 +1,59 @@
+import re
+import time
+import numpy as np
+from typing import List
+from ethio_agri_advisor.tools.privacy_audit import PrivacyAuditTool
+
+class PIIScanEvaluator:
+    """
+    Measures PII scan throughput over multi-MB text to confirm linear-time scanning,
+    and compares the single-pass scanner with the previous per-key search loop.
+    """
+
+    SENTENCES = [
+        "Plant early-maturing teff varieties before the Kiremt rains begin. ",
+        "Apply lime at two tonnes per hectare on acidic Nitisols. ",
+        "Contact the development agent on +251911223344 for seed vouchers. ",
+        "Ridge tillage conserves soil moisture in dry spells. ",
+        "Field at 10.3292, 37.8742 showed waterlogging last season. ",
+    ]
+
+    def __init__(self, sizes_mb: List[int] = [1, 2, 4, 8], seed: int = 0):
+        self.sizes_mb = sizes_mb
+        self.rng = np.random.default_rng(seed)
+        self.tool = PrivacyAuditTool()
+
+    def _make_text(self, size_mb: int) -> str:
+        n = size_mb * 1024 * 1024 // 55
+        picks = self.rng.integers(0, len(self.SENTENCES), n)
+        return "".join(self.SENTENCES[i] for i in picks)
+
+    @staticmethod
+    def legacy_audit(content: str, private_keys=("name", "phone", "gps", "coordinates")) -> List[str]:
+        leaks = []
+        for key in private_keys:
+            if re.search(rf"\b{key}\b", content, re.IGNORECASE):
+                leaks.append(key)
+        if re.search(r"\d{1,2}\.\d{4,},\s?\d{1,2}\.\d{4,}", content):
+            leaks.append("exact_coordinates")
+        return leaks
+
+    def run_benchmark(self):
+        print("--- PII Scan Benchmark: Throughput vs. Text Size ---")
+        print(f"{'Size (MB)':<10} | {'Spans':<9} | {'Scan (s)':<10} | {'MB/s':<8} | {'Legacy search (s)':<18}")
+        print("-" * 66)
+        for size in self.sizes_mb:
+            text = self._make_text(size)
+            start = time.perf_counter()
+            result = self.tool.audit_content(text)
+            scan_time = time.perf_counter() - start
+            start = time.perf_counter()
+            self.legacy_audit(text)
+            legacy_time = time.perf_counter() - start
+            print(f"{size:<10} | {len(result['spans']):<9} | {scan_time:<10.3f} | {size / scan_time:<8.1f} | {legacy_time:<18.3f}")
+        print("\nNote: constant MB/s across sizes indicates linear-time scanning. The legacy loop stops at the")
+        print("first match per key, so it finds no spans and misses phones, emails and IDs entirely.")
+
+if __name__ == "__main__":
+    evaluator = PIIScanEvaluator()
+    evaluator.run_benchmark()
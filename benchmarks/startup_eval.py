@@ -0,0 +1,71 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+class StartupEvaluator:
+    """
+    Tracks cold-start cost: import time of the CLI module (via -X importtime),
+    wall time of `python -m ethio_agri_advisor.main`, and graph construction time.
+    Every measurement runs in a fresh interpreter.
+    """
+
+    GRAPH_SNIPPET = (
+        "import time; start = time.perf_counter(); "
+        "from ethio_agri_advisor.core.graph import AgriAdvisorGraph; AgriAdvisorGraph(); "
+        "print(time.perf_counter() - start)"
+    )
+
+    def __init__(self, repeats: int = 5, top_n: int = 8):
+        self.repeats = repeats
+        self.top_n = top_n
+        # Empty keys make the CLI exit right after startup instead of running the demo.
+        self.env = {**os.environ, "OPENAI_API_KEY": "", "TAVILY_API_KEY": "", "GOOGLE_API_KEY": ""}
+
+    def import_profile(self, module: str = "ethio_agri_advisor.main") -> Tuple[float, List[Tuple[float, str]]]:
+        """
+        Returns the cumulative import time of module in ms and its heaviest imports.
+        """
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                              capture_output=True, text=True, env=self.env)
+        entries: Dict[str, float] = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            entries[name.strip()] = int(cumulative) / 1000.0
+        heaviest = sorted(((ms, name) for name, ms in entries.items() if name != module), reverse=True)
+        return entries.get(module, 0.0), heaviest[:self.top_n]
+
+    def _median_wall(self, args: List[str]) -> float:
+        samples = []
+        for _ in range(self.repeats):
+            start = time.perf_counter()
+            subprocess.run([sys.executable] + args, capture_output=True, env=self.env)
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples)
+
+    def graph_construction_time(self) -> float:
+        samples = []
+        for _ in range(self.repeats):
+            proc = subprocess.run([sys.executable, "-c", self.GRAPH_SNIPPET], capture_output=True, text=True, env=self.env)
+            samples.append(float(proc.stdout.strip().splitlines()[-1]))
+        return statistics.median(samples)
+
+    def run_benchmark(self):
+        print("--- Startup Benchmark: Cold-Start Cost ---")
+        total_ms, heaviest = self.import_profile()
+        print(f"{'Metric':<45} | {'Value':<12}")
+        print("-" * 60)
+        print(f"{'import ethio_agri_advisor.main (ms)':<45} | {total_ms:<12.1f}")
+        print(f"{'python -m ethio_agri_advisor.main (s, median)':<45} | {self._median_wall(['-m', 'ethio_agri_advisor.main']):<12.3f}")
+        print(f"{'import + AgriAdvisorGraph() (s, median)':<45} | {self.graph_construction_time():<12.3f}")
+        print(f"\nHeaviest imports under ethio_agri_advisor.main (cumulative ms):")
+        for ms, name in heaviest:
+            print(f"  {ms:>9.1f}  {name}")
+
+if __name__ == "__main__":
+    evaluator = StartupEvaluator()
+    evaluator.run_benchmark()
@@ -0,0 +1,70 @@
+import contextlib
+import io
+import time
+from ethio_agri_advisor.config import settings
+from stubs import StubSearchTool, StubWeatherServer
+
+LEAKY_PLAN = (
+    "Approve. Sow early-maturing teff at the onset of the Kiremt rains and apply lime on acidic plots. "
+    "For seed vouchers call the development agent on +251911223344 or visit the plot at 10.3292, 37.8742."
+)
+
+class StreamingRedactionEvaluator:
+    """
+    Compares planning with and without in-stream PII redaction, using a fake planner
+    model whose plans leak a phone number and coordinates.
+    Reports time-to-first-token and how many refine loops the redaction avoids.
+    """
+
+    def __init__(self, sessions: int = 10, llm_latency: float = 0.2):
+        self.sessions = sessions
+        self.llm_latency = llm_latency
+
+    def _build_graph(self, weather_url: str):
+        from ethio_agri_advisor.core.cache import MemoryCache
+        from ethio_agri_advisor.core.graph import AgriAdvisorGraph
+        from ethio_agri_advisor.core.llm_registry import LocalFakeChatModel
+        from ethio_agri_advisor.core.weather_service import WeatherService
+
+        settings.DEFAULT_MODEL_NAME = "fake"
+        settings.FAKE_LLM_LATENCY_SECONDS = self.llm_latency
+        settings.LLM_CACHE_ENABLED = False
+        settings.TAVILY_API_KEY = settings.TAVILY_API_KEY or "stub"
+        graph = AgriAdvisorGraph()
+        graph.crop_planner.llm = LocalFakeChatModel(response=LEAKY_PLAN, latency_seconds=self.llm_latency)
+        graph.crop_planner.search_tool = StubSearchTool()
+        graph.crop_planner.weather_service = WeatherService(cache=MemoryCache(), base_url=weather_url)
+        return graph
+
+    def _run_sessions(self, graph, redaction: bool):
+        settings.STREAM_REDACTION_ENABLED = redaction
+        iterations, finalized, avoided, ttfts = 0, 0, 0, []
+        start = time.perf_counter()
+        for i in range(self.sessions):
+            with contextlib.redirect_stdout(io.StringIO()):
+                state = graph.app.invoke(graph.initial_state(f"Farmer {i} in East Gojjam plants teff."))
+            iterations += state["iteration_count"]
+            finalized += 1 if state.get("final_report") else 0
+            avoided += state.get("refine_loops_avoided", 0)
+            ttft = graph.crop_planner.last_stream_stats.get("time_to_first_token_s") if redaction else None
+            if ttft is not None:
+                ttfts.append(ttft)
+        elapsed = time.perf_counter() - start
+        ttft = sum(ttfts) / len(ttfts) if ttfts else self.llm_latency
+        return iterations, finalized, avoided, ttft, elapsed
+
+    def run_benchmark(self):
+        print("--- Streaming Redaction Benchmark: Leaky Planner Output ---")
+        print(f"{'Mode':<18} | {'Plans':<6} | {'Finalized':<9} | {'Loops avoided':<13} | {'Plan TTFT (s)':<13} | {'Wall (s)':<8}")
+        print("-" * 82)
+        with StubWeatherServer() as weather:
+            graph = self._build_graph(weather.url)
+            for label, redaction in [("audit-only", False), ("stream-redaction", True)]:
+                iterations, finalized, avoided, ttft, elapsed = self._run_sessions(graph, redaction)
+                print(f"{label:<18} | {iterations:<6} | {finalized:<9} | {avoided:<13} | {ttft:<13.3f} | {elapsed:<8.2f}")
+        print(f"\nNote: {self.sessions} sessions, max 3 audit iterations each; fake LLM latency {self.llm_latency}s per call.")
+        print("Audit-only TTFT equals the full generation time because the plan is only seen once complete.")
+
+if __name__ == "__main__":
+    evaluator = StreamingRedactionEvaluator()
+    evaluator.run_benchmark()
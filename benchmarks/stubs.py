@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+class _StubWeatherHandler(BaseHTTPRequestHandler):
+    """Serves a canned Open-Meteo forecast after the server's configured delay."""
+
+    def do_GET(self):
+        self.server.request_count += 1
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        body = json.dumps({
+            "current_weather": {"temperature": 18.5, "windspeed": 7.0},
+            "daily": {
+                "rain_sum": [1.0, 0.0, 3.5, 12.0, 4.0, 0.0, 2.5],
+                "temperature_2m_max": [24.0] * 7,
+                "temperature_2m_min": [11.0] * 7
+            }
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class StubWeatherServer:
+    """
+    Local stand-in for the Open-Meteo API, usable as a context manager.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubWeatherHandler)
+        self.server.request_count = 0
+        self.server.delay = delay
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/forecast"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def request_count(self) -> int:
+        return self.server.request_count
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+class StubSearchTool:
+    """
+    Stand-in for ClimateSearchTool with a fixed latency and canned guidance.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    def search_agri_data(self, query: str, region: Optional[str] = None) -> str:
+        if self.delay:
+            time.sleep(self.delay)
+        return "Source: local\nContent: Sow early-maturing, drought-tolerant varieties."
+
+    async def asearch_agri_data(self, query: str, region: Optional[str] = None) -> str:
+        import asyncio
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return "Source: local\nContent: Sow early-maturing, drought-tolerant varieties."
+
+class FakeTavily:
+    """
+    Stand-in for the TavilySearchResults client inside ClimateSearchTool: returns canned
+    results after a fixed latency, so the tool's own index, snapshot and formatting run.
+    """
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def _results(self, payload):
+        self.calls += 1
+        return [{"url": f"https://example.org/guidelines/{self.calls}",
+                 "content": f"Guidance for {payload['query']}: sow early-maturing, drought-tolerant varieties."}]
+
+    def invoke(self, payload):
+        if self.delay:
+            time.sleep(self.delay)
+        return self._results(payload)
+
+    async def ainvoke(self, payload):
+        import asyncio
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self._results(payload)
@@ -0,0 +1,56 @@
+import time
+import numpy as np
+from ethio_agri_advisor.tools.yield_simulator import YieldSimulationTool
+from typing import List
+
+class YieldBatchEvaluator:
+    """
+    Compares the scalar yield-risk path against the vectorized batch path.
+    """
+
+    def __init__(self, sizes: List[int] = [10**3, 10**5, 10**7], scalar_sample: int = 10**5, seed: int = 0):
+        self.sizes = sizes
+        # The scalar path is timed on at most this many rows and extrapolated beyond it.
+        self.scalar_sample = scalar_sample
+        self.rng = np.random.default_rng(seed)
+        self.tool = YieldSimulationTool()
+
+    def _make_rows(self, n: int):
+        soil_ph = self.rng.uniform(4.5, 8.5, n)
+        rainfall_mm = self.rng.uniform(100, 1800, n)
+        crop_codes = self.rng.integers(0, len(self.tool.crop_names), n)
+        return soil_ph, rainfall_mm, crop_codes
+
+    def time_scalar(self, soil_ph, rainfall_mm, crop_codes) -> float:
+        """
+        Returns the per-row time of the scalar path in seconds.
+        """
+        m = min(len(soil_ph), self.scalar_sample)
+        names = [self.tool.crop_names[c] for c in crop_codes[:m]]
+        ph = soil_ph[:m].tolist()
+        rain = rainfall_mm[:m].tolist()
+        start = time.perf_counter()
+        for i in range(m):
+            self.tool.calculate_yield_risk(ph[i], rain[i], names[i])
+        return (time.perf_counter() - start) / m
+
+    def time_batch(self, soil_ph, rainfall_mm, crop_codes) -> float:
+        start = time.perf_counter()
+        self.tool.calculate_yield_risk_batch(soil_ph, rainfall_mm, crop_codes)
+        return time.perf_counter() - start
+
+    def run_benchmark(self):
+        print("--- Yield Risk Benchmark: Scalar vs. Vectorized Batch ---")
+        print(f"{'Rows':<12} | {'Scalar (s)':<14} | {'Batch (s)':<12} | {'Speedup':<10}")
+        print("-" * 56)
+        for n in self.sizes:
+            soil_ph, rainfall_mm, crop_codes = self._make_rows(n)
+            scalar_total = self.time_scalar(soil_ph, rainfall_mm, crop_codes) * n
+            batch_total = self.time_batch(soil_ph, rainfall_mm, crop_codes)
+            marker = "*" if n > self.scalar_sample else ""
+            print(f"{n:<12} | {scalar_total:<13.4f}{marker:<1} | {batch_total:<12.4f} | {scalar_total / batch_total:<10.1f}x")
+        print(f"\n* Scalar time extrapolated from the first {self.scalar_sample} rows.")
+
+if __name__ == "__main__":
+    evaluator = YieldBatchEvaluator()
+    evaluator.run_benchmark()
@@ -14,6 +14,7 @@ setup(
         "scipy>=1.10.0",
         "pandas>=2.0.0",
         "python-dotenv>=1.0.0",
+        "httpx>=0.24.0",
         "tavily-python>=0.3.0",
     ],
 )
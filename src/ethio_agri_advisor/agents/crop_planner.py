@@ -1,10 +1,20 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from ethio_agri_advisor.tools.climate_search import ClimateSearchTool
 from ethio_agri_advisor.tools.yield_simulator import YieldSimulationTool
+from ethio_agri_advisor.tools.gazetteer import Gazetteer, get_gazetteer
+from ethio_agri_advisor.tools.climatology import ClimatologyStore, get_climatology_store
+from ethio_agri_advisor.tools.privacy_audit import StreamingRedactor
 from ethio_agri_advisor.core.weather_service import WeatherService
 from ethio_agri_advisor.config import settings
-from typing import Dict, Any
+from ethio_agri_advisor.core.llm_registry import get_chat_model
+from ethio_agri_advisor.core.async_utils import run_sync, with_timeout
+from contextlib import aclosing, closing
+from functools import cached_property
+from typing import Dict, Any, Optional, Tuple
+import asyncio
+import threading
+import time
+import numpy as np
 
 class CropWeatherPlannerAgent:
     """
@@ -12,12 +22,9 @@ class CropWeatherPlannerAgent:
     Grounds outputs in Ethiopian-specific data.
     """
     
-    def __init__(self, model_name: str = None):
+    def __init__(self, model_name: str = None, use_cache: bool = True):
         self.model_name = model_name or settings.DEFAULT_MODEL_NAME
-        self.llm = ChatGoogleGenerativeAI(model=self.model_name, google_api_key=settings.GOOGLE_API_KEY)
-        self.search_tool = ClimateSearchTool()
-        self.yield_tool = YieldSimulationTool()
-        self.weather_service = WeatherService()
+        self.use_cache = use_cache
         self.prompt = ChatPromptTemplate.from_template(
             "You are a Crop and Weather Planner for Ethiopian smallholders. "
             "Based on the following regional trends and local conditions, provide specific, climate-resilient recommendations. "
@@ -28,47 +35,277 @@ class CropWeatherPlannerAgent:
             "Search Context: {search_context}\n"
             "Yield Simulation: {yield_sim}"
         )
+        # Refine iterations only fix what the audit flagged; the context is unchanged.
+        self.revise_prompt = ChatPromptTemplate.from_template(
+            "You are revising a crop plan for Ethiopian smallholders that failed a privacy and ethics audit. "
+            "Rewrite it to resolve every issue below and change nothing else: keep the agronomic advice, "
+            "varieties, schedules and numbers as they are. Do not include names, phone numbers, IDs or exact coordinates.\n\n"
+            "Audit Issues: {feedback}\n"
+            "Plan: {plan}"
+        )
+        self._stream_stats = threading.local()
+
+    @cached_property
+    def llm(self):
+        return get_chat_model(self.model_name, use_cache=self.use_cache)
+
+    @cached_property
+    def search_tool(self) -> ClimateSearchTool:
+        return ClimateSearchTool()
+
+    @cached_property
+    def yield_tool(self) -> YieldSimulationTool:
+        return YieldSimulationTool()
 
-    def plan(self, local_summary: str, regional_trends: Dict[str, Any], anonymized_features: Dict[str, Any]) -> str:
+    @cached_property
+    def weather_service(self) -> WeatherService:
+        return WeatherService()
+
+    @cached_property
+    def gazetteer(self) -> Gazetteer:
+        return get_gazetteer()
+
+    @cached_property
+    def climatology(self) -> ClimatologyStore:
+        return get_climatology_store()
+
+    def _location(self, anonymized_features: Dict[str, Any]) -> Tuple[float, float]:
         """
-        Generates a detailed agricultural plan.
+        Coordinates for the weather lookup. Exact coordinates are stripped by anonymization,
+        so the zone/region is resolved through the gazetteer to its centroid's grid cell.
+        Falls back to Addis Ababa only when the place cannot be resolved.
+        """
+        if "latitude" in anonymized_features and "longitude" in anonymized_features:
+            return anonymized_features["latitude"], anonymized_features["longitude"]
+        return self.gazetteer.cell(anonymized_features) or (9.03, 38.74)
+
+    @staticmethod
+    def _seasonal_rainfall_std(weather_data: Dict[str, Any], seasonal_rainfall: float) -> float:
+        """
+        Derives a seasonal rainfall spread from the variability of the daily forecast.
+        The coefficient of variation is clamped to [0.1, 0.5] so a flat or empty
+        forecast still carries some uncertainty.
+        """
+        daily = np.asarray(weather_data.get("daily_rain_sum") or [], dtype=float)
+        daily = daily[~np.isnan(daily)] if daily.size else daily
+        cv = daily.std() / daily.mean() if daily.size and daily.mean() > 0 else 0.5
+        return seasonal_rainfall * min(0.5, max(0.1, cv))
+
+    @staticmethod
+    def _new_redactor() -> StreamingRedactor:
+        return StreamingRedactor(lookback=settings.STREAM_REDACTION_LOOKBACK)
+
+    @staticmethod
+    def _chunk_text(chunk) -> str:
+        content = chunk.content
+        if isinstance(content, str):
+            return content
+        # Some providers stream a list of content blocks.
+        return "".join(block if isinstance(block, str) else block.get("text", "") for block in content)
+
+    def _record_stream_stats(self, redactor: StreamingRedactor, first_token_at: Optional[float], total: float):
+        self._stream_stats.last = {
+            "time_to_first_token_s": first_token_at,
+            "generation_s": total,
+            "redactions": redactor.redactions,
+            "redacted_labels": redactor.redacted_labels
+        }
+
+    @property
+    def last_stream_stats(self) -> Dict[str, Any]:
+        """
+        Streaming stats of the last plan generated on this thread.
+        Thread-local, so concurrent batch items do not overwrite each other.
+        """
+        return getattr(self._stream_stats, "last", {})
+
+    async def _agather_context(self, crop_type: str, anonymized_features: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Runs the climate search and the weather fetch concurrently.
+        Each call has its own timeout budget and falls back independently.
         """
         # 1. Search for latest guidelines
-        crop_type = anonymized_features.get("crop_type", "teff")
-        search_context = self.search_tool.search_agri_data(f"{crop_type} resilience {anonymized_features.get('region', 'Ethiopia')}")
-        
-        # 2. Get Real-time Weather
-        # Default to Addis Ababa if no location provided
-        lat = anonymized_features.get("latitude", 9.03)
-        lon = anonymized_features.get("longitude", 38.74)
-        weather_data = self.weather_service.get_current_weather(lat, lon)
+        query = f"{crop_type} resilience {anonymized_features.get('region', 'Ethiopia')}"
         
-        # Calculate average rainfall from forecast for simulation (simplified)
-        predicted_rainfall = sum(weather_data.get("daily_rain_sum", [0])) * 10 # Estimate for season based on weekly * 10 (very rough, but dynamic)
-        # Or better, use a default if forecast is short term, but let's use the dynamic data to influence it.
-        # For simulation, let's assume the user might provide historical rainfall, or we use a standard value adjusted by current weather.
-        # Let's use a standard season value but adjust by current drought status if available.
-        # For now, we'll use a placeholder logic that uses the dynamic weather to adjust a base value.
-        
-        base_seasonal_rainfall = 600 # mm
+        # 2. Get Real-time Weather for the farm's zone (grid cell of its centroid)
+        lat, lon = self._location(anonymized_features)
+
+        search_context, weather_data = await asyncio.gather(
+            with_timeout(
+                self.search_tool.asearch_agri_data(query, region=anonymized_features.get("region")),
+                settings.SEARCH_TIMEOUT_SECONDS,
+                fallback=lambda: self.search_tool.snapshot_context(query),
+                label="Climate search"
+            ),
+            with_timeout(
+                self.weather_service.aget_current_weather(lat, lon),
+                settings.WEATHER_TIMEOUT_SECONDS,
+                fallback=lambda: self.weather_service.snapshot_weather(lat, lon),
+                label="Weather fetch"
+            )
+        )
+        return search_context, weather_data
+
+    def _seasonal_rainfall(self, anonymized_features: Dict[str, Any], weather_data: Dict[str, Any]) -> Tuple[float, float, Dict[str, Any]]:
+        """
+        Expected seasonal rainfall (mm), its interannual spread and where they came from.
+        Read from the offline climatology for the farm's grid cell. Without one for the cell,
+        a default season is used, trimmed after a dry forecast week, with the spread taken
+        from the forecast's variability.
+        """
+        lat, lon = self._location(anonymized_features)
+        stats = self.climatology.season_stats(lat, lon, settings.CLIMATOLOGY_SEASON)
+        if stats is not None:
+            week_rain = sum(r for r in weather_data.get("daily_rain_sum") or [] if r is not None)
+            return stats["mean_mm"], max(stats["std_mm"], 0.05 * stats["mean_mm"]), {
+                **stats, "source": "climatology", "forecast_week_mm": week_rain
+            }
+
+        seasonal_rainfall = 600 # mm
         if sum(weather_data.get("daily_rain_sum", [])) < 10: # Dry week
-            base_seasonal_rainfall -= 50
+            seasonal_rainfall -= 50
+        return seasonal_rainfall, self._seasonal_rainfall_std(weather_data, seasonal_rainfall), {
+            "season": settings.CLIMATOLOGY_SEASON, "mean_mm": seasonal_rainfall, "source": "default"
+        }
+
+    def _simulate_yield(self, crop_type: str, anonymized_features: Dict[str, Any], weather_data: Dict[str, Any]) -> Dict[str, Any]:
+        seasonal_rainfall, rainfall_std, rainfall_info = self._seasonal_rainfall(anonymized_features, weather_data)
             
         # 3. Run yield simulation
+        soil_ph = anonymized_features.get("soil_ph", 6.5)
         yield_sim = self.yield_tool.calculate_yield_risk(
-            soil_ph=anonymized_features.get("soil_ph", 6.5),
-            rainfall_mm=base_seasonal_rainfall,
+            soil_ph=soil_ph,
+            rainfall_mm=seasonal_rainfall,
             crop_type=crop_type
         )
-        
-        # 4. Generate plan
-        chain = self.prompt | self.llm
-        response = chain.invoke({
+        yield_sim["seasonal_rainfall"] = rainfall_info
+        if settings.YIELD_SIMULATION_SAMPLES > 0:
+            yield_sim["uncertainty"] = self.yield_tool.simulate_yield_distribution(
+                soil_ph=soil_ph,
+                rainfall_mm=seasonal_rainfall,
+                crop_type=crop_type,
+                rainfall_std=rainfall_std,
+                n_samples=settings.YIELD_SIMULATION_SAMPLES,
+                seed=settings.YIELD_SIMULATION_SEED
+            )
+        return yield_sim
+
+    def _plan_inputs(self, local_summary: str, regional_trends: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+        return {
             "regional_trends": regional_trends,
             "local_summary": local_summary,
+            "weather_data": context["weather_data"],
+            "search_context": context["search_context"],
+            "yield_sim": context["yield_sim"]
+        }
+
+    async def aprepare_context(self, anonymized_features: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Search, weather and yield simulation for a farm: everything the plan prompt needs
+        besides the summaries. Computed once per graph run and reused by refine iterations.
+        """
+        crop_type = anonymized_features.get("crop_type", "teff")
+        search_context, weather_data = await self._agather_context(crop_type, anonymized_features)
+        return {
+            "search_context": search_context,
             "weather_data": weather_data,
+            "yield_sim": self._simulate_yield(crop_type, anonymized_features, weather_data)
+        }
+
+    def prepare_context(self, anonymized_features: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Sync variant of aprepare_context (search and weather still run concurrently).
+        """
+        crop_type = anonymized_features.get("crop_type", "teff")
+        search_context, weather_data = run_sync(self._agather_context(crop_type, anonymized_features))
+        return {
             "search_context": search_context,
-            "yield_sim": yield_sim
-        })
-        
-        return response.content
+            "weather_data": weather_data,
+            "yield_sim": self._simulate_yield(crop_type, anonymized_features, weather_data)
+        }
+
+    @staticmethod
+    def rejection_reasons(audit_results: Dict[str, Any]) -> str:
+        """
+        The audit's objections as rewrite instructions: the verdict's reasons, or for an
+        unstructured verdict the PII labels the scanner found and the auditor's rationale.
+        """
+        reasons = list(audit_results.get("reasons") or [])
+        if not reasons:
+            leaks = audit_results.get("tool_audit", {}).get("detected_leaks") or []
+            if leaks:
+                reasons.append(f"Remove or generalize this sensitive data: {', '.join(leaks)}.")
+            if audit_results.get("audit_log"):
+                reasons.append(f"Auditor: {audit_results['audit_log']}")
+        return "\n".join(reasons) or "The plan was rejected without a stated reason; remove anything identifying."
+
+    async def _agenerate(self, prompt: ChatPromptTemplate, inputs: Dict[str, Any]) -> str:
+        chain = prompt | self.llm
+        if not settings.STREAM_REDACTION_ENABLED:
+            return (await chain.ainvoke(inputs)).content
+
+        redactor = self._new_redactor()
+        start = time.perf_counter()
+        first_token_at = None
+        parts = []
+        async with aclosing(chain.astream(inputs)) as stream:
+            async for chunk in stream:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter() - start
+                parts.append(redactor.feed(self._chunk_text(chunk)))
+        parts.append(redactor.flush())
+        self._record_stream_stats(redactor, first_token_at, time.perf_counter() - start)
+        return "".join(parts)
+
+    def _generate(self, prompt: ChatPromptTemplate, inputs: Dict[str, Any]) -> str:
+        chain = prompt | self.llm
+        if not settings.STREAM_REDACTION_ENABLED:
+            return chain.invoke(inputs).content
+
+        redactor = self._new_redactor()
+        start = time.perf_counter()
+        first_token_at = None
+        parts = []
+        with closing(chain.stream(inputs)) as stream:
+            for chunk in stream:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter() - start
+                parts.append(redactor.feed(self._chunk_text(chunk)))
+        parts.append(redactor.flush())
+        self._record_stream_stats(redactor, first_token_at, time.perf_counter() - start)
+        return "".join(parts)
+
+    async def aplan(self, local_summary: str, regional_trends: Dict[str, Any], anonymized_features: Dict[str, Any],
+                    context: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generates a detailed agricultural plan.
+        Search and weather run concurrently, so their latency is max(search, weather).
+        A context from an earlier aprepare_context skips them entirely.
+        """
+        if context is None:
+            context = await self.aprepare_context(anonymized_features)
+        return await self._agenerate(self.prompt, self._plan_inputs(local_summary, regional_trends, context))
+
+    def plan(self, local_summary: str, regional_trends: Dict[str, Any], anonymized_features: Dict[str, Any],
+             context: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generates a detailed agricultural plan.
+        Wraps the concurrent search/weather fan-out of aplan; the LLM call stays
+        synchronous so the client is never shared across short-lived event loops.
+        """
+        if context is None:
+            context = self.prepare_context(anonymized_features)
+        return self._generate(self.prompt, self._plan_inputs(local_summary, regional_trends, context))
+
+    async def arevise(self, plan: str, feedback: str) -> str:
+        """
+        Async variant of revise.
+        """
+        return await self._agenerate(self.revise_prompt, {"plan": plan, "feedback": feedback})
+
+    def revise(self, plan: str, feedback: str) -> str:
+        """
+        Rewrites a rejected plan to address the audit feedback: one LLM call with a short
+        prompt, instead of re-running search, weather, simulation and the full plan prompt.
+        """
+        return self._generate(self.revise_prompt, {"plan": plan, "feedback": feedback})
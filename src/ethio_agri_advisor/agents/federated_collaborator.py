@@ -1,31 +1,91 @@
 from ethio_agri_advisor.tools.privacy_engine import PrivacyEngine
-from typing import List, Dict, Any
+from ethio_agri_advisor.tools.privacy_accountant import PrivacyBudgetExceededError, get_privacy_accountant
+from ethio_agri_advisor.tools.hierarchical_aggregator import HierarchicalAggregator, LEVELS
+from ethio_agri_advisor.tools.local_model import farm_update
+from ethio_agri_advisor.config import settings
+from typing import List, Dict, Any, Optional, Tuple
+import threading
+import uuid
 
 class FederatedCollaboratorAgent:
     """
     Coordinates with a network of virtual farms.
-    Aggregates insights from local analysis and peer updates.
+    Aggregates insights from local analysis and peer updates through a
+    zone -> region -> national aggregation tree.
     """
+
+    # Simulated peer farms, labelled by zone: {zone: (region, farm profiles)}.
+    # Each peer trains the on-device yield model on its own history to produce its update.
+    SIMULATED_PEERS: Dict[str, Tuple[str, List[Dict[str, Any]]]] = {
+        "East Gojjam": ("Amhara", [{"crop_type": "teff", "soil_ph": 5.6, "soil_nitrogen": 0.14, "mean_rainfall_mm": 900}]),
+        "West Gojjam": ("Amhara", [{"crop_type": "maize", "soil_ph": 5.2, "soil_nitrogen": 0.18, "mean_rainfall_mm": 1200}]),
+        "Arsi": ("Oromia", [{"crop_type": "wheat", "soil_ph": 6.4, "soil_nitrogen": 0.12, "mean_rainfall_mm": 750}])
+    }
     
-    def __init__(self):
-        self.privacy_engine = PrivacyEngine()
+    def __init__(self, secure_aggregation: bool = None):
+        self.privacy_engine = PrivacyEngine(accountant=get_privacy_accountant())
+        self.secure_aggregation = settings.SECURE_AGGREGATION_ENABLED if secure_aggregation is None else secure_aggregation
+        # Within each zone, farm updates are summed by a secure-aggregation round when enabled.
+        self.tree = HierarchicalAggregator(
+            privacy_engine=self.privacy_engine,
+            secure_neighbors=settings.SECURE_AGGREGATION_NEIGHBORS if self.secure_aggregation else None
+        )
+        self._peers_loaded = False
+        self._peers_lock = threading.Lock()
+        self._peer_update_cache: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    def _peer_updates(self, zone: str) -> Dict[str, Dict[str, Any]]:
+        """The zone's simulated peers' updates, keyed by farm id."""
+        if zone not in self._peer_update_cache:
+            profiles = self.SIMULATED_PEERS.get(zone, (None, []))[1]
+            self._peer_update_cache[zone] = {f"peer:{zone}:{i}": farm_update(profile) for i, profile in enumerate(profiles)}
+        return self._peer_update_cache[zone]
 
-    def aggregate_insights(self, local_update: Dict[str, Any]) -> Dict[str, Any]:
+    def aggregate_insights(self, local_update: Dict[str, Any], zone: str = None, region: str = None,
+                           farm_id: Optional[str] = None) -> Dict[str, Any]:
         """
-        Aggregates local update with simulated peer updates.
+        Adds the farm's update to its zone alongside every earlier farm's (a farm that
+        reports again replaces its own update; without farm_id it counts as a new farm).
+        Only that zone is recomputed; its region and the national total are updated
+        incrementally. Noisy totals are drawn once per round at the configured level and
+        charged to that node's privacy budget; an exhausted budget yields no trends.
         """
-        # Peer updates from other farms in the region
-        peer_updates = [
-            {"yield_improvement_potential": 0.10, "pest_risk_trend": 0.05},
-            {"yield_improvement_potential": 0.14, "pest_risk_trend": 0.08},
-            {"yield_improvement_potential": 0.09, "pest_risk_trend": 0.04}
-        ]
-        
-        all_updates = peer_updates + [local_update]
-        global_insight = self.privacy_engine.simulate_federated_averaging(all_updates)
-        
-        return {
-            "regional_trends": global_insight,
-            "peer_count": len(all_updates),
-            "description": f"Aggregated insights from {len(all_updates)} farms in the region using DP-FedAvg."
+        zone = zone or "unassigned"
+        region = region or self.SIMULATED_PEERS.get(zone, ("unassigned", []))[0]
+        with self._peers_lock:
+            if not self._peers_loaded:
+                self.tree.update_zones({z: (r, self._peer_updates(z)) for z, (r, _) in self.SIMULATED_PEERS.items()})
+                self._peers_loaded = True
+        self.tree.upsert_farms(zone, region, {farm_id or uuid.uuid4().hex: local_update})
+        try:
+            # Releases below the noise level are never made; fall back to the lowest released level.
+            level = "region" if LEVELS.index(self.tree.noise_level) <= LEVELS.index("region") else "national"
+            regional = self.tree.release(level, region)
+            national = self.tree.release("national")
+        except PrivacyBudgetExceededError as e:
+            print(f"Federated aggregation refused: {e}")
+            return {
+                "regional_trends": {},
+                "peer_count": self.tree.farm_count(),
+                "description": "Regional trends withheld: the privacy budget is exhausted."
+            }
+        try:
+            # The averaged weight deltas are the federated model update, not agronomic trends.
+            model_update = self.tree.release_model()
+        except PrivacyBudgetExceededError as e:
+            print(f"Model update withheld: {e}")
+            model_update = {}
+
+        peer_count = self.tree.farm_count()
+        result = {
+            "regional_trends": regional,
+            "national_trends": national,
+            "global_model_update": model_update,
+            "peer_count": peer_count,
+            "description": (f"Aggregated insights from {peer_count} farms across {len(self.tree.regions())} regions "
+                            f"using zone/region/national DP-FedAvg (noise at the {self.tree.noise_level} level, "
+                            f"drawn once per round).")
         }
+        if self.tree.zone_reports.get(zone):
+            result["secure_aggregation"] = self.tree.zone_reports[zone]
+        return result
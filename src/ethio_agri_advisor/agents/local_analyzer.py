@@ -1,50 +1,155 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+import hashlib
+import hmac
+import re
+import secrets
+import threading
+import time
+import uuid
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import PydanticOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from ethio_agri_advisor.tools.privacy_engine import PrivacyEngine
+from ethio_agri_advisor.tools.privacy_accountant import get_privacy_accountant
+from ethio_agri_advisor.tools.local_model import farm_update
+from ethio_agri_advisor.tools.feature_extractor import FarmFeatures, FastFeatureExtractor
+from ethio_agri_advisor.tools.privacy_audit import get_scanner
 from ethio_agri_advisor.config import settings
-from typing import Dict, Any
+from ethio_agri_advisor.core.llm_registry import get_chat_model
+from functools import cached_property, lru_cache
+from typing import Dict, Any, Optional
+
+# Used for features neither the fast path nor the LLM could extract.
+DEFAULT_FEATURES = {"soil_ph": 6.5, "soil_nitrogen": 0.15, "crop_type": "teff"}
+
+@lru_cache(maxsize=1)
+def _farm_id_key() -> bytes:
+    """
+    Secret for farm ids, so an id cannot be reversed by hashing candidate phone numbers.
+    FARM_ID_KEY when set; otherwise generated once and kept at FARM_ID_KEY_PATH, so ids
+    survive restarts.
+    """
+    if settings.FARM_ID_KEY:
+        return settings.FARM_ID_KEY.encode("utf-8")
+    path = settings.FARM_ID_KEY_PATH
+    try:
+        return bytes.fromhex(path.read_text(encoding="utf-8").strip())
+    except (OSError, ValueError):
+        key = secrets.token_bytes(32)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(key.hex(), encoding="utf-8")
+            path.chmod(0o600)
+        except OSError as e:
+            print(f"Error saving farm id key (ids will change on restart): {e}")
+        return key
+
+def submitter_id(raw_input: str) -> Optional[str]:
+    """The submitter's phone number in raw_input, normalized to its last nine digits, if there is one."""
+    for label, start, end in get_scanner().scan(raw_input):
+        if label == "ethiopian_phone":
+            return re.sub(r"\D", "", raw_input[start:end])[-9:]
+    return None
+
+def farm_id(submitter: Optional[str]) -> str:
+    """
+    Opaque, stable id for a submitter (a phone number or session identity), so a farm's
+    resubmissions replace its federated update however its reported values change.
+    Without a submitter the input counts as a new farm.
+    """
+    if not submitter:
+        return uuid.uuid4().hex
+    return hmac.new(_farm_id_key(), submitter.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
 
 class LocalDataAnalyzerAgent:
     """
     Securely processes user-provided private inputs.
     Extracts features locally; never shares raw data.
+    Structured submissions (SMS/USSD forms) are parsed deterministically without an LLM
+    call; free text goes to the LLM with a schema-constrained (FarmFeatures) output.
     """
     
-    def __init__(self, model_name: str = None):
+    def __init__(self, model_name: str = None, use_cache: bool = True, fast_path: bool = None):
         self.model_name = model_name or settings.DEFAULT_MODEL_NAME
-        self.llm = ChatGoogleGenerativeAI(model=self.model_name, google_api_key=settings.GOOGLE_API_KEY)
-        self.privacy_engine = PrivacyEngine()
+        self.use_cache = use_cache
+        self.fast_path = settings.FEATURE_FAST_PATH_ENABLED if fast_path is None else fast_path
+        self.privacy_engine = PrivacyEngine(accountant=get_privacy_accountant())
+        self.extractor = FastFeatureExtractor()
+        self.parser = PydanticOutputParser(pydantic_object=FarmFeatures)
         self.prompt = ChatPromptTemplate.from_template(
             "You are a Local Data Analyzer for Ethiopian smallholders. "
             "Your task is to extract key agricultural features from the user's raw input. "
             "DO NOT include any personally identifiable information (PII) or exact locations. "
             "Focus on: crop type, soil conditions, and regional context.\n\n"
+            "{format_instructions}\n\n"
             "Raw Input: {input}"
-        )
+        ).partial(format_instructions=self.parser.get_format_instructions())
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "fast_path_hits": 0, "llm_calls": 0, "llm_seconds": 0.0, "parse_failures": 0}
+
+    @cached_property
+    def llm(self):
+        return get_chat_model(self.model_name, use_cache=self.use_cache)
 
-    def process(self, raw_input: str) -> Dict[str, Any]:
+    def _record(self, **increments):
+        with self._stats_lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+    def extraction_stats(self) -> Dict[str, Any]:
         """
-        Processes raw input and returns anonymized features.
+        Fast-path hit rate and the LLM latency it saved (hits x mean observed LLM latency).
         """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        mean_llm = stats["llm_seconds"] / stats["llm_calls"] if stats["llm_calls"] else 0.0
+        stats["hit_rate"] = stats["fast_path_hits"] / stats["requests"] if stats["requests"] else 0.0
+        stats["estimated_latency_saved_seconds"] = round(stats["fast_path_hits"] * mean_llm, 3)
+        return stats
+
+    def extract_features(self, raw_input: str) -> FarmFeatures:
+        """
+        Features for raw_input: the deterministic fast path when the input is a complete
+        structured form, otherwise the LLM's structured output. Fields the fast path found
+        in free text take precedence over the LLM's.
+        """
+        fast, complete = self.extractor.extract(raw_input)
+        if self.fast_path and complete:
+            self._record(requests=1, fast_path_hits=1)
+            return fast
+
         chain = self.prompt | self.llm
+        start = time.perf_counter()
         response = chain.invoke({"input": raw_input})
+        self._record(requests=1, llm_calls=1, llm_seconds=time.perf_counter() - start)
+        try:
+            parsed = self.parser.parse(response.content)
+        except OutputParserException:
+            # The model answered in prose; keep its text as the summary.
+            self._record(parse_failures=1)
+            parsed = FarmFeatures(summary=response.content)
+        found = fast.model_dump(exclude_none=True, exclude={"summary"})
+        return parsed.model_copy(update=found)
+
+    def process(self, raw_input: str, submitter: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Processes raw input and returns anonymized features. The farm is identified by
+        submitter, or else by the phone number in the input.
+        """
+        features = self.extract_features(raw_input)
+        extracted_features = {**DEFAULT_FEATURES, **features.model_dump(exclude_none=True, exclude={"summary"})}
         
-        # Parse the output into a structured dictionary for analysis.
-        # We also extract numeric features for federated updates.
-        
-        # Extracted features for analysis
-        extracted_features = {
-            "soil_ph": 6.2,
-            "soil_nitrogen": 0.15,
-            "crop_type": "teff",
-            "zone": "East Gojjam",
-            "region": "Amhara"
-        }
-        
-        anonymized_features = self.privacy_engine.anonymize_local_data(extracted_features)
+        # Local noise protects this farm's own values, so it is charged to the farm's budget;
+        # farms in the same zone do not share one.
+        fid = farm_id(submitter or submitter_id(raw_input))
+        anonymized_features = self.privacy_engine.anonymize_local_data(extracted_features, entity=f"farm:{fid}")
         
+        # Train the on-device yield model on the farm's history (raw features, never shared)
+        # and share only its clipped weight delta and the derived improvement potential.
+        gradient_update = farm_update(extracted_features)
+
         return {
-            "summary": response.content,
+            "summary": features.summary,
             "anonymized_features": anonymized_features,
-            "gradient_update": {"yield_improvement_potential": 0.12}
+            "gradient_update": gradient_update,
+            "farm_id": fid
         }
@@ -1,42 +1,120 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from ethio_agri_advisor.tools.privacy_audit import PrivacyAuditTool
+from ethio_agri_advisor.tools.ethics_audit import EthicsClassifier, get_ethics_classifier, parse_verdict, rule_flags
 from ethio_agri_advisor.config import settings
-from typing import Dict, Any, List
+from ethio_agri_advisor.core.llm_registry import get_chat_model
+from functools import cached_property
+from typing import Dict, Any, List, Optional
+import threading
+import time
+
+AUDIT_TIERS = ("rules", "classifier", "llm")
 
 class PrivacyAuditorAgent:
     """
     Monitors data flows for privacy leaks, bias, or ungrounded claims.
     Flags/intervenes if necessary.
+
+    Audits are tiered, cheapest first: PII and phrase rules reject clear violations,
+    a local classifier settles plans it is confident about, and only the uncertain
+    rest reach the LLM auditor.
     """
-    
-    def __init__(self, model_name: str = None):
+
+    def __init__(self, model_name: str = None, use_cache: bool = True):
         self.model_name = model_name or settings.DEFAULT_MODEL_NAME
-        self.llm = ChatGoogleGenerativeAI(model=self.model_name, google_api_key=settings.GOOGLE_API_KEY)
+        self.use_cache = use_cache
         self.audit_tool = PrivacyAuditTool()
         self.prompt = ChatPromptTemplate.from_template(
             "You are a Privacy and Ethics Auditor for an Ethiopian agricultural advisor system. "
             "Review the following proposed recommendation for privacy leaks (PII, exact GPS) and ethical alignment (cultural sensitivity, over-promising). "
-            "If you find issues, provide a rejection reason. Otherwise, approve it.\n\n"
+            "Start your reply with 'VERDICT: APPROVE' or 'VERDICT: REJECT'. If you reject it, give the reasons.\n\n"
             "Recommendation: {recommendation}"
         )
+        self._stats_lock = threading.Lock()
+        self._stats = {"audits": 0, "rules": 0, "classifier": 0, "llm": 0, "llm_seconds": 0.0}
+
+    @cached_property
+    def llm(self):
+        return get_chat_model(self.model_name, use_cache=self.use_cache)
+
+    @cached_property
+    def classifier(self) -> Optional[EthicsClassifier]:
+        return get_ethics_classifier()
+
+    def _record(self, tier: str, llm_seconds: float = 0.0):
+        with self._stats_lock:
+            self._stats["audits"] += 1
+            self._stats[tier] += 1
+            self._stats["llm_seconds"] += llm_seconds
+
+    def audit_stats(self) -> Dict[str, Any]:
+        """
+        Audits settled at each tier, their share of all audits, and the LLM latency
+        the earlier tiers saved (at the mean observed LLM audit time).
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        total = stats["audits"]
+        for tier in AUDIT_TIERS:
+            stats[f"{tier}_share"] = stats[tier] / total if total else 0.0
+        mean_llm = stats["llm_seconds"] / stats["llm"] if stats["llm"] else 0.0
+        stats["estimated_latency_saved_seconds"] = round((stats["rules"] + stats["classifier"]) * mean_llm, 3)
+        return stats
+
+    @staticmethod
+    def _verdict(is_approved: bool, tier: str, reasons: List[str], audit_log: str,
+                 tool_result: Dict[str, Any], scores: Dict[str, float]) -> Dict[str, Any]:
+        return {
+            "is_approved": is_approved,
+            "decision": "APPROVED" if is_approved else "REJECTED",
+            "tier": tier,
+            "reasons": reasons,
+            "scores": scores,
+            "audit_log": audit_log,
+            "tool_audit": tool_result
+        }
 
     def audit(self, recommendation: str) -> Dict[str, Any]:
         """
-        Audits the recommendation and returns status.
+        Audits the recommendation and returns a structured verdict: the decision, the tier
+        that settled it, the reasons for a rejection, the classifier scores and the PII scan.
         """
-        # 1. Tool-based audit
+        # 1. Rules: PII scan and phrases that are never acceptable
         tool_result = self.audit_tool.audit_content(recommendation)
-        
-        # 2. Ethical audit
+        flags = rule_flags(recommendation)
+        if not tool_result["is_safe"] or flags:
+            reasons = []
+            if tool_result["detected_leaks"]:
+                reasons.append(f"Sensitive data in the plan: {', '.join(tool_result['detected_leaks'])}.")
+            reasons += [f"{label.replace('_', ' ').capitalize()}: \"{phrase}\"." for label, phrase in flags]
+            self._record("rules")
+            return self._verdict(False, "rules", reasons, "Rejected by rule checks. " + " ".join(reasons), tool_result, {})
+
+        # 2. Local classifier: settle confident cases without the LLM
+        scores: Dict[str, float] = {}
+        if self.classifier is not None:
+            predictions = self.classifier.predict(recommendation)
+            scores = {label: p["probability"] for label, p in predictions.items()}
+            if max(scores.values()) < settings.AUDIT_APPROVE_BELOW:
+                self._record("classifier")
+                return self._verdict(True, "classifier", [], "Approved by the local classifier: no over-promising "
+                                     "or cultural-sensitivity signals.", tool_result, scores)
+            flagged = [label for label, p in scores.items() if p > settings.AUDIT_REJECT_ABOVE]
+            if flagged:
+                reasons = [f"{label.replace('_', ' ').capitalize()} (p={scores[label]:.2f}): "
+                           f"\"{predictions[label]['sentence']}\"" for label in flagged]
+                self._record("classifier")
+                return self._verdict(False, "classifier", reasons, "Rejected by the local classifier. " + " ".join(reasons),
+                                     tool_result, scores)
+
+        # 3. Ethical audit by the LLM for the uncertain rest
+        start = time.perf_counter()
         chain = self.prompt | self.llm
         response = chain.invoke({"recommendation": recommendation})
-        
-        is_approved = tool_result["is_safe"] and "approve" in response.content.lower()
-        
-        return {
-            "is_approved": is_approved,
-            "audit_log": response.content,
-            "tool_audit": tool_result,
-            "decision": "APPROVED" if is_approved else "REJECTED"
-        }
+        self._record("llm", time.perf_counter() - start)
+
+        verdict = parse_verdict(response.content)
+        is_approved = verdict is True
+        reasons = [] if is_approved else [response.content.strip() if verdict is False
+                                          else "The auditor gave no clear verdict."]
+        return self._verdict(is_approved, "llm", reasons, response.content, tool_result, scores)
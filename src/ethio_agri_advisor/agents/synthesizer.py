@@ -1,7 +1,8 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from ethio_agri_advisor.tools.translator import MultilingualTranslatorTool
 from ethio_agri_advisor.config import settings
+from ethio_agri_advisor.core.llm_registry import get_chat_model
+from functools import cached_property
 from typing import Dict, Any
 
 class SynthesizerAgent:
@@ -10,10 +11,9 @@ class SynthesizerAgent:
     Supports multilingual output.
     """
     
-    def __init__(self, model_name: str = None):
+    def __init__(self, model_name: str = None, use_cache: bool = True):
         self.model_name = model_name or settings.DEFAULT_MODEL_NAME
-        self.llm = ChatGoogleGenerativeAI(model=self.model_name, google_api_key=settings.GOOGLE_API_KEY)
-        self.translator = MultilingualTranslatorTool()
+        self.use_cache = use_cache
         self.prompt = ChatPromptTemplate.from_template(
             "You are a Master Synthesizer for Ethiopian agricultural advice. "
             "Compile the following recommendation into a farmer-friendly report. "
@@ -22,6 +22,14 @@ class SynthesizerAgent:
             "Audit Status: {audit_status}"
         )
 
+    @cached_property
+    def llm(self):
+        return get_chat_model(self.model_name, use_cache=self.use_cache)
+
+    @cached_property
+    def translator(self) -> MultilingualTranslatorTool:
+        return MultilingualTranslatorTool(model_name=self.model_name, use_cache=self.use_cache)
+
     def synthesize(self, recommendation: str, audit_status: str) -> Dict[str, Any]:
         """
         Compiles the final report and translates it.
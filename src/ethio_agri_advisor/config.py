@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -20,12 +20,113 @@ class Settings:
 
     # Model Configuration
     DEFAULT_MODEL_NAME: str = os.getenv("DEFAULT_MODEL_NAME", "gemini-1.5-flash")
+
+    # LLM Client Pool (shared by all agents; model names starting with "fake" use a local offline model)
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_REQUESTS_PER_SECOND: float = float(os.getenv("LLM_REQUESTS_PER_SECOND", "0")) # 0 disables rate limiting
+    LLM_RATE_LIMIT_BURST: float = float(os.getenv("LLM_RATE_LIMIT_BURST", "4"))
+    FAKE_LLM_LATENCY_SECONDS: float = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0"))
+
+    # LLM Response Cache (shared by all agents)
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_BACKEND: str = os.getenv("LLM_CACHE_BACKEND", "memory") # 'memory' or 'sqlite'
+    LLM_CACHE_PATH: Path = Path(os.getenv("LLM_CACHE_PATH", str(BASE_DIR / ".cache" / "llm.sqlite")))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+    LLM_CACHE_TTL_SECONDS: float = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
     
     # Data Files
     CROP_YIELDS_FILE: Path = DATA_DIR / "crop_yields.json"
+    GAZETTEER_FILE: Path = DATA_DIR / "ethiopia_gazetteer.csv"
+    GAZETTEER_INDEX_PATH: Path = Path(os.getenv("GAZETTEER_INDEX_PATH", str(BASE_DIR / ".cache" / "gazetteer.npy")))
+    GAZETTEER_FUZZY_CUTOFF: float = float(os.getenv("GAZETTEER_FUZZY_CUTOFF", "0.8")) # 1.0 disables fuzzy matching
+    CLIMATOLOGY_DIR: Path = Path(os.getenv("CLIMATOLOGY_DIR", str(DATA_DIR / "climatology"))) # built by tools/climatology.py
+    CLIMATOLOGY_SEASON: str = os.getenv("CLIMATOLOGY_SEASON", "kiremt") # 'kiremt' (Jun-Sep) or 'belg' (Feb-May)
     
+    # Yield Simulation (Monte Carlo rainfall/pH uncertainty; 0 disables sampling)
+    YIELD_SIMULATION_SAMPLES: int = int(os.getenv("YIELD_SIMULATION_SAMPLES", "10000"))
+    YIELD_SIMULATION_SEED: Optional[int] = int(os.environ["YIELD_SIMULATION_SEED"]) if os.getenv("YIELD_SIMULATION_SEED") else None
+    
+    # Offline-first mode: weather and search read only from the local snapshot store
+    OFFLINE_MODE: bool = os.getenv("OFFLINE_MODE", "false").lower() == "true"
+    SNAPSHOT_STORE_PATH: Path = Path(os.getenv("SNAPSHOT_STORE_PATH", str(BASE_DIR / ".cache" / "snapshots.sqlite")))
+    SNAPSHOT_SYNC_INTERVAL_SECONDS: float = float(os.getenv("SNAPSHOT_SYNC_INTERVAL_SECONDS", "900")) # 0 disables the background sync
+    SNAPSHOT_MAX_AGE_SECONDS: float = float(os.getenv("SNAPSHOT_MAX_AGE_SECONDS", "21600"))
+    GUIDELINES_CORPUS_FILE: Path = DATA_DIR / "moa_guidelines.jsonl"
+
+    # Local guideline retrieval (searched before Tavily; Tavily results are indexed)
+    GUIDELINE_INDEX_ENABLED: bool = os.getenv("GUIDELINE_INDEX_ENABLED", "true").lower() == "true"
+    GUIDELINE_INDEX_PATH: Path = Path(os.getenv("GUIDELINE_INDEX_PATH", str(BASE_DIR / ".cache" / "guidelines.sqlite")))
+    GUIDELINE_TOP_K: int = int(os.getenv("GUIDELINE_TOP_K", "3"))
+    GUIDELINE_MIN_COVERAGE: float = float(os.getenv("GUIDELINE_MIN_COVERAGE", "0.5")) # share of query terms the best passage must contain
+    GUIDELINE_VECTOR_INDEX: bool = os.getenv("GUIDELINE_VECTOR_INDEX", "false").lower() == "true" # int8 hashed-trigram vectors, fused with BM25
+
+    # Tiered audit: rules, then a local classifier, then the LLM only for uncertain plans
+    AUDIT_CLASSIFIER_ENABLED: bool = os.getenv("AUDIT_CLASSIFIER_ENABLED", "true").lower() == "true"
+    AUDIT_TRAINING_FILE: Path = Path(os.getenv("AUDIT_TRAINING_FILE", str(DATA_DIR / "audit_examples.jsonl")))
+    AUDIT_APPROVE_BELOW: float = float(os.getenv("AUDIT_APPROVE_BELOW", "0.2")) # every label below this: approve without the LLM
+    AUDIT_REJECT_ABOVE: float = float(os.getenv("AUDIT_REJECT_ABOVE", "0.9")) # any label above this: reject without the LLM
+
+    # Instrumentation (latency histograms and counters, dumped as JSON and Prometheus text on an interval and at exit)
+    INSTRUMENTATION_ENABLED: bool = os.getenv("INSTRUMENTATION_ENABLED", "true").lower() == "true"
+    METRICS_DUMP_DIR: str = os.getenv("METRICS_DUMP_DIR", str(BASE_DIR / ".cache" / "metrics")) # empty disables the dump
+    METRICS_DUMP_INTERVAL_SECONDS: float = float(os.getenv("METRICS_DUMP_INTERVAL_SECONDS", "60")) # 0 dumps only at exit
+
+    # Graph checkpointing (lets an interrupted session resume from its last completed node)
+    GRAPH_CHECKPOINTER: str = os.getenv("GRAPH_CHECKPOINTER", "none") # 'none', 'memory' or 'sqlite'
+    GRAPH_CHECKPOINT_PATH: Path = Path(os.getenv("GRAPH_CHECKPOINT_PATH", str(BASE_DIR / ".cache" / "checkpoints.sqlite")))
+
     # Weather Service
     WEATHER_API_BASE_URL: str = os.getenv("WEATHER_API_BASE_URL", "https://api.open-meteo.com/v1/forecast")
+    WEATHER_GRID_DEG: float = float(os.getenv("WEATHER_GRID_DEG", "0.1"))
+    WEATHER_CACHE_BACKEND: str = os.getenv("WEATHER_CACHE_BACKEND", "memory") # 'memory' or 'sqlite'
+    WEATHER_CACHE_TTL_SECONDS: float = float(os.getenv("WEATHER_CACHE_TTL_SECONDS", "3600"))
+    WEATHER_CACHE_MAX_ENTRIES: int = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "4096"))
+    WEATHER_CACHE_PATH: Path = Path(os.getenv("WEATHER_CACHE_PATH", str(BASE_DIR / ".cache" / "weather.sqlite")))
+    WEATHER_POOL_SIZE: int = int(os.getenv("WEATHER_POOL_SIZE", "16"))
+    WEATHER_TIMEOUT_SECONDS: float = float(os.getenv("WEATHER_TIMEOUT_SECONDS", "10"))
+
+    # Federated aggregation (pairwise-masked secure aggregation before DP-FedAvg)
+    SECURE_AGGREGATION_ENABLED: bool = os.getenv("SECURE_AGGREGATION_ENABLED", "true").lower() == "true"
+    SECURE_AGGREGATION_NEIGHBORS: int = int(os.getenv("SECURE_AGGREGATION_NEIGHBORS", "16"))
+    FEDERATED_NOISE_LEVEL: str = os.getenv("FEDERATED_NOISE_LEVEL", "region") # 'zone', 'region' or 'national'
+    FEDERATED_MAX_WORKERS: int = int(os.getenv("FEDERATED_MAX_WORKERS", "0")) # 0 uses every CPU
+    FEDERATED_PARALLEL_MIN_FARMS: int = int(os.getenv("FEDERATED_PARALLEL_MIN_FARMS", "200000"))
+    FEDERATED_ROUND_SECONDS: float = float(os.getenv("FEDERATED_ROUND_SECONDS", "21600")) # noisy totals are drawn once per round; 0: once per process
+    FEDERATED_MODEL_NOISE_MULTIPLIER: float = float(os.getenv("FEDERATED_MODEL_NOISE_MULTIPLIER", "4.0")) # Gaussian sigma / LOCAL_MODEL_CLIP_NORM for the model update; must be > 0
+    FEDERATED_MAX_FARMS_PER_ZONE: int = int(os.getenv("FEDERATED_MAX_FARMS_PER_ZONE", "10000")) # least recently updated farms are dropped beyond this
+    FARM_ID_KEY: str = os.getenv("FARM_ID_KEY", "") # HMAC key for farm ids; empty: generated once and kept at FARM_ID_KEY_PATH
+    FARM_ID_KEY_PATH: Path = Path(os.getenv("FARM_ID_KEY_PATH", str(BASE_DIR / ".cache" / "farm_id.key")))
+
+    # Privacy budget accounting (cumulative spend per farm/zone, persisted as an append-only ledger)
+    PRIVACY_ACCOUNTING_ENABLED: bool = os.getenv("PRIVACY_ACCOUNTING_ENABLED", "true").lower() == "true"
+    PRIVACY_BUDGET_EPSILON: float = float(os.getenv("PRIVACY_BUDGET_EPSILON", "3.0"))
+    PRIVACY_BUDGET_DELTA: float = float(os.getenv("PRIVACY_BUDGET_DELTA", "1e-5"))
+    PRIVACY_COMPOSITION: str = os.getenv("PRIVACY_COMPOSITION", "rdp") # 'basic', 'advanced' or 'rdp'
+    PRIVACY_LEDGER_PATH: Path = Path(os.getenv("PRIVACY_LEDGER_PATH", str(BASE_DIR / ".cache" / "privacy_ledger.jsonl")))
+    PRIVACY_BUDGET_WINDOW_SECONDS: float = float(os.getenv("PRIVACY_BUDGET_WINDOW_SECONDS", "0")) # 0: cumulative forever; opt-in reset window weakens the bound to per-window
+
+    # Feature extraction (deterministic fast path for structured SMS/USSD submissions)
+    FEATURE_FAST_PATH_ENABLED: bool = os.getenv("FEATURE_FAST_PATH_ENABLED", "true").lower() == "true"
+
+    # On-device yield model (trained on each farm's history for the federated round)
+    LOCAL_MODEL_HISTORY_SEASONS: int = int(os.getenv("LOCAL_MODEL_HISTORY_SEASONS", "24"))
+    LOCAL_MODEL_EPOCHS: int = int(os.getenv("LOCAL_MODEL_EPOCHS", "5"))
+    LOCAL_MODEL_BATCH_SIZE: int = int(os.getenv("LOCAL_MODEL_BATCH_SIZE", "8"))
+    LOCAL_MODEL_LEARNING_RATE: float = float(os.getenv("LOCAL_MODEL_LEARNING_RATE", "0.05"))
+    LOCAL_MODEL_CLIP_NORM: float = float(os.getenv("LOCAL_MODEL_CLIP_NORM", "1.0"))
+
+    # Streaming PII redaction of planner output
+    STREAM_REDACTION_ENABLED: bool = os.getenv("STREAM_REDACTION_ENABLED", "true").lower() == "true"
+    STREAM_REDACTION_LOOKBACK: int = int(os.getenv("STREAM_REDACTION_LOOKBACK", "64"))
+
+    # Translation
+    TRANSLATION_LANGUAGES: List[str] = [
+        lang.strip() for lang in os.getenv("TRANSLATION_LANGUAGES", "Amharic,Afaan Oromoo").split(",") if lang.strip()
+    ]
+    TRANSLATION_MAX_CONCURRENCY: int = int(os.getenv("TRANSLATION_MAX_CONCURRENCY", "4"))
+
+    # Climate Search
+    SEARCH_TIMEOUT_SECONDS: float = float(os.getenv("SEARCH_TIMEOUT_SECONDS", "15"))
 
     @classmethod
     def validate(cls):
@@ -0,0 +1,49 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Awaitable, Coroutine, Optional, TypeVar
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    """
+    The process-wide event loop that run_sync schedules onto, running in a daemon thread.
+    Long-lived, so per-loop resources such as pooled HTTP clients are reused across calls.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-runner", daemon=True).start()
+        return _loop
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Runs a coroutine to completion from synchronous code, on the shared background loop.
+    Called from a coroutine already on that loop, it runs on a fresh loop in a worker
+    thread instead of deadlocking.
+    """
+    loop = background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is not loop:
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+async def with_timeout(awaitable: Awaitable[T], timeout: float, fallback: Any, label: str = "call") -> T:
+    """
+    Awaits with a timeout budget, returning fallback on timeout or error.
+    """
+    try:
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError:
+        print(f"{label} timed out after {timeout}s; using fallback.")
+    except Exception as e:
+        print(f"{label} failed: {e}; using fallback.")
+    return fallback() if callable(fallback) else fallback
@@ -1,34 +1,100 @@
-from langgraph.graph import StateGraph, END
 from ethio_agri_advisor.core.state import AgentState
-from ethio_agri_advisor.agents.local_analyzer import LocalDataAnalyzerAgent
-from ethio_agri_advisor.agents.federated_collaborator import FederatedCollaboratorAgent
-from ethio_agri_advisor.agents.crop_planner import CropWeatherPlannerAgent
-from ethio_agri_advisor.agents.privacy_auditor import PrivacyAuditorAgent
-from ethio_agri_advisor.agents.synthesizer import SynthesizerAgent
-from typing import Dict, Any
+from ethio_agri_advisor.config import settings
+from ethio_agri_advisor.core.instrumentation import get_instrumentation
+from functools import cached_property
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+import threading
+import uuid
+
+class locked_cached_property(cached_property):
+    """
+    cached_property whose first computation runs under the owner's `_agents_lock`, so
+    concurrent first uses (run_batch workers) build one agent rather than one each.
+    Later reads are plain dict lookups and take no lock; assignment still overrides it.
+    """
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        cache = instance.__dict__
+        if self.attrname not in cache:
+            with instance._agents_lock:
+                if self.attrname not in cache:
+                    cache[self.attrname] = self.func(instance)
+        return cache[self.attrname]
 
 class AgriAdvisorGraph:
     """
     Orchestrates the multi-agent flow using LangGraph.
+    Agents (and their LLM clients and tools) are built on first use, so runs that
+    never reach a node never pay for its agent.
+    With a checkpointer, every run is a thread whose state is saved after each node,
+    so a run interrupted by an error can be resumed from its last completed node.
     """
     
-    def __init__(self):
-        self.local_analyzer = LocalDataAnalyzerAgent()
-        self.federated_collaborator = FederatedCollaboratorAgent()
-        self.crop_planner = CropWeatherPlannerAgent()
-        self.privacy_auditor = PrivacyAuditorAgent()
-        self.synthesizer = SynthesizerAgent()
-        
+    def __init__(self, checkpointer=None):
+        # langgraph is imported here rather than at module level to keep CLI import time low.
+        from langgraph.graph import StateGraph
+        self._agents_lock = threading.RLock()
+        # Raw farmer input, keyed by the input_ref carried in graph state; never checkpointed.
+        self._raw_inputs: Dict[str, str] = {}
+        self._raw_inputs_lock = threading.Lock()
+        self.checkpointer = checkpointer if checkpointer is not None else self._default_checkpointer()
         self.workflow = StateGraph(AgentState)
         self._build_graph()
 
+    @staticmethod
+    def _default_checkpointer():
+        """The checkpointer selected by GRAPH_CHECKPOINTER, or None."""
+        if settings.GRAPH_CHECKPOINTER == "memory":
+            from langgraph.checkpoint.memory import MemorySaver
+            return MemorySaver()
+        if settings.GRAPH_CHECKPOINTER == "sqlite":
+            try:
+                from langgraph.checkpoint.sqlite import SqliteSaver
+            except ImportError as e:
+                raise ImportError("GRAPH_CHECKPOINTER=sqlite needs langgraph-checkpoint-sqlite: "
+                                  "pip install langgraph-checkpoint-sqlite") from e
+            import sqlite3
+            settings.GRAPH_CHECKPOINT_PATH.parent.mkdir(parents=True, exist_ok=True)
+            return SqliteSaver(sqlite3.connect(str(settings.GRAPH_CHECKPOINT_PATH), check_same_thread=False))
+        return None
+
+    # Agents
+    @locked_cached_property
+    def local_analyzer(self):
+        from ethio_agri_advisor.agents.local_analyzer import LocalDataAnalyzerAgent
+        return LocalDataAnalyzerAgent()
+
+    @locked_cached_property
+    def federated_collaborator(self):
+        from ethio_agri_advisor.agents.federated_collaborator import FederatedCollaboratorAgent
+        return FederatedCollaboratorAgent()
+
+    @locked_cached_property
+    def crop_planner(self):
+        from ethio_agri_advisor.agents.crop_planner import CropWeatherPlannerAgent
+        return CropWeatherPlannerAgent()
+
+    @locked_cached_property
+    def privacy_auditor(self):
+        from ethio_agri_advisor.agents.privacy_auditor import PrivacyAuditorAgent
+        return PrivacyAuditorAgent()
+
+    @locked_cached_property
+    def synthesizer(self):
+        from ethio_agri_advisor.agents.synthesizer import SynthesizerAgent
+        return SynthesizerAgent()
+
     def _build_graph(self):
-        # Define Nodes
-        self.workflow.add_node("local_analysis", self.node_local_analysis)
-        self.workflow.add_node("federated_collaboration", self.node_federated_collaboration)
-        self.workflow.add_node("crop_planning", self.node_crop_planning)
-        self.workflow.add_node("privacy_audit", self.node_privacy_audit)
-        self.workflow.add_node("synthesis", self.node_synthesis)
+        from langgraph.graph import END
+
+        # Define Nodes (each timed into advisor_node_seconds)
+        self.workflow.add_node("local_analysis", self._timed("local_analysis", self.node_local_analysis))
+        self.workflow.add_node("federated_collaboration", self._timed("federated_collaboration", self.node_federated_collaboration))
+        self.workflow.add_node("crop_planning", self._timed("crop_planning", self.node_crop_planning))
+        self.workflow.add_node("privacy_audit", self._timed("privacy_audit", self.node_privacy_audit))
+        self.workflow.add_node("synthesis", self._timed("synthesis", self.node_synthesis))
 
         # Define Edges
         self.workflow.set_entry_point("local_analysis")
@@ -49,13 +115,155 @@ class AgriAdvisorGraph:
         
         self.workflow.add_edge("synthesis", END)
         
-        self.app = self.workflow.compile()
+        self.app = self.workflow.compile(checkpointer=self.checkpointer)
+
+    @staticmethod
+    def _timed(name: str, node: Callable[[AgentState], Dict[str, Any]]) -> Callable[[AgentState], Dict[str, Any]]:
+        def timed_node(state: AgentState) -> Dict[str, Any]:
+            with get_instrumentation().timer("advisor_node_seconds", node=name):
+                return node(state)
+        return timed_node
+
+    def initial_state(self, user_input: str, max_iterations: int = 3) -> Dict[str, Any]:
+        """
+        Builds the initial graph state for one farmer's input. Every per-run key is reset so
+        that a run on a reused checkpoint thread inherits nothing from the previous run; the
+        additive keys are overwritten rather than passed through their reducers.
+        The raw input (names, phone numbers) never enters graph state, since checkpointers keep
+        every step's state: it is held in memory under input_ref until local analysis reads it.
+        """
+        from langgraph.types import Overwrite
+        input_ref = uuid.uuid4().hex
+        with self._raw_inputs_lock:
+            self._raw_inputs[input_ref] = user_input
+        return {
+            "input_ref": input_ref,
+            "local_analysis": None,
+            "regional_insights": None,
+            "recommendation": None,
+            "planning_context": None,
+            "audit_results": None,
+            "final_report": None,
+            "iteration_count": 0,
+            "max_iterations": max_iterations,
+            "status": "analyzing",
+            "refine_loops_avoided": Overwrite(0),
+            "messages": Overwrite(["Starting advisor session..."])
+        }
+
+    def _release_inputs(self, states: List[Dict[str, Any]]) -> None:
+        """Drops the held raw input of runs that ended before local analysis consumed it."""
+        with self._raw_inputs_lock:
+            for state in states:
+                self._raw_inputs.pop(state["input_ref"], None)
+
+    def _config(self, thread_id: Optional[str] = None, **config: Any) -> Dict[str, Any]:
+        """Run config; with a checkpointer each run needs its own thread_id."""
+        if self.checkpointer is not None:
+            config["configurable"] = {"thread_id": thread_id or uuid.uuid4().hex}
+        return config
+
+    def _batch_configs(self, n: int, max_concurrency: int):
+        if self.checkpointer is None:
+            return {"max_concurrency": max_concurrency}
+        return [self._config(max_concurrency=max_concurrency) for _ in range(n)]
+
+    def run(self, user_input: str, max_iterations: int = 3, thread_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Runs one farmer's input through the graph. With a checkpointer, thread_id names the
+        session so that resume(thread_id) can pick it up if the run is interrupted.
+        """
+        metrics = get_instrumentation()
+        metrics.start_dumping()
+        state = self.initial_state(user_input, max_iterations)
+        try:
+            with metrics.timer("advisor_session_seconds"):
+                return self.app.invoke(state, config=self._config(thread_id))
+        finally:
+            self._release_inputs([state])
+
+    def resume(self, thread_id: str) -> Dict[str, Any]:
+        """
+        Continues an interrupted session from its last completed node; completed nodes
+        are not re-run. A finished session just returns its final state.
+        """
+        if self.checkpointer is None:
+            raise ValueError("resume needs a checkpointer (set GRAPH_CHECKPOINTER or pass one to AgriAdvisorGraph).")
+        config = self._config(thread_id)
+        snapshot = self.app.get_state(config)
+        if not snapshot.values:
+            raise KeyError(f"No checkpoint for thread {thread_id}.")
+        if not snapshot.next:
+            return snapshot.values
+        get_instrumentation().start_dumping()
+        return self.app.invoke(None, config=config)
+
+    @staticmethod
+    def _batch_result(index: int, user_input: str, output: Any) -> Dict[str, Any]:
+        failed = isinstance(output, Exception)
+        return {
+            "index": index,
+            "user_input": user_input,
+            "ok": not failed,
+            "state": None if failed else output,
+            "error": f"{type(output).__name__}: {output}" if failed else None
+        }
+
+    def iter_batch(self, inputs: List[str], max_concurrency: int = 4, max_iterations: int = 3) -> Iterator[Dict[str, Any]]:
+        """
+        Runs many farms through the graph, yielding each result as soon as that farm finishes.
+        All items share this graph's agents and their tool and LLM caches.
+        A failing item is reported with ok=False and does not abort the batch.
+        """
+        states = [self.initial_state(user_input, max_iterations) for user_input in inputs]
+        try:
+            for index, output in self.app.batch_as_completed(
+                states, config=self._batch_configs(len(states), max_concurrency), return_exceptions=True
+            ):
+                yield self._batch_result(index, inputs[index], output)
+        finally:
+            self._release_inputs(states)
+
+    async def aiter_batch(self, inputs: List[str], max_concurrency: int = 4, max_iterations: int = 3) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async variant of iter_batch.
+        """
+        states = [self.initial_state(user_input, max_iterations) for user_input in inputs]
+        try:
+            async for index, output in self.app.abatch_as_completed(
+                states, config=self._batch_configs(len(states), max_concurrency), return_exceptions=True
+            ):
+                yield self._batch_result(index, inputs[index], output)
+        finally:
+            self._release_inputs(states)
+
+    def run_batch(self, inputs: List[str], max_concurrency: int = 4, max_iterations: int = 3,
+                  on_result: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Runs many farms through the graph and returns results in input order.
+        on_result, if given, is called with each result as it completes.
+        """
+        get_instrumentation().start_dumping()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(inputs)
+        for result in self.iter_batch(inputs, max_concurrency=max_concurrency, max_iterations=max_iterations):
+            results[result["index"]] = result
+            if on_result:
+                on_result(result)
+        return results
 
     # Node Functions
     def node_local_analysis(self, state: AgentState) -> Dict[str, Any]:
         print("--- Node: Local Analysis ---")
-        result = self.local_analyzer.process(state["user_input"])
+        with self._raw_inputs_lock:
+            user_input = self._raw_inputs.get(state["input_ref"])
+        if user_input is None:
+            raise KeyError("The raw input for this session is not checkpointed and is no longer held in memory; "
+                           "start a new run with the farmer's input.")
+        result = self.local_analyzer.process(user_input)
+        with self._raw_inputs_lock:
+            self._raw_inputs.pop(state["input_ref"], None)
         return {
+            # Only the anonymized analysis moves on; the raw input was never part of the state.
             "local_analysis": result,
             "status": "collaborating",
             "messages": ["Local analysis complete. Features anonymized."]
@@ -64,7 +272,11 @@ class AgriAdvisorGraph:
     def node_federated_collaboration(self, state: AgentState) -> Dict[str, Any]:
         print("--- Node: Federated Collaboration ---")
         local_update = state["local_analysis"]["gradient_update"]
-        result = self.federated_collaborator.aggregate_insights(local_update)
+        features = state["local_analysis"]["anonymized_features"]
+        result = self.federated_collaborator.aggregate_insights(
+            local_update, zone=features.get("zone"), region=features.get("region"),
+            farm_id=state["local_analysis"].get("farm_id")
+        )
         return {
             "regional_insights": result,
             "status": "planning",
@@ -73,15 +285,32 @@ class AgriAdvisorGraph:
 
     def node_crop_planning(self, state: AgentState) -> Dict[str, Any]:
         print("--- Node: Crop Planning ---")
-        result = self.crop_planner.plan(
-            local_summary=state["local_analysis"]["summary"],
-            regional_trends=state["regional_insights"]["regional_trends"],
-            anonymized_features=state["local_analysis"]["anonymized_features"]
-        )
+        audit = state.get("audit_results")
+        if audit and not audit["is_approved"] and state.get("recommendation"):
+            # Refine: the context is unchanged, so only rewrite what the audit rejected.
+            result = self.crop_planner.revise(state["recommendation"], self.crop_planner.rejection_reasons(audit))
+            context = state["planning_context"]
+            message = "Crop plan revised to address the audit findings."
+        else:
+            context = state.get("planning_context") or self.crop_planner.prepare_context(
+                state["local_analysis"]["anonymized_features"]
+            )
+            result = self.crop_planner.plan(
+                local_summary=state["local_analysis"]["summary"],
+                regional_trends=state["regional_insights"]["regional_trends"],
+                anonymized_features=state["local_analysis"]["anonymized_features"],
+                context=context
+            )
+            message = "Crop plan generated based on regional and local data."
+        redactions = self.crop_planner.last_stream_stats.get("redactions", 0)
+        if redactions:
+            message += f" {redactions} PII span(s) redacted in-stream."
         return {
             "recommendation": result,
+            "planning_context": context,
             "status": "auditing",
-            "messages": ["Crop plan generated based on regional and local data."]
+            "refine_loops_avoided": 1 if redactions else 0,
+            "messages": [message]
         }
 
     def node_privacy_audit(self, state: AgentState) -> Dict[str, Any]:
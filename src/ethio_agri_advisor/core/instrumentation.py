@@ -0,0 +1,278 @@
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import numpy as np
+from ethio_agri_advisor.config import settings
+
+# Cumulative bucket bounds (seconds) for the Prometheus export; the histogram itself is finer.
+PROMETHEUS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REPORTED_PERCENTILES = (50, 90, 95, 99, 99.9)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class LatencyHistogram:
+    """
+    HDR-style latency histogram: log-linear buckets over integer microseconds with
+    2**sub_bucket_bits buckets per power of two, so every recorded value is known to
+    within 1 / 2**(sub_bucket_bits - 1) (about 3% by default) from 1 µs to days.
+    Recording is O(1) and memory is a fixed array of counts, so it can stay on in production.
+    """
+
+    def __init__(self, sub_bucket_bits: int = 6, max_bits: int = 42):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_value = (1 << max_bits) - 1
+        # A plain list: incrementing one element is several times cheaper than on an ndarray.
+        self.counts = [0] * (self._index(self.max_value) + 1)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.min_us = 0
+        self.max_us = 0
+        self._lock = threading.Lock()
+
+    def _index(self, value: int) -> int:
+        s = self.sub_bucket_bits
+        if value < (1 << s):
+            return value
+        shift = value.bit_length() - s
+        return (1 << s) + (shift - 1) * (1 << (s - 1)) + ((value >> shift) - (1 << (s - 1)))
+
+    def _upper_bound(self, index: int) -> int:
+        """Largest value that falls in bucket index."""
+        s = self.sub_bucket_bits
+        if index < (1 << s):
+            return index
+        shift, offset = divmod(index - (1 << s), 1 << (s - 1))
+        shift += 1
+        return (((1 << (s - 1)) + offset + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        value = min(max(int(seconds * 1e6), 0), self.max_value)
+        index = self._index(value)
+        with self._lock:
+            self.counts[index] += 1
+            self.min_us = value if self.count == 0 else min(self.min_us, value)
+            self.max_us = max(self.max_us, value)
+            self.count += 1
+            self.total_seconds += seconds
+
+    def percentile(self, q: float) -> float:
+        """Value (seconds) at or below which q percent of recordings fall, clamped to the observed range."""
+        with self._lock:
+            if self.count == 0:
+                return 0.0
+            rank = max(1, int(np.ceil(q / 100.0 * self.count)))
+            index = int(np.searchsorted(np.cumsum(self.counts), rank))
+            return min(max(self._upper_bound(index), self.min_us), self.max_us) / 1e6
+
+    def cumulative_counts(self, bounds: Tuple[float, ...]) -> List[int]:
+        """Recordings whose bucket lies entirely at or below each bound (seconds)."""
+        with self._lock:
+            cumulative = np.cumsum(self.counts)
+        result = []
+        for bound in bounds:
+            index = self._index(min(int(bound * 1e6), self.max_value))
+            # The bucket containing the bound only counts if the bound is its upper edge.
+            if self._upper_bound(index) > int(bound * 1e6):
+                index -= 1
+            result.append(int(cumulative[index]) if index >= 0 else 0)
+        return result
+
+    def summary(self) -> Dict[str, Any]:
+        count = self.count
+        result = {
+            "count": count,
+            "sum_seconds": round(self.total_seconds, 6),
+            "mean_seconds": round(self.total_seconds / count, 6) if count else 0.0,
+            "min_seconds": self.min_us / 1e6,
+            "max_seconds": self.max_us / 1e6
+        }
+        result.update({f"p{q:g}_seconds": self.percentile(q) for q in REPORTED_PERCENTILES})
+        return result
+
+class Instrumentation:
+    """
+    Process-wide metrics registry: latency histograms and counters, each keyed by a
+    metric name and a set of labels. Exported as JSON or Prometheus text and written
+    to files, so no collector has to be running. Disabled, every call is a no-op.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = settings.INSTRUMENTATION_ENABLED if enabled is None else enabled
+        self.histograms: Dict[str, Dict[LabelKey, LatencyHistogram]] = {}
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._stop_dumping = threading.Event()
+        self._dump_thread: Optional[threading.Thread] = None
+        self._dump_at_exit = False
+
+    @staticmethod
+    def _key(labels: Dict[str, Any]) -> LabelKey:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def histogram(self, name: str, **labels: Any) -> LatencyHistogram:
+        key = self._key(labels)
+        family = self.histograms.get(name)
+        histogram = family.get(key) if family is not None else None
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, {}).setdefault(key, LatencyHistogram())
+        return histogram
+
+    def observe(self, name: str, seconds: float, **labels: Any):
+        if self.enabled:
+            self.histogram(name, **labels).record(seconds)
+
+    def count(self, name: str, value: float = 1, **labels: Any):
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            family = self.counters.setdefault(name, {})
+            family[key] = family.get(key, 0) + value
+
+    @contextmanager
+    def _timed(self, name: str, labels: Dict[str, Any]) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.count(f"{name}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timer(self, name: str, **labels: Any):
+        """
+        Context manager timing its body into histogram name (monotonic clock). Errors are
+        also counted in name_errors_total. Works around awaits in coroutines too.
+        """
+        return self._timed(name, labels) if self.enabled else nullcontext()
+
+    def cache_lookup(self, cache: str, hit: bool):
+        self.count("advisor_cache_lookups_total", cache=cache, result="hit" if hit else "miss")
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.started_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics as plain data: histogram summaries and counter values, per label set."""
+        with self._lock:
+            histograms = {name: dict(family) for name, family in self.histograms.items()}
+            counters = {name: dict(family) for name, family in self.counters.items()}
+        return {
+            "started_at": self.started_at,
+            "exported_at": time.time(),
+            "histograms": {name: [{"labels": dict(key), **h.summary()} for key, h in family.items()]
+                           for name, family in histograms.items()},
+            "counters": {name: [{"labels": dict(key), "value": value} for key, value in family.items()]
+                         for name, family in counters.items()}
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    @staticmethod
+    def _labels(key: LabelKey, extra: str = "") -> str:
+        parts = [f'{k}="{v}"' for k, v in key]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (histograms with cumulative le buckets)."""
+        with self._lock:
+            histograms = {name: dict(family) for name, family in self.histograms.items()}
+            counters = {name: dict(family) for name, family in self.counters.items()}
+        lines = []
+        for name, family in sorted(counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            lines += [f"{name}{self._labels(key)} {value:g}" for key, value in family.items()]
+        for name, family in sorted(histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in family.items():
+                bounds = [f"{bound:g}" for bound in PROMETHEUS_BUCKETS] + ["+Inf"]
+                counts = histogram.cumulative_counts(PROMETHEUS_BUCKETS) + [histogram.count]
+                for bound, n in zip(bounds, counts):
+                    labels = self._labels(key, 'le="' + bound + '"')
+                    lines.append(f"{name}_bucket{labels} {n}")
+                lines.append(f"{name}_sum{self._labels(key)} {histogram.total_seconds:.6f}")
+                lines.append(f"{name}_count{self._labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, directory: Optional[Union[str, Path]] = None, name: str = "latest") -> Optional[Path]:
+        """
+        Writes <name>.json and <name>.prom to directory (METRICS_DUMP_DIR by default) and
+        returns the JSON path. Each file is replaced atomically. None when nothing is written.
+        """
+        directory = directory or settings.METRICS_DUMP_DIR
+        if not self.enabled or not directory:
+            return None
+        directory = Path(directory)
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            for suffix, content in ((".json", self.to_json()), (".prom", self.to_prometheus())):
+                tmp = directory / f".{name}{suffix}.tmp"
+                tmp.write_text(content, encoding="utf-8")
+                os.replace(tmp, directory / f"{name}{suffix}")
+        except OSError as e:
+            print(f"Error writing metrics dump: {e}")
+            return None
+        return directory / f"{name}.json"
+
+    def _dump_loop(self, interval_seconds: float, directory: Union[str, Path]):
+        while not self._stop_dumping.wait(interval_seconds):
+            self.dump(directory)
+
+    def start_dumping(self, interval_seconds: Optional[float] = None, directory: Optional[Union[str, Path]] = None) -> bool:
+        """
+        Dumps every interval_seconds (METRICS_DUMP_INTERVAL_SECONDS) from a daemon thread and
+        once more at interpreter exit, so runs never write files themselves. A zero interval
+        dumps at exit only. Idempotent; False when dumping is disabled.
+        """
+        directory = directory or settings.METRICS_DUMP_DIR
+        if not self.enabled or not directory:
+            return False
+        interval_seconds = settings.METRICS_DUMP_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        with self._lock:
+            if not self._dump_at_exit:
+                atexit.register(self.dump, directory)
+                self._dump_at_exit = True
+            if interval_seconds > 0 and (self._dump_thread is None or not self._dump_thread.is_alive()):
+                self._stop_dumping.clear()
+                self._dump_thread = threading.Thread(target=self._dump_loop, args=(interval_seconds, directory),
+                                                     name="metrics-dump", daemon=True)
+                self._dump_thread.start()
+        return True
+
+    def stop_dumping(self, timeout: Optional[float] = None):
+        self._stop_dumping.set()
+        if self._dump_thread is not None:
+            self._dump_thread.join(timeout)
+
+@lru_cache(maxsize=1)
+def get_instrumentation() -> Instrumentation:
+    """Returns the process-wide metrics registry."""
+    return Instrumentation()
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for providers that report no usage."""
+    return max(1, len(text) // 4) if text else 0
+
+# Example usage
+if __name__ == "__main__":
+    metrics = Instrumentation(enabled=True)
+    for ms in (3, 5, 8, 120):
+        metrics.observe("advisor_node_seconds", ms / 1e3, node="demo")
+    metrics.count("advisor_llm_tokens_total", 42, model="fake", direction="output")
+    print(metrics.to_prometheus())
@@ -0,0 +1,116 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+from langchain_core.caches import BaseCache
+from langchain_core.messages import messages_from_dict, messages_to_dict
+from langchain_core.outputs import ChatGeneration, Generation
+from ethio_agri_advisor.config import settings
+from ethio_agri_advisor.core.cache import create_cache
+from ethio_agri_advisor.core.instrumentation import get_instrumentation
+
+class LLMResponseCache(BaseCache):
+    """
+    Content-addressed LLM response cache shared by all agents.
+    Entries are keyed on a hash of the model's identifying string (model name and
+    parameters) and the rendered prompt, and stored in a MemoryCache or SQLiteCache backend.
+    Each entry also records how long the original call took, so hits report saved latency.
+    """
+
+    # Misses whose call failed never reach update(); their start times are dropped once
+    # older than this, or oldest first beyond MAX_PENDING_MISSES.
+    MAX_PENDING_MISSES = 1024
+    PENDING_MISS_TTL_SECONDS = 600.0
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.saved_latency_seconds = 0.0
+        self._miss_started: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _start_miss(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            self._miss_started.pop(key, None)
+            self._miss_started[key] = now
+            while self._miss_started:
+                oldest_key, started = next(iter(self._miss_started.items()))
+                if len(self._miss_started) <= self.MAX_PENDING_MISSES and now - started <= self.PENDING_MISS_TTL_SECONDS:
+                    break
+                del self._miss_started[oldest_key]
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _serialize(generations: Sequence[Generation]) -> list:
+        serialized = []
+        for gen in generations:
+            if isinstance(gen, ChatGeneration):
+                serialized.append({"message": messages_to_dict([gen.message])[0]})
+            else:
+                serialized.append({"text": gen.text})
+        return serialized
+
+    @staticmethod
+    def _deserialize(serialized: list) -> list:
+        generations = []
+        for item in serialized:
+            if "message" in item:
+                generations.append(ChatGeneration(message=messages_from_dict([item["message"]])[0]))
+            else:
+                generations.append(Generation(text=item["text"]))
+        return generations
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = self._key(prompt, llm_string)
+        entry = self.backend.get(key)
+        get_instrumentation().cache_lookup("llm", entry is not None)
+        if entry is None:
+            self._start_miss(key)
+            return None
+        with self._lock:
+            self.saved_latency_seconds += entry.get("latency", 0.0)
+        return self._deserialize(entry["generations"])
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            started = self._miss_started.pop(key, None)
+        latency = time.monotonic() - started if started is not None else 0.0
+        self.backend.set(key, {"generations": self._serialize(return_val), "latency": latency})
+
+    def clear(self, **kwargs: Any) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.backend.stats(), "saved_latency_seconds": round(self.saved_latency_seconds, 3)}
+
+_llm_cache: Optional[LLMResponseCache] = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Returns the process-wide LLM response cache, or None when caching is disabled.
+    """
+    global _llm_cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMResponseCache(create_cache(
+                settings.LLM_CACHE_BACKEND,
+                path=settings.LLM_CACHE_PATH,
+                max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                ttl_seconds=settings.LLM_CACHE_TTL_SECONDS
+            ))
+        return _llm_cache
+
+def llm_cache_option(use_cache: bool = True):
+    """
+    Value for a chat model's `cache` field: the shared cache, or False to opt out.
+    """
+    cache = get_llm_cache() if use_cache else None
+    return cache if cache is not None else False
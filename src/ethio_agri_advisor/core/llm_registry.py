@@ -0,0 +1,321 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Iterator, AsyncIterator, List, Optional, Sequence, Tuple
+from langchain_core.caches import BaseCache
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult, Generation
+from langchain_core.rate_limiters import InMemoryRateLimiter
+from pydantic import ConfigDict
+from ethio_agri_advisor.config import settings
+from ethio_agri_advisor.core.llm_cache import llm_cache_option
+from ethio_agri_advisor.core.instrumentation import estimate_tokens, get_instrumentation
+
+class ConcurrencyLimiter:
+    """
+    Process-wide cap on in-flight LLM calls, shared by every pooled model.
+    Usable from threads and from coroutines on any event loop.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def _enter(self):
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._semaphore.release()
+
+    @contextmanager
+    def slot(self):
+        self._semaphore.acquire()
+        self._enter()
+        try:
+            yield
+        finally:
+            self._exit()
+
+    @asynccontextmanager
+    async def aslot(self):
+        # Polling keeps the event loop free while every slot is taken.
+        while not self._semaphore.acquire(blocking=False):
+            await asyncio.sleep(0.005)
+        self._enter()
+        try:
+            yield
+        finally:
+            self._exit()
+
+class LocalFakeChatModel(BaseChatModel):
+    """
+    Deterministic offline chat model for tests, demos and benchmarks.
+    Selected by any model name starting with "fake". Replies with a fixed
+    recommendation after a configurable latency and streams it word by word.
+    """
+
+    response: str = (
+        "Approve. Plant drought-tolerant, early-maturing varieties at the onset of the main rains, "
+        "use ridge tillage to conserve moisture and apply lime where the soil is acidic."
+    )
+    latency_seconds: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "local-fake-chat-model"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"response": self.response}
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    def _tokens(self) -> List[str]:
+        words = self.response.split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        tokens = self._tokens()
+        for token in tokens:
+            if self.latency_seconds:
+                time.sleep(self.latency_seconds / len(tokens))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = self._tokens()
+        for token in tokens:
+            if self.latency_seconds:
+                await asyncio.sleep(self.latency_seconds / len(tokens))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+class PooledChatModel(BaseChatModel):
+    """
+    Chat model handle drawn from the ModelRegistry.
+    Delegates to a shared client, holding a global concurrency slot for each call.
+    Caching and the per-model token-bucket rate limiter apply before a slot is taken,
+    so cache hits never take a slot; streamed calls read and fill the same cache.
+    Each call that reaches the client is timed and its tokens counted (provider usage
+    when reported, else an estimate).
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: Any
+    limiter: Any
+    model_name: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        return f"pooled-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.inner._identifying_params
+
+    def _timer(self):
+        metrics = get_instrumentation()
+        metrics.count("advisor_llm_calls_total", model=self.model_name)
+        return metrics.timer("advisor_llm_seconds", model=self.model_name)
+
+    def _count_tokens(self, messages: List[BaseMessage], text: str, usage: Optional[Dict[str, Any]]):
+        metrics = get_instrumentation()
+        if not metrics.enabled:
+            return
+        if usage:
+            input_tokens, output_tokens = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        else:
+            input_tokens = sum(estimate_tokens(m.content) for m in messages if isinstance(m.content, str))
+            output_tokens = estimate_tokens(text)
+        metrics.count("advisor_llm_tokens_total", input_tokens, model=self.model_name, direction="input")
+        metrics.count("advisor_llm_tokens_total", output_tokens, model=self.model_name, direction="output")
+
+    def _record_result(self, messages: List[BaseMessage], result: ChatResult) -> ChatResult:
+        message = result.generations[0].message if result.generations else None
+        self._count_tokens(messages, message.content if message is not None and isinstance(message.content, str) else "",
+                           getattr(message, "usage_metadata", None))
+        return result
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        with self.limiter.slot(), self._timer():
+            result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        return self._record_result(messages, result)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        async with self.limiter.aslot():
+            with self._timer():
+                result = await self.inner._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        return self._record_result(messages, result)
+
+    def _cache_entry(self, messages: List[BaseMessage], stop=None, **kwargs) -> Optional[Tuple[BaseCache, str, str]]:
+        """
+        The response cache with this call's prompt and model strings, keyed as invoke keys
+        them, so streamed and invoked calls share entries. None when caching is off.
+        """
+        if not isinstance(self.cache, BaseCache):
+            return None
+        normalized = [m.model_copy(update={"id": None}) if getattr(m, "id", None) is not None else m for m in messages]
+        return self.cache, dumps(normalized), self._get_llm_string(stop=stop, **kwargs)
+
+    @staticmethod
+    def _cached_chunk(cached: Optional[Sequence[Generation]]) -> Optional[ChatGenerationChunk]:
+        if not cached:
+            return None
+        generation = cached[0]
+        content = generation.message.content if isinstance(generation, ChatGeneration) else generation.text
+        return ChatGenerationChunk(message=AIMessageChunk(content=content))
+
+    @staticmethod
+    def _cached_generations(text: str) -> List[ChatGeneration]:
+        return [ChatGeneration(message=AIMessage(content=text))]
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        # Streaming bypasses BaseChatModel's cache lookup, so a hit is replayed here as one
+        # chunk without taking a slot, and a completed stream is written back.
+        entry = self._cache_entry(messages, stop=stop, **kwargs)
+        cached = self._cached_chunk(entry[0].lookup(entry[1], entry[2]) if entry else None)
+        if cached is not None:
+            if run_manager:
+                run_manager.on_llm_new_token(cached.text, chunk=cached)
+            yield cached
+            return
+
+        parts, usage = [], None
+        stream = self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        with self.limiter.slot(), self._timer():
+            # Closed explicitly so the slot is released even if the consumer abandons the stream.
+            try:
+                for chunk in stream:
+                    parts.append(chunk.text)
+                    usage = getattr(chunk.message, "usage_metadata", None) or usage
+                    yield chunk
+            finally:
+                stream.close()
+        self._count_tokens(messages, "".join(parts), usage)
+        if entry:
+            entry[0].update(entry[1], entry[2], self._cached_generations("".join(parts)))
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        entry = self._cache_entry(messages, stop=stop, **kwargs)
+        cached = self._cached_chunk(await entry[0].alookup(entry[1], entry[2]) if entry else None)
+        if cached is not None:
+            if run_manager:
+                await run_manager.on_llm_new_token(cached.text, chunk=cached)
+            yield cached
+            return
+
+        parts, usage = [], None
+        stream = self.inner._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        async with self.limiter.aslot():
+            with self._timer():
+                try:
+                    async for chunk in stream:
+                        parts.append(chunk.text)
+                        usage = getattr(chunk.message, "usage_metadata", None) or usage
+                        yield chunk
+                finally:
+                    await stream.aclose()
+        self._count_tokens(messages, "".join(parts), usage)
+        if entry:
+            await entry[0].aupdate(entry[1], entry[2], self._cached_generations("".join(parts)))
+
+class ModelRegistry:
+    """
+    Process-wide pool of chat model clients.
+    One underlying client (and HTTP stack) per model name, one token bucket per model,
+    and one global concurrency limit across all of them.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, requests_per_second: Optional[float] = None,
+                 max_bucket_size: Optional[float] = None):
+        self.limiter = ConcurrencyLimiter(max_concurrency or settings.LLM_MAX_CONCURRENCY)
+        self.requests_per_second = settings.LLM_REQUESTS_PER_SECOND if requests_per_second is None else requests_per_second
+        self.max_bucket_size = max_bucket_size or settings.LLM_RATE_LIMIT_BURST
+        self._clients: Dict[str, Any] = {}
+        self._rate_limiters: Dict[str, Optional[InMemoryRateLimiter]] = {}
+        self._models: Dict[Tuple[str, bool], PooledChatModel] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _create_client(model_name: str):
+        if model_name.startswith("fake"):
+            return LocalFakeChatModel(latency_seconds=settings.FAKE_LLM_LATENCY_SECONDS)
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(model=model_name, google_api_key=settings.GOOGLE_API_KEY)
+
+    def _create_rate_limiter(self) -> Optional[InMemoryRateLimiter]:
+        if not self.requests_per_second or self.requests_per_second <= 0:
+            return None
+        return InMemoryRateLimiter(
+            requests_per_second=self.requests_per_second,
+            check_every_n_seconds=min(0.1, 1.0 / self.requests_per_second),
+            max_bucket_size=self.max_bucket_size
+        )
+
+    def get(self, model_name: Optional[str] = None, use_cache: bool = True) -> PooledChatModel:
+        """
+        Returns the shared chat model for model_name, creating its client on first use.
+        """
+        model_name = model_name or settings.DEFAULT_MODEL_NAME
+        key = (model_name, use_cache)
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                if model_name not in self._clients:
+                    self._clients[model_name] = self._create_client(model_name)
+                    self._rate_limiters[model_name] = self._create_rate_limiter()
+                model = PooledChatModel(
+                    inner=self._clients[model_name],
+                    model_name=model_name,
+                    limiter=self.limiter,
+                    rate_limiter=self._rate_limiters[model_name],
+                    cache=llm_cache_option(use_cache)
+                )
+                self._models[key] = model
+            return model
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self._clients),
+            "max_concurrency": self.limiter.max_concurrency,
+            "in_flight": self.limiter.in_flight,
+            "peak_in_flight": self.limiter.peak_in_flight
+        }
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_model_registry() -> ModelRegistry:
+    """Returns the process-wide ModelRegistry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+def get_chat_model(model_name: Optional[str] = None, use_cache: bool = True) -> PooledChatModel:
+    """Shortcut for get_model_registry().get(...)."""
+    return get_model_registry().get(model_name, use_cache=use_cache)
@@ -0,0 +1,223 @@
+import json
+import socket
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+from ethio_agri_advisor.config import settings
+from ethio_agri_advisor.core.weather_service import grid_cell
+
+class SnapshotStore:
+    """
+    Local SQLite snapshot of the data the planner otherwise fetches over the network:
+    the latest forecast per weather grid cell and the search results per query.
+    (Guideline documents live in the GuidelineIndex.)
+
+    In offline mode the weather and search services read only from here, so request
+    latency never depends on a WAN round trip. Cells and queries requested while offline
+    are recorded as pending, and SnapshotSyncer fills them in when the network is up.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path or settings.SNAPSHOT_STORE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS weather ("
+            "cell TEXT PRIMARY KEY, lat REAL NOT NULL, lon REAL NOT NULL, payload TEXT, fetched_at REAL, requested_at REAL);"
+            "CREATE TABLE IF NOT EXISTS searches ("
+            "query TEXT PRIMARY KEY, results TEXT, fetched_at REAL, requested_at REAL);"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cell_key(lat: float, lon: float) -> Tuple[str, float, float]:
+        cell_lat, cell_lon = grid_cell(lat, lon)
+        return f"{cell_lat:.4f},{cell_lon:.4f}", cell_lat, cell_lon
+
+    @staticmethod
+    def query_key(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def _count(self, found: bool):
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    # --- Weather ---
+
+    def get_weather(self, lat: float, lon: float) -> Optional[Tuple[Dict[str, Any], float]]:
+        """(forecast, age in seconds) for the cell containing (lat, lon), or None."""
+        cell = self.cell_key(lat, lon)[0]
+        with self._lock:
+            row = self._conn.execute("SELECT payload, fetched_at FROM weather WHERE cell = ? AND payload IS NOT NULL",
+                                     (cell,)).fetchone()
+        self._count(row is not None)
+        return (json.loads(row[0]), time.time() - row[1]) if row else None
+
+    def put_weather(self, lat: float, lon: float, payload: Dict[str, Any]):
+        cell, cell_lat, cell_lon = self.cell_key(lat, lon)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO weather (cell, lat, lon, payload, fetched_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(cell) DO UPDATE SET payload = excluded.payload, fetched_at = excluded.fetched_at",
+                (cell, cell_lat, cell_lon, json.dumps(payload), time.time())
+            )
+            self._conn.commit()
+
+    def request_weather(self, lat: float, lon: float):
+        """Marks a cell for the next sync (no-op if it is already tracked)."""
+        cell, cell_lat, cell_lon = self.cell_key(lat, lon)
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO weather (cell, lat, lon, requested_at) VALUES (?, ?, ?, ?)",
+                               (cell, cell_lat, cell_lon, time.time()))
+            self._conn.commit()
+
+    def stale_weather_cells(self, max_age_seconds: float) -> List[Tuple[float, float]]:
+        """Tracked cells that were never fetched or are older than max_age_seconds."""
+        with self._lock:
+            rows = self._conn.execute("SELECT lat, lon FROM weather WHERE fetched_at IS NULL OR fetched_at < ?",
+                                      (time.time() - max_age_seconds,)).fetchall()
+        return [(lat, lon) for lat, lon in rows]
+
+    # --- Search results ---
+
+    def get_search(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            row = self._conn.execute("SELECT results FROM searches WHERE query = ? AND results IS NOT NULL",
+                                     (self.query_key(query),)).fetchone()
+        self._count(row is not None)
+        return json.loads(row[0]) if row else None
+
+    def put_search(self, query: str, results: List[Dict[str, Any]]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO searches (query, results, fetched_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(query) DO UPDATE SET results = excluded.results, fetched_at = excluded.fetched_at",
+                (self.query_key(query), json.dumps(results), time.time())
+            )
+            self._conn.commit()
+
+    def request_search(self, query: str):
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO searches (query, requested_at) VALUES (?, ?)",
+                               (self.query_key(query), time.time()))
+            self._conn.commit()
+
+    def stale_queries(self, max_age_seconds: float) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT query FROM searches WHERE fetched_at IS NULL OR fetched_at < ?",
+                                      (time.time() - max_age_seconds,)).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        with self._lock:
+            cells = self._conn.execute("SELECT COUNT(*), COUNT(payload) FROM weather").fetchone()
+            queries = self._conn.execute("SELECT COUNT(*), COUNT(results) FROM searches").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "weather_cells": cells[1],
+            "pending_weather_cells": cells[0] - cells[1],
+            "queries": queries[1],
+            "pending_queries": queries[0] - queries[1]
+        }
+
+@lru_cache(maxsize=1)
+def get_snapshot_store() -> SnapshotStore:
+    """Returns the shared snapshot store, opened on first use."""
+    return SnapshotStore()
+
+class SnapshotSyncer:
+    """
+    Background job that refreshes the snapshot store whenever the network is reachable.
+    Each pass probes connectivity with one short TCP connect, then refetches every tracked
+    cell and query that is pending or older than max_age_seconds. Failures are left for
+    the next pass.
+    """
+
+    def __init__(self, store: Optional[SnapshotStore] = None, weather_service=None, search_tool=None,
+                 interval_seconds: float = None, max_age_seconds: float = None, probe_timeout: float = 2.0):
+        self.store = store or get_snapshot_store()
+        if weather_service is None:
+            from ethio_agri_advisor.core.weather_service import WeatherService
+            weather_service = WeatherService(snapshots=self.store, offline=False)
+        if search_tool is None:
+            from ethio_agri_advisor.tools.climate_search import ClimateSearchTool
+            search_tool = ClimateSearchTool(snapshots=self.store, offline=False)
+        self.weather_service = weather_service
+        self.search_tool = search_tool
+        self.interval_seconds = settings.SNAPSHOT_SYNC_INTERVAL_SECONDS if interval_seconds is None else interval_seconds
+        self.max_age_seconds = settings.SNAPSHOT_MAX_AGE_SECONDS if max_age_seconds is None else max_age_seconds
+        self.probe_timeout = probe_timeout
+        self.last_sync: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def is_online(self) -> bool:
+        url = urlparse(self.weather_service.base_url)
+        port = url.port or (443 if url.scheme == "https" else 80)
+        try:
+            with socket.create_connection((url.hostname, port), timeout=self.probe_timeout):
+                return True
+        except OSError:
+            return False
+
+    def sync_once(self) -> Dict[str, Any]:
+        """One refresh pass. Returns counts of refreshed and failed items."""
+        report = {"online": self.is_online(), "weather_refreshed": 0, "queries_refreshed": 0, "failed": 0}
+        if report["online"]:
+            for lat, lon in self.store.stale_weather_cells(self.max_age_seconds):
+                try:
+                    self.store.put_weather(lat, lon, self.weather_service.fetch_weather(lat, lon))
+                    report["weather_refreshed"] += 1
+                except Exception as e:
+                    print(f"Snapshot sync: weather for {lat},{lon} failed: {e}")
+                    report["failed"] += 1
+            for query in self.store.stale_queries(self.max_age_seconds):
+                try:
+                    self.search_tool.remember(query, self.search_tool.fetch_results(query))
+                    report["queries_refreshed"] += 1
+                except Exception as e:
+                    print(f"Snapshot sync: search '{query}' failed: {e}")
+                    report["failed"] += 1
+        report["finished_at"] = time.time()
+        self.last_sync = report
+        return report
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sync_once()
+            self._stop.wait(self.interval_seconds)
+
+    def start(self) -> "SnapshotSyncer":
+        """Starts the daemon sync thread (first pass immediately). Idempotent."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="snapshot-sync", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+# Pre-sync every zone's weather cell, e.g. before taking a device to the field.
+if __name__ == "__main__":
+    from ethio_agri_advisor.tools.gazetteer import get_gazetteer
+    store = get_snapshot_store()
+    for place in get_gazetteer().places("zone"):
+        store.request_weather(place.latitude, place.longitude)
+    print(SnapshotSyncer(store).sync_once())
+    print(store.stats())
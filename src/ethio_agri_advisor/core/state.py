@@ -5,13 +5,15 @@ class AgentState(TypedDict):
     """
     Represents the state of the multi-agent system.
     """
-    # User input
-    user_input: str
+    # Reference to the raw user input, which is held by the graph and never checkpointed
+    input_ref: str
     
     # Agent outputs
     local_analysis: Dict[str, Any]
     regional_insights: Dict[str, Any]
     recommendation: str
+    # Search, weather and yield simulation for this run, reused by refine iterations
+    planning_context: Dict[str, Any]
     audit_results: Dict[str, Any]
     final_report: Dict[str, Any]
     
@@ -20,5 +22,8 @@ class AgentState(TypedDict):
     max_iterations: int
     status: str # 'analyzing', 'collaborating', 'planning', 'auditing', 'synthesizing', 'rejected'
     
+    # Plans whose leaks were masked in-stream instead of triggering a refine loop
+    refine_loops_avoided: Annotated[int, operator.add]
+    
     # History of messages (optional, for tracing)
     messages: Annotated[List[str], operator.add]
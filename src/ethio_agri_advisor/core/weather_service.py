@@ -1,18 +1,156 @@
+import math
+import asyncio
+import httpx
+import threading
+import weakref
 import requests
-from typing import Dict, Any, Optional
+from datetime import date
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Optional, Tuple
 from ethio_agri_advisor.config import settings
+from ethio_agri_advisor.core.cache import create_cache
+from ethio_agri_advisor.core.instrumentation import get_instrumentation
+
+def grid_cell(lat: float, lon: float, resolution: Optional[float] = None) -> Tuple[float, float]:
+    """
+    Snaps a coordinate to the centre of its grid cell.
+    Farms in the same cell share one forecast, and exact locations never leave the process.
+    """
+    res = resolution or settings.WEATHER_GRID_DEG
+    return (
+        round(math.floor(lat / res) * res + res / 2, 4),
+        round(math.floor(lon / res) * res + res / 2, 4)
+    )
 
 class WeatherService:
     """
     Service to fetch weather data from Open-Meteo API.
+    Responses are cached per grid cell and forecast day.
+    In offline mode forecasts come only from the local snapshot store; online, the
+    snapshot is the fallback when the API fails, ahead of the Addis Ababa averages.
     """
     
-    def __init__(self):
-        self.base_url = settings.WEATHER_API_BASE_URL
+    def __init__(self, cache=None, session: Optional[requests.Session] = None, base_url: Optional[str] = None,
+                 snapshots=None, offline: Optional[bool] = None):
+        self.base_url = base_url or settings.WEATHER_API_BASE_URL
+        self.offline = settings.OFFLINE_MODE if offline is None else offline
+        self._snapshots = snapshots
+        self.cache = cache if cache is not None else create_cache(
+            settings.WEATHER_CACHE_BACKEND,
+            path=settings.WEATHER_CACHE_PATH,
+            max_entries=settings.WEATHER_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.WEATHER_CACHE_TTL_SECONDS
+        )
+        self.session = session or self._build_session()
+        # One pooled async client per event loop: an httpx client cannot outlive the loop it was opened on.
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self.upstream_requests = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _build_session() -> requests.Session:
+        """Pooled HTTP session so repeated calls reuse connections."""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=settings.WEATHER_POOL_SIZE, pool_maxsize=settings.WEATHER_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _async_client(self) -> httpx.AsyncClient:
+        """The running loop's shared AsyncClient, created on first use so connections are reused."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None or client.is_closed:
+                limits = httpx.Limits(max_connections=settings.WEATHER_POOL_SIZE,
+                                      max_keepalive_connections=settings.WEATHER_POOL_SIZE)
+                client = httpx.AsyncClient(timeout=settings.WEATHER_TIMEOUT_SECONDS, limits=limits)
+                self._async_clients[loop] = client
+            return client
+
+    async def aclose(self):
+        """Closes the running loop's async client, if one was opened."""
+        with self._lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    @property
+    def snapshots(self):
+        if self._snapshots is None:
+            # Imported here: the snapshot store itself depends on grid_cell from this module.
+            from ethio_agri_advisor.core.snapshot_store import get_snapshot_store
+            self._snapshots = get_snapshot_store()
+        return self._snapshots
+
+    @staticmethod
+    def cache_key(lat: float, lon: float, day: Optional[date] = None) -> str:
+        cell_lat, cell_lon = grid_cell(lat, lon)
+        return f"{cell_lat:.4f},{cell_lon:.4f}:{(day or date.today()).isoformat()}"
+
+    @staticmethod
+    def _request_params(lat: float, lon: float) -> Dict[str, Any]:
+        return {
+            "latitude": lat,
+            "longitude": lon,
+            "current_weather": "true",
+            "hourly": "temperature_2m,relativehumidity_2m,rain",
+            "daily": "temperature_2m_max,temperature_2m_min,rain_sum",
+            "timezone": "auto"
+        }
+
+    @staticmethod
+    def _parse_response(data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "current_temp": data.get("current_weather", {}).get("temperature"),
+            "wind_speed": data.get("current_weather", {}).get("windspeed"),
+            "daily_rain_sum": data.get("daily", {}).get("rain_sum", [])[:7], # Next 7 days
+            "max_temp_forecast": data.get("daily", {}).get("temperature_2m_max", [])[:7],
+            "min_temp_forecast": data.get("daily", {}).get("temperature_2m_min", [])[:7]
+        }
+
+    @staticmethod
+    def fallback_weather() -> Dict[str, Any]:
+        # Fallback to historical averages for Ethiopia (Addis Ababa context)
+        return {
+            "current_temp": 20.0,
+            "wind_speed": 10.0,
+            "daily_rain_sum": [5.0] * 7, # Moderate rain assumption
+            "max_temp_forecast": [25.0] * 7,
+            "min_temp_forecast": [10.0] * 7,
+            "note": "Data fetched from fallback (historical averages) due to API error."
+        }
+
+    def snapshot_weather(self, lat: float, lon: float) -> Dict[str, Any]:
+        """
+        The snapshot forecast for the cell, noting its age. A cell with no snapshot is
+        marked for the next sync and the historical averages are returned meanwhile.
+        """
+        snapshot = self.snapshots.get_weather(lat, lon)
+        if snapshot is None:
+            self.snapshots.request_weather(lat, lon)
+            return self.fallback_weather()
+        weather, age = snapshot
+        return {**weather, "note": f"Offline snapshot, {age / 3600:.1f} h old."}
+
+    def fetch_weather(self, lat: float, lon: float) -> Dict[str, Any]:
+        """
+        Fetches the forecast for the cell containing (lat, lon) from the API, bypassing the
+        cache and snapshot. Raises on any network or HTTP error.
+        """
+        cell_lat, cell_lon = grid_cell(lat, lon)
+        with self._lock:
+            self.upstream_requests += 1
+        with get_instrumentation().timer("advisor_external_seconds", service="open_meteo"):
+            response = self.session.get(self.base_url, params=self._request_params(cell_lat, cell_lon),
+                                        timeout=settings.WEATHER_TIMEOUT_SECONDS)
+            response.raise_for_status()
+        return self._parse_response(response.json())
 
     def get_current_weather(self, lat: float = 9.03, lon: float = 38.74) -> Dict[str, Any]:
         """
         Get current weather and forecast for a location (default: Addis Ababa).
+        The location is snapped to its grid cell before querying or caching.
         
         Args:
             lat: Latitude
@@ -21,40 +159,58 @@ class WeatherService:
         Returns:
             Dictionary containing weather data.
         """
+        if self.offline:
+            return self.snapshot_weather(lat, lon)
+        key = self.cache_key(lat, lon)
+        cached = self.cache.get(key)
+        get_instrumentation().cache_lookup("weather", cached is not None)
+        if cached is not None:
+            return cached
+
         try:
-            params = {
-                "latitude": lat,
-                "longitude": lon,
-                "current_weather": "true",
-                "hourly": "temperature_2m,relativehumidity_2m,rain",
-                "daily": "temperature_2m_max,temperature_2m_min,rain_sum",
-                "timezone": "auto"
-            }
-            
-            response = requests.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            return {
-                "current_temp": data.get("current_weather", {}).get("temperature"),
-                "wind_speed": data.get("current_weather", {}).get("windspeed"),
-                "daily_rain_sum": data.get("daily", {}).get("rain_sum", [])[:7], # Next 7 days
-                "max_temp_forecast": data.get("daily", {}).get("temperature_2m_max", [])[:7],
-                "min_temp_forecast": data.get("daily", {}).get("temperature_2m_min", [])[:7]
-            }
+            weather = self.fetch_weather(lat, lon)
             
         except Exception as e:
             print(f"Error fetching weather data: {e}")
-            # Fallback to historical averages for Ethiopia (Addis Ababa context)
-            return {
-                "current_temp": 20.0,
-                "wind_speed": 10.0,
-                "daily_rain_sum": [5.0] * 7, # Moderate rain assumption
-                "max_temp_forecast": [25.0] * 7,
-                "min_temp_forecast": [10.0] * 7,
-                "note": "Data fetched from fallback (historical averages) due to API error."
-            }
+            # Fallbacks are not cached so the next call retries the API.
+            return self.snapshot_weather(lat, lon)
+
+        self.cache.set(key, weather)
+        return weather
+
+    async def aget_current_weather(self, lat: float = 9.03, lon: float = 38.74) -> Dict[str, Any]:
+        """
+        Async variant of get_current_weather using httpx. Shares the same cache.
+        """
+        if self.offline:
+            return self.snapshot_weather(lat, lon)
+        key = self.cache_key(lat, lon)
+        cached = self.cache.get(key)
+        get_instrumentation().cache_lookup("weather", cached is not None)
+        if cached is not None:
+            return cached
+
+        try:
+            cell_lat, cell_lon = grid_cell(lat, lon)
+            with self._lock:
+                self.upstream_requests += 1
+            with get_instrumentation().timer("advisor_external_seconds", service="open_meteo"):
+                response = await self._async_client().get(self.base_url, params=self._request_params(cell_lat, cell_lon))
+                response.raise_for_status()
+            weather = self._parse_response(response.json())
+
+        except Exception as e:
+            print(f"Error fetching weather data: {e}")
+            return self.snapshot_weather(lat, lon)
+
+        self.cache.set(key, weather)
+        return weather
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache hit/miss counters and the number of upstream API calls."""
+        return {**self.cache.stats(), "upstream_requests": self.upstream_requests}
 
 if __name__ == "__main__":
     service = WeatherService()
     print(service.get_current_weather())
+    print(service.stats())
@@ -1,6 +1,7 @@
 import os
 from dotenv import load_dotenv
 from ethio_agri_advisor.core.graph import AgriAdvisorGraph
+from ethio_agri_advisor.config import settings
 
 # Load environment variables (API keys)
 load_dotenv()
@@ -15,6 +16,12 @@ def run_advisor_demo():
     
     # Initialize the graph
     advisor = AgriAdvisorGraph()
+
+    # Offline-first: requests read the local snapshot; a background job refreshes it when the network is up.
+    syncer = None
+    if settings.OFFLINE_MODE and settings.SNAPSHOT_SYNC_INTERVAL_SECONDS > 0:
+        from ethio_agri_advisor.core.snapshot_store import SnapshotSyncer
+        syncer = SnapshotSyncer().start()
     
     # Sample user input (hypothetical farm data)
     # Note: The system will anonymize this and only share aggregated insights.
@@ -26,16 +33,8 @@ def run_advisor_demo():
     
     print(f"\n[User Input]: {user_input}\n")
     
-    # Initial state
-    initial_state = {
-        "user_input": user_input,
-        "iteration_count": 0,
-        "max_iterations": 3,
-        "messages": ["Starting advisor session..."]
-    }
-    
-    # Run the graph
-    final_state = advisor.app.invoke(initial_state)
+    # Run the graph (with GRAPH_CHECKPOINTER set, each run gets a fresh thread; pass thread_id to make it resumable)
+    final_state = advisor.run(user_input, max_iterations=3)
     
     print("\n" + "="*60)
     print("FINAL RECOMMENDATION REPORT")
@@ -51,14 +50,57 @@ def run_advisor_demo():
     print("\n" + "="*60)
     print("PRIVACY & AUDIT LOGS")
     print("="*60)
-    print(f"Audit Decision: {final_state['audit_results']['decision']}")
+    print(f"Audit Decision: {final_state['audit_results']['decision']} (settled by {final_state['audit_results']['tier']})")
     print(f"Audit Rationale: {final_state['audit_results']['audit_log']}")
     print(f"Detected Leaks in Final Output: {final_state['audit_results']['tool_audit']['detected_leaks']}")
 
+    from ethio_agri_advisor.tools.privacy_accountant import get_privacy_accountant
+    accountant = get_privacy_accountant()
+    if accountant is not None:
+        spent = accountant.spent(f"farm:{final_state['local_analysis']['farm_id']}")
+        print(f"Privacy Budget (this farm): epsilon {spent['epsilon']:.2f} spent, {spent['remaining_epsilon']:.2f} remaining ({spent['composition']} composition)")
+
+    from ethio_agri_advisor.core.llm_cache import get_llm_cache
+    llm_cache = get_llm_cache()
+    if llm_cache is not None:
+        stats = llm_cache.stats()
+        print("\n" + "="*60)
+        print("SESSION CACHE STATISTICS")
+        print("="*60)
+        print(f"LLM Cache: {stats['hits']} hits / {stats['hits'] + stats['misses']} lookups ({stats['hit_rate']:.0%} hit rate)")
+        print(f"LLM Latency Saved: {stats['saved_latency_seconds']:.2f}s")
+
+    extraction = advisor.local_analyzer.extraction_stats()
+    print(f"Feature Extraction: {extraction['fast_path_hits']} / {extraction['requests']} requests on the fast path ({extraction['hit_rate']:.0%}), ~{extraction['estimated_latency_saved_seconds']:.2f}s LLM latency saved")
+
+    audit = advisor.privacy_auditor.audit_stats()
+    print(f"Audit Tiers: {audit['rules']} rules, {audit['classifier']} classifier, {audit['llm']} LLM "
+          f"({audit['rules_share'] + audit['classifier_share']:.0%} settled without the LLM)")
+
+    search = advisor.crop_planner.search_tool.stats()
+    print(f"Guideline Search: {search['local_hits']} local hits, {search['remote_searches']} live searches "
+          f"({search.get('passages', 0)} passages indexed)")
+
+    from ethio_agri_advisor.core.instrumentation import get_instrumentation
+    metrics = get_instrumentation().snapshot()["histograms"]
+    if metrics.get("advisor_node_seconds"):
+        print("Node Latency: " + ", ".join(
+            f"{h['labels']['node']} {h['mean_seconds'] * 1e3:.0f} ms" for h in metrics["advisor_node_seconds"]
+        ) + (f" (metrics written to {settings.METRICS_DUMP_DIR})" if settings.METRICS_DUMP_DIR else ""))
+
+    if settings.OFFLINE_MODE:
+        from ethio_agri_advisor.core.snapshot_store import get_snapshot_store
+        snapshot = get_snapshot_store().stats()
+        print(f"Offline Snapshot: {snapshot['hits']} hits / {snapshot['hits'] + snapshot['misses']} lookups, "
+              f"{snapshot['weather_cells']} weather cells, "
+              f"{snapshot['pending_weather_cells'] + snapshot['pending_queries']} pending sync")
+    if syncer is not None:
+        syncer.stop(timeout=1.0)
+
 if __name__ == "__main__":
     if not os.getenv("OPENAI_API_KEY"):
         print("Error: OPENAI_API_KEY not found in environment. Please set it in .env file.")
-    elif not os.getenv("TAVILY_API_KEY"):
+    elif not os.getenv("TAVILY_API_KEY") and not settings.OFFLINE_MODE:
         print("Error: TAVILY_API_KEY not found in environment. Please set it in .env file.")
     else:
         run_advisor_demo()
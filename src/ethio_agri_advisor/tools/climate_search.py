@@ -1,35 +1,181 @@
-from langchain_community.tools.tavily_search import TavilySearchResults
-from typing import List, Dict, Any
+import threading
+from functools import cached_property
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 from ethio_agri_advisor.config import settings
+from ethio_agri_advisor.core.instrumentation import get_instrumentation
+from ethio_agri_advisor.tools.guideline_index import tokenize
 
 class ClimateSearchTool:
     """
     Retrieves climate and agricultural data specific to Ethiopia.
-    Integrates with Tavily for real-time search.
+    The local guideline index is searched first; Tavily is only called when no passage
+    covers enough of the query, and its results are indexed so the next query hits locally.
+    In offline mode, and whenever the live search fails, answers come from the snapshot
+    store and the index instead of an error message.
     """
+
+    NO_CONTEXT = "No guideline context available offline for this query."
+
+    def __init__(self, snapshots=None, offline: Optional[bool] = None, index=None):
+        self.offline = settings.OFFLINE_MODE if offline is None else offline
+        self._snapshots = snapshots
+        self._index = index
+        self._stats_lock = threading.Lock()
+        self.local_hits = 0
+        self.remote_searches = 0
+
+    @property
+    def index(self):
+        """The shared GuidelineIndex, or None when the local index is disabled."""
+        if self._index is None and settings.GUIDELINE_INDEX_ENABLED:
+            from ethio_agri_advisor.tools.guideline_index import get_guideline_index
+            self._index = get_guideline_index()
+        return self._index
+
+    @property
+    def snapshots(self):
+        if self._snapshots is None:
+            from ethio_agri_advisor.core.snapshot_store import get_snapshot_store
+            self._snapshots = get_snapshot_store()
+        return self._snapshots
     
-    def __init__(self):
-        self.search = TavilySearchResults(max_results=3, tavily_api_key=settings.TAVILY_API_KEY)
+    @cached_property
+    def search(self):
+        # Imported lazily: langchain_community is slow to import and only needed on first search.
+        from langchain_community.tools.tavily_search import TavilySearchResults
+        return TavilySearchResults(max_results=3, tavily_api_key=settings.TAVILY_API_KEY)
+
+    @staticmethod
+    def _enhance_query(query: str) -> str:
+        current_year = datetime.now().year
+        # Enhance query for Ethiopian context
+        return f"Ethiopia agriculture {query} climate resilience MoA guidelines {current_year} {current_year + 1}"
+
+    @staticmethod
+    def _format_results(results: List[Dict[str, Any]]) -> str:
+        return "\n\n".join([
+            f"Source: {res['url']}\nContent: {res['content']}" 
+            for res in results
+        ])
+
+    @staticmethod
+    def _covers(result: Dict[str, Any], terms: List[str], required: List[str]) -> bool:
+        """
+        Whether a passage answers the query: it contains every required term and at least
+        GUIDELINE_MIN_COVERAGE of the other query terms.
+        """
+        if not required:
+            return result["coverage"] >= settings.GUIDELINE_MIN_COVERAGE
+        passage = set(tokenize(f"{result['title']} {result['content']}"))
+        if not passage.issuperset(required):
+            return False
+        rest = [term for term in terms if term not in required]
+        return not rest or sum(term in passage for term in rest) / len(rest) >= settings.GUIDELINE_MIN_COVERAGE
+
+    def local_results(self, query: str, region: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Top passages from the local index if one covers at least GUIDELINE_MIN_COVERAGE
+        of the query's terms, else None (a miss). With region, that passage must also
+        mention the region, with the coverage taken over the other terms: generic
+        guidance is no answer to a region-specific question.
+        """
+        if self.index is None:
+            return None
+        results = self.index.search(query)
+        required = tokenize(region) if region else []
+        terms = list(dict.fromkeys(tokenize(query)))
+        hit = any(self._covers(r, terms, required) for r in results)
+        get_instrumentation().cache_lookup("guideline_index", hit)
+        if not hit:
+            return None
+        with self._stats_lock:
+            self.local_hits += 1
+        return results
+
+    def remember(self, query: str, results: List[Dict[str, Any]]):
+        """Writes live results to the snapshot (for offline use) and the local index."""
+        self.snapshots.put_search(query, results)
+        if self.index is not None:
+            self.index.add_documents(results)
 
-    def search_agri_data(self, query: str) -> str:
+    def snapshot_context(self, query: str) -> str:
+        """
+        Search context without the network: the synced results for this query, else the
+        closest passages in the local index. Unsynced queries are queued for the next sync.
+        """
+        results = self.snapshots.get_search(query)
+        if not isinstance(results, list):
+            # Never synced, or an error string stored before failed searches were rejected.
+            self.snapshots.request_search(query)
+            results = self.index.search(query) if self.index is not None else []
+        return self._format_results(results) if results else self.NO_CONTEXT
+
+    @staticmethod
+    def _checked(results: Any) -> List[Dict[str, Any]]:
+        """
+        The Tavily tool reports network and API errors (401, 429, timeouts) by returning the
+        error as a string instead of raising; anything but a list of results is raised here.
+        """
+        if not isinstance(results, list) or not all(isinstance(r, dict) and "url" in r and "content" in r for r in results):
+            raise RuntimeError(f"Search failed: {str(results)[:200]}")
+        return results
+
+    def fetch_results(self, query: str) -> List[Dict[str, Any]]:
+        """Live Tavily results for query. Raises on any error."""
+        with self._stats_lock:
+            self.remote_searches += 1
+        with get_instrumentation().timer("advisor_external_seconds", service="tavily"):
+            return self._checked(self.search.invoke({"query": self._enhance_query(query)}))
+
+    def search_agri_data(self, query: str, region: Optional[str] = None) -> str:
         """
         Searches for Ethiopian agricultural guidelines, weather patterns, or crop resilience.
+        With region, a local answer must mention it; otherwise the live search is used.
         """
-        current_year = datetime.now().year
-        # Enhance query for Ethiopian context
-        enhanced_query = f"Ethiopia agriculture {query} climate resilience MoA guidelines {current_year} {current_year + 1}"
+        local = self.local_results(query, region)
+        if local is not None:
+            return self._format_results(local)
+        if self.offline:
+            return self.snapshot_context(query)
+        # A failed search falls back before anything is stored.
         try:
-            results = self.search.invoke({"query": enhanced_query})
-            
-            # Format results
-            formatted_results = "\n\n".join([
-                f"Source: {res['url']}\nContent: {res['content']}" 
-                for res in results
-            ])
-            return formatted_results
+            results = self.fetch_results(query)
+            self.remember(query, results)
+            return self._format_results(results)
         except Exception as e:
-            return f"Error searching data: {e}"
+            print(f"Error searching data: {e}")
+            return self.snapshot_context(query)
+
+    async def asearch_agri_data(self, query: str, region: Optional[str] = None) -> str:
+        """
+        Async variant of search_agri_data.
+        """
+        local = self.local_results(query, region)
+        if local is not None:
+            return self._format_results(local)
+        if self.offline:
+            return self.snapshot_context(query)
+        try:
+            with self._stats_lock:
+                self.remote_searches += 1
+            with get_instrumentation().timer("advisor_external_seconds", service="tavily"):
+                results = self._checked(await self.search.ainvoke({"query": self._enhance_query(query)}))
+            self.remember(query, results)
+            return self._format_results(results)
+        except Exception as e:
+            print(f"Error searching data: {e}")
+            return self.snapshot_context(query)
+
+    def stats(self) -> Dict[str, Any]:
+        """Local index hits versus live searches."""
+        lookups = self.local_hits + self.remote_searches
+        return {
+            "local_hits": self.local_hits,
+            "remote_searches": self.remote_searches,
+            "local_hit_rate": self.local_hits / lookups if lookups else 0.0,
+            **(self.index.stats() if self.index is not None else {})
+        }
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,239 @@
+import json
+import math
+import os
+import sys
+import warnings
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from ethio_agri_advisor.config import settings
+
+DEKADS_PER_YEAR = 36
+
+# Rainy seasons as inclusive 1-based dekad ranges: Belg (Feb-May) and Kiremt (Jun-Sep).
+SEASONS: Dict[str, Tuple[int, int]] = {"belg": (4, 15), "kiremt": (16, 27)}
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+def dekad_of(dates: pd.Series) -> np.ndarray:
+    """1-based dekad of the year (1-36): days 1-10, 11-20 and 21-end of each month."""
+    dates = pd.to_datetime(dates)
+    return ((dates.dt.month - 1) * 3 + np.minimum((dates.dt.day - 1) // 10, 2) + 1).to_numpy()
+
+class ClimatologyStore:
+    """
+    Offline seasonal rainfall climatology on a regular lat/lon grid.
+
+    Gridded dekadal rainfall (CHIRPS-style CSV or NetCDF files placed locally) is ingested
+    once into a directory of .npy arrays: the dekadal series per cell, the per-year season
+    totals sorted along the year axis, and per-season mean/std/percentiles. The arrays are
+    memory-mapped on load, so opening the store takes milliseconds whatever its size.
+    A coordinate maps to its cell arithmetically, which makes seasonal statistics an O(1)
+    lookup and a percentile rank a bisect over the years.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path or settings.CLIMATOLOGY_DIR)
+        self.meta: Optional[Dict[str, Any]] = None
+        self.dekadal = self.sorted_totals = self.stats = None
+        self._load()
+
+    @property
+    def available(self) -> bool:
+        return self.meta is not None
+
+    def _load(self):
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            return
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.dekadal = np.load(self.path / "dekadal.npy", mmap_mode="r")
+            self.sorted_totals = np.load(self.path / "season_totals.npy", mmap_mode="r")
+            self.stats = np.load(self.path / "season_stats.npy", mmap_mode="r")
+            self.meta = meta
+        except (OSError, ValueError) as e:
+            print(f"Error loading climatology store: {e}")
+
+    @classmethod
+    def build(cls, rain: np.ndarray, lat0: float, lon0: float, resolution: float, years: List[int],
+              path: Optional[Union[str, Path]] = None) -> "ClimatologyStore":
+        """
+        Writes a store from dekadal rainfall shaped (n_lat, n_lon, n_years, 36), NaN where
+        missing. lat0/lon0 are the centre of the south-west cell.
+        """
+        path = Path(path or settings.CLIMATOLOGY_DIR)
+        path.mkdir(parents=True, exist_ok=True)
+        n_lat, n_lon = rain.shape[:2]
+        dekadal = np.ascontiguousarray(rain, dtype=np.float32).reshape(n_lat * n_lon, len(years), DEKADS_PER_YEAR)
+
+        # A season with any missing dekad has no total for that year (NaN sorts last).
+        totals = np.stack([dekadal[:, :, start - 1:end].sum(axis=2) for start, end in SEASONS.values()], axis=1)
+        with warnings.catch_warnings():
+            # Cells with no data at all (sea, outside the country) give all-NaN slices.
+            warnings.simplefilter("ignore", RuntimeWarning)
+            stats = np.concatenate([
+                np.nanmean(totals, axis=2, keepdims=True),
+                np.nanstd(totals, axis=2, keepdims=True),
+                np.moveaxis(np.nanpercentile(totals, PERCENTILES, axis=2), 0, -1)
+            ], axis=2)
+
+        np.save(path / "dekadal.npy", dekadal)
+        np.save(path / "season_totals.npy", np.sort(totals, axis=2).astype(np.float32))
+        np.save(path / "season_stats.npy", stats.astype(np.float32))
+        # meta.json is written last: a store without it is treated as absent.
+        with open(path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump({"lat0": lat0, "lon0": lon0, "resolution": resolution, "n_lat": n_lat, "n_lon": n_lon,
+                       "years": [int(y) for y in years], "seasons": SEASONS, "percentiles": PERCENTILES}, f)
+        return cls(path)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, path: Optional[Union[str, Path]] = None,
+                   resolution: Optional[float] = None) -> "ClimatologyStore":
+        """
+        Builds a store from long-format rows: latitude, longitude, year, dekad (1-36), rain_mm.
+        The grid resolution is inferred from the coordinate spacing unless given.
+        """
+        lats = np.sort(frame["latitude"].unique())
+        lons = np.sort(frame["longitude"].unique())
+        if resolution is None:
+            steps = np.concatenate([np.diff(lats), np.diff(lons)])
+            resolution = float(steps[steps > 1e-9].min()) if (steps > 1e-9).any() else 1.0
+        lat0, lon0 = float(lats[0]), float(lons[0])
+        years = sorted(int(y) for y in frame["year"].unique())
+
+        i = np.rint((frame["latitude"].to_numpy() - lat0) / resolution).astype(np.int64)
+        j = np.rint((frame["longitude"].to_numpy() - lon0) / resolution).astype(np.int64)
+        y = np.searchsorted(years, frame["year"].to_numpy())
+        d = frame["dekad"].to_numpy(dtype=np.int64) - 1
+        rain = np.full((int(i.max()) + 1, int(j.max()) + 1, len(years), DEKADS_PER_YEAR), np.nan, dtype=np.float32)
+        rain[i, j, y, d] = frame["rain_mm"].to_numpy(dtype=np.float32)
+        return cls.build(rain, lat0, lon0, resolution, years, path)
+
+    @classmethod
+    def ingest_csv(cls, paths: Iterable[Union[str, Path]], path: Optional[Union[str, Path]] = None,
+                   resolution: Optional[float] = None) -> "ClimatologyStore":
+        """
+        Ingests CSV files with latitude, longitude, rain_mm and either year + dekad or a date column.
+        """
+        frames = []
+        for csv_path in paths:
+            frame = pd.read_csv(csv_path)
+            if "dekad" not in frame.columns:
+                frame["year"] = pd.to_datetime(frame["date"]).dt.year
+                frame["dekad"] = dekad_of(frame["date"])
+            frames.append(frame[["latitude", "longitude", "year", "dekad", "rain_mm"]])
+        return cls.from_frame(pd.concat(frames, ignore_index=True), path, resolution)
+
+    @classmethod
+    def ingest_netcdf(cls, paths: Iterable[Union[str, Path]], path: Optional[Union[str, Path]] = None,
+                      variable: str = "precip") -> "ClimatologyStore":
+        """
+        Ingests CHIRPS dekadal NetCDF files. Needs the optional xarray and netCDF4 packages.
+        The dense array is filled straight from the DataArray one year at a time, so only
+        one year of the (lazily opened) files is in memory besides the result.
+        """
+        try:
+            import xarray as xr
+        except ImportError as e:
+            raise ImportError("NetCDF ingest needs xarray and netCDF4: pip install xarray netCDF4") from e
+        with xr.open_mfdataset([str(p) for p in paths], combine="by_coords") as ds:
+            da = ds[variable]
+            lat_dim = "lat" if "lat" in da.dims else "latitude" if "latitude" in da.dims else "y"
+            lon_dim = "lon" if "lon" in da.dims else "longitude" if "longitude" in da.dims else "x"
+            da = da.sortby([lat_dim, lon_dim]).transpose("time", lat_dim, lon_dim)
+            lats = da[lat_dim].values.astype(np.float64)
+            lons = da[lon_dim].values.astype(np.float64)
+            steps = np.concatenate([np.diff(lats), np.diff(lons)])
+            resolution = float(steps[steps > 1e-9].min()) if (steps > 1e-9).any() else 1.0
+            i = np.rint((lats - lats[0]) / resolution).astype(np.int64)
+            j = np.rint((lons - lons[0]) / resolution).astype(np.int64)
+
+            times = pd.Series(pd.to_datetime(da["time"].values))
+            time_years = times.dt.year.to_numpy()
+            dekads = dekad_of(times) - 1
+            years = sorted(int(y) for y in np.unique(time_years))
+            rain = np.full((int(i[-1]) + 1, int(j[-1]) + 1, len(years), DEKADS_PER_YEAR), np.nan, dtype=np.float32)
+            for y, year in enumerate(years):
+                steps_in_year = np.flatnonzero(time_years == year)
+                values = da.isel(time=steps_in_year).values.astype(np.float32)  # (time, lat, lon)
+                rain[np.ix_(i, j, [y], dekads[steps_in_year])] = np.moveaxis(values, 0, -1)[:, :, None, :]
+        return cls.build(rain, float(lats[0]), float(lons[0]), resolution, years, path)
+
+    def cell_index(self, lat: float, lon: float) -> Optional[int]:
+        """Flat index of the cell containing (lat, lon), or None outside the grid."""
+        if self.meta is None:
+            return None
+        m = self.meta
+        i = math.floor((lat - m["lat0"]) / m["resolution"] + 0.5)
+        j = math.floor((lon - m["lon0"]) / m["resolution"] + 0.5)
+        if not (0 <= i < m["n_lat"] and 0 <= j < m["n_lon"]):
+            return None
+        return i * m["n_lon"] + j
+
+    def _season(self, season: str) -> int:
+        if season not in SEASONS:
+            raise ValueError(f"Unknown season: {season}. Expected one of {tuple(SEASONS)}.")
+        return list(SEASONS).index(season)
+
+    def season_stats(self, lat: float, lon: float, season: str = "kiremt") -> Optional[Dict[str, Any]]:
+        """
+        Climatological season total at (lat, lon): mean, interannual std and percentiles in mm.
+        None when the store is empty or has no data for the cell.
+        """
+        k = self.cell_index(lat, lon)
+        if k is None:
+            return None
+        row = self.stats[k, self._season(season)]
+        if np.isnan(row[0]):
+            return None
+        result = {"season": season, "mean_mm": float(row[0]), "std_mm": float(row[1])}
+        result.update({f"p{q}_mm": float(v) for q, v in zip(self.meta["percentiles"], row[2:])})
+        result["years"] = int(np.count_nonzero(~np.isnan(self.sorted_totals[k, self._season(season)])))
+        return result
+
+    def season_total(self, lat: float, lon: float, season: str = "kiremt", year: Optional[int] = None) -> Optional[float]:
+        """One year's season total, or the climatological mean when year is None."""
+        if year is None:
+            stats = self.season_stats(lat, lon, season)
+            return stats["mean_mm"] if stats else None
+        k = self.cell_index(lat, lon)
+        if k is None or year not in self.meta["years"]:
+            return None
+        start, end = SEASONS[season]
+        total = float(self.dekadal[k, self.meta["years"].index(year), start - 1:end].sum())
+        return None if math.isnan(total) else total
+
+    def percentile(self, lat: float, lon: float, season: str, total_mm: float) -> Optional[float]:
+        """Percentile (0-100) of a season total among the recorded years: the anomaly rank."""
+        k = self.cell_index(lat, lon)
+        if k is None:
+            return None
+        totals = self.sorted_totals[k, self._season(season)]
+        n = int(np.count_nonzero(~np.isnan(totals)))
+        if n == 0:
+            return None
+        below = np.searchsorted(totals[:n], total_mm, side="left")
+        at_or_below = np.searchsorted(totals[:n], total_mm, side="right")
+        return 100.0 * (below + at_or_below) / (2 * n)
+
+@lru_cache(maxsize=1)
+def get_climatology_store() -> ClimatologyStore:
+    """Returns the shared store, memory-mapped on first use (empty if nothing has been ingested)."""
+    return ClimatologyStore()
+
+# Ingest: python -m ethio_agri_advisor.tools.climatology chirps_*.csv (or *.nc)
+if __name__ == "__main__":
+    files = sys.argv[1:]
+    if not files:
+        print("Usage: python -m ethio_agri_advisor.tools.climatology FILE [FILE ...]")
+    else:
+        netcdf = all(os.path.splitext(f)[1] in (".nc", ".nc4") for f in files)
+        store = ClimatologyStore.ingest_netcdf(files) if netcdf else ClimatologyStore.ingest_csv(files)
+        m = store.meta
+        print(f"Climatology store at {store.path}: {m['n_lat']}x{m['n_lon']} cells at {m['resolution']} deg, "
+              f"{m['years'][0]}-{m['years'][-1]}")
+        print(store.season_stats(9.03, 38.74, "kiremt"))
@@ -0,0 +1,147 @@
+import json
+import re
+import zlib
+import numpy as np
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from ethio_agri_advisor.config import settings
+
+ETHICS_LABELS = ("over_promising", "cultural_insensitivity")
+
+# Phrasings no plan should contain, as (label, regex). A hit rejects the plan outright unless
+# it is negated ("Yields are not guaranteed", "Avoid calling local practices backward").
+# "No risk" only counts as a bare claim; "no risk of frost at this elevation" is left to the classifier.
+ETHICS_RULES: List[Tuple[str, str]] = [
+    ("over_promising", r"\bguarantee(?:d|s)?\b|\brisk[- ]free\b|\bno risk(?: at all| whatsoever)?(?=\s*(?:[.!,;]|$))"
+                       r"|\bcannot fail\b|\bnever (?:fail|lose)\b"
+                       r"|\bdrought[- ]proof\b|\b100\s?% (?:protection|success|safe)\b"
+                       r"|\b(?:double|triple)s? your (?:yield|harvest|income)\b"),
+    ("cultural_insensitivity", r"\b(?:backward|primitive|ignorant|superstitio(?:n|us)|uneducated|lazy)\b"),
+]
+
+_RULES = re.compile("|".join(f"(?P<{label}>{pattern})" for label, pattern in ETHICS_RULES), re.IGNORECASE)
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"[a-z0-9%']+")
+
+# A match is negated when one of these words appears within NEGATION_WINDOW words before
+# it in the same clause.
+NEGATION_WINDOW = 4
+_NEGATORS = {"not", "no", "never", "nothing", "none", "nor", "neither", "cannot", "without", "avoid", "avoiding"}
+_CLAUSE_BREAK = re.compile(r"[.!?;:,\n]")
+
+# An explicit "VERDICT: APPROVE/REJECT" line wins, and when there is one the rest of the
+# reply is ignored. Otherwise any rejecting word beats "approve", matched as a whole word so
+# "disapprove" never counts as approval. A negated "approve" ("cannot be approved") rejects;
+# a negated "reject" ("no reason to reject") gives no verdict on its own.
+_VERDICT = re.compile(r"\bverdict\s*[:\-]\s*\**\s*([a-z]*)", re.IGNORECASE)
+_VERDICT_WORDS = re.compile(r"\b(?:(?P<reject>reject(?:s|ed|ion)?|disapprove[sd]?)|(?P<approve>approve[sd]?))\b", re.IGNORECASE)
+
+def is_negated(text: str, start: int) -> bool:
+    """Whether the phrase starting at text[start] is negated within its clause."""
+    clause = _CLAUSE_BREAK.split(text[:start])[-1]
+    words = _WORD.findall(clause.lower())[-NEGATION_WINDOW:]
+    return any(word in _NEGATORS or word.endswith("n't") for word in words)
+
+def rule_flags(text: str) -> List[Tuple[str, str]]:
+    """(label, matched phrase) for every rule hit that is not negated, in text order."""
+    return [(match.lastgroup, match.group()) for match in _RULES.finditer(text) if not is_negated(text, match.start())]
+
+def parse_verdict(text: str) -> Optional[bool]:
+    """True for approval, False for rejection, None when the reply gives no verdict."""
+    match = _VERDICT.search(text)
+    if match:
+        word = match.group(1).lower()
+        return True if word.startswith("approve") else False if word.startswith("reject") else None
+    approved = False
+    for match in _VERDICT_WORDS.finditer(text):
+        negated = is_negated(text, match.start())
+        if match.lastgroup == "reject" and not negated or match.lastgroup == "approve" and negated:
+            return False
+        approved = approved or match.lastgroup == "approve"
+    return True if approved else None
+
+def split_sentences(text: str) -> List[str]:
+    return [s for s in (part.strip() for part in _SENTENCE.split(text)) if s]
+
+class EthicsClassifier:
+    """
+    Multi-label logistic regression over signed, hashed word unigrams and bigrams.
+    Each sentence is scored on its own and a plan takes the maximum per label, so one
+    over-promising sentence is not diluted by an otherwise sound plan. Trains on the
+    bundled examples in a fraction of a second with full-batch gradient descent; NumPy only.
+    """
+
+    def __init__(self, dim: int = 4096, labels: Sequence[str] = ETHICS_LABELS):
+        self.dim = dim
+        self.labels = tuple(labels)
+        self.weights = np.zeros((dim, len(self.labels)), dtype=np.float32)
+        self.bias = np.zeros(len(self.labels), dtype=np.float32)
+
+    def featurize(self, sentences: Sequence[str]) -> np.ndarray:
+        """L2-normalized hashed n-gram counts, one row per sentence."""
+        x = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            words = _WORD.findall(sentence.lower())
+            for gram in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                h = zlib.crc32(gram.encode("utf-8"))
+                x[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(x, axis=1, keepdims=True)
+        return x / np.maximum(norms, 1e-12)
+
+    def fit(self, texts: Sequence[str], targets: np.ndarray, epochs: int = 1000,
+            learning_rate: float = 8.0, l2: float = 1e-4) -> "EthicsClassifier":
+        """
+        Fits on sentences and a (n, labels) 0/1 target matrix. Positives are up-weighted
+        per label so the rare flagged class is not ignored.
+        """
+        x = self.featurize(texts)
+        y = np.asarray(targets, dtype=np.float32)
+        positives = np.clip(y.sum(axis=0), 1.0, None)
+        sample_weight = np.where(y > 0, len(y) / (2 * positives), len(y) / (2 * np.clip(len(y) - positives, 1.0, None)))
+        for _ in range(epochs):
+            p = self._sigmoid(x @ self.weights + self.bias)
+            error = (p - y) * sample_weight / len(y)
+            self.weights -= learning_rate * (x.T @ error + l2 * self.weights)
+            self.bias -= learning_rate * error.sum(axis=0)
+        return self
+
+    @staticmethod
+    def _sigmoid(z: np.ndarray) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-np.clip(z, -30.0, 30.0)))
+
+    def predict(self, text: str) -> Dict[str, Dict[str, Any]]:
+        """Per label: the highest sentence probability and that sentence."""
+        sentences = split_sentences(text)
+        if not sentences:
+            return {label: {"probability": 0.0, "sentence": ""} for label in self.labels}
+        p = self._sigmoid(self.featurize(sentences) @ self.weights + self.bias)
+        best = p.argmax(axis=0)
+        return {label: {"probability": float(p[best[j], j]), "sentence": sentences[best[j]]}
+                for j, label in enumerate(self.labels)}
+
+    @classmethod
+    def from_jsonl(cls, path: Union[str, Path], **kwargs) -> "EthicsClassifier":
+        """Trains on a JSONL file of {"text": ..., <label>: 0/1, ...} examples."""
+        with open(path, "r", encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        classifier = cls(**kwargs)
+        targets = np.array([[row.get(label, 0) for label in classifier.labels] for row in rows], dtype=np.float32)
+        return classifier.fit([row["text"] for row in rows], targets)
+
+@lru_cache(maxsize=1)
+def get_ethics_classifier() -> Optional[EthicsClassifier]:
+    """Returns the shared classifier, trained on first use; None when disabled or untrainable."""
+    if not settings.AUDIT_CLASSIFIER_ENABLED:
+        return None
+    try:
+        return EthicsClassifier.from_jsonl(settings.AUDIT_TRAINING_FILE)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error training ethics classifier: {e}")
+        return None
+
+# Example usage
+if __name__ == "__main__":
+    classifier = get_ethics_classifier()
+    for text in ["Row planting teff improves tillering.", "This seed is certain to make you rich."]:
+        print(rule_flags(text), classifier.predict(text))
@@ -0,0 +1,249 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel, Field
+from ethio_agri_advisor.tools.gazetteer import Gazetteer, get_gazetteer
+
+class FarmFeatures(BaseModel):
+    """
+    Schema for the agricultural features extracted from a farmer's message.
+    Deliberately has no fields for names, phone numbers or coordinates.
+    """
+
+    crop_type: Optional[str] = Field(None, description="Main crop, lower case English name, e.g. 'teff', 'maize', 'wheat'.")
+    soil_ph: Optional[float] = Field(None, ge=3.0, le=10.0, description="Soil pH. Estimate from descriptions ('slightly acidic' is about 6.0).")
+    soil_nitrogen: Optional[float] = Field(None, ge=0.0, le=5.0, description="Soil total nitrogen in percent, if stated.")
+    zone: Optional[str] = Field(None, description="Ethiopian administrative zone, e.g. 'East Gojjam'.")
+    region: Optional[str] = Field(None, description="Ethiopian regional state, e.g. 'Amhara'.")
+    woreda: Optional[str] = Field(None, description="Woreda (district), if stated.")
+    area_ha: Optional[float] = Field(None, ge=0.0, description="Farm size in hectares (1 timad = 0.25 ha, 1 gasha = 40 ha).")
+    elevation: Optional[float] = Field(None, description="Elevation in metres, if stated.")
+    summary: str = Field("", description="One or two sentences on crop, soil and regional context, without any personal information.")
+
+# Zone -> region table for the free-text zone regex; forms also go through the full gazetteer.
+ZONE_REGIONS: Dict[str, str] = {
+    # Amhara
+    "North Gondar": "Amhara", "Central Gondar": "Amhara", "South Gondar": "Amhara", "West Gondar": "Amhara",
+    "North Wollo": "Amhara", "South Wollo": "Amhara", "Wag Hemra": "Amhara", "North Shewa": "Amhara",
+    "East Gojjam": "Amhara", "West Gojjam": "Amhara", "Awi": "Amhara",
+    # Oromia
+    "Arsi": "Oromia", "West Arsi": "Oromia", "Bale": "Oromia", "East Shewa": "Oromia", "West Shewa": "Oromia",
+    "South West Shewa": "Oromia", "Jimma": "Oromia", "Illubabor": "Oromia", "East Wellega": "Oromia",
+    "West Wellega": "Oromia", "Horo Guduru Wellega": "Oromia", "Kelam Wellega": "Oromia",
+    "East Hararghe": "Oromia", "West Hararghe": "Oromia", "Guji": "Oromia", "Borena": "Oromia",
+    # Tigray
+    "Central Tigray": "Tigray", "Eastern Tigray": "Tigray", "Southern Tigray": "Tigray",
+    "Western Tigray": "Tigray", "North Western Tigray": "Tigray",
+    # Southern and south-western regions
+    "Sidama": "Sidama", "Gurage": "Central Ethiopia", "Hadiya": "Central Ethiopia", "Silte": "Central Ethiopia",
+    "Kembata Tembaro": "Central Ethiopia", "Wolaita": "South Ethiopia", "Gamo": "South Ethiopia",
+    "Gofa": "South Ethiopia", "South Omo": "South Ethiopia", "Gedeo": "South Ethiopia",
+    "Kaffa": "South West Ethiopia", "Bench Sheko": "South West Ethiopia",
+    # Lowland regions
+    "Fafan": "Somali", "Jarar": "Somali", "Shabelle": "Somali", "Awsi Rasu": "Afar",
+    "Metekel": "Benishangul-Gumuz", "Asosa": "Benishangul-Gumuz", "Agnewak": "Gambela"
+}
+
+REGIONS = sorted(set(ZONE_REGIONS.values()) | {"Harari", "Addis Ababa", "Dire Dawa"})
+
+# Crop synonyms (English, transliterated Amharic/Afaan Oromoo and Ge'ez script) -> canonical name.
+CROP_SYNONYMS: Dict[str, str] = {
+    "teff": "teff", "tef": "teff", "ጤፍ": "teff", "xaafii": "teff",
+    "maize": "maize", "corn": "maize", "bekolo": "maize", "በቆሎ": "maize", "boqqolloo": "maize",
+    "sorghum": "sorghum", "mashila": "sorghum", "ማሽላ": "sorghum", "mishingaa": "sorghum",
+    "wheat": "wheat", "sinde": "wheat", "ስንዴ": "wheat", "qamadii": "wheat",
+    "barley": "barley", "gebs": "barley", "ገብስ": "barley", "garbuu": "barley",
+    "coffee": "coffee", "buna": "coffee", "ቡና": "coffee",
+    "sesame": "sesame", "selit": "sesame", "chickpea": "chickpea", "shimbra": "chickpea",
+    "faba bean": "faba bean", "bakela": "faba bean", "haricot bean": "haricot bean"
+}
+
+# Descriptive soil reactions -> representative pH.
+SOIL_REACTIONS: List[Tuple[str, float]] = [
+    ("strongly acidic", 5.0), ("very acidic", 5.0), ("moderately acidic", 5.5), ("slightly acidic", 6.0),
+    ("acidic", 5.5), ("neutral", 7.0), ("slightly alkaline", 7.8), ("alkaline", 8.2), ("saline", 8.5)
+]
+
+AREA_UNITS_HA = {"ha": 1.0, "hectare": 1.0, "hectares": 1.0, "timad": 0.25, "timads": 0.25, "kert": 0.25,
+                 "gasha": 40.0, "m2": 1e-4, "sqm": 1e-4}
+
+# Form keys as farmers and USSD menus write them -> schema field.
+FORM_KEYS = {
+    "crop": "crop_type", "crop_type": "crop_type", "cr": "crop_type", "sebil": "crop_type",
+    "zone": "zone", "zn": "zone", "region": "region", "reg": "region", "kilil": "region",
+    "woreda": "woreda", "wrd": "woreda", "district": "woreda",
+    "ph": "soil_ph", "soil_ph": "soil_ph", "soilph": "soil_ph",
+    "n": "soil_nitrogen", "nitrogen": "soil_nitrogen", "soil_n": "soil_nitrogen",
+    "area": "area_ha", "size": "area_ha", "land": "area_ha", "area_ha": "area_ha",
+    "elevation": "elevation", "alt": "elevation", "altitude": "elevation"
+}
+
+REQUIRED_FIELDS = ("crop_type", "zone")
+
+def _phrase_regex(phrases) -> re.Pattern:
+    alternation = "|".join(re.escape(p) for p in sorted(phrases, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternation})(?!\w)", re.IGNORECASE)
+
+class FastFeatureExtractor:
+    """
+    Deterministic, regex and gazetteer based feature extractor.
+    Recognizes SMS/USSD style form submissions ("CROP:teff;ZONE:East Gojjam;PH:5.8;AREA:2ha")
+    completely, so the LLM can be skipped for them, and pulls whatever it can out of free text
+    (crops, zones, pH values or descriptions, areas in ha/timad/gasha).
+    Patterns are compiled once per instance.
+    """
+
+    _FORM_FIELD = re.compile(r"(?P<key>[A-Za-z_]{1,12})\s*[:=]\s*(?P<value>[^;|\n,#]+)")
+    _NUMBER = re.compile(r"\d+(?:\.\d+)?")
+    _PH = re.compile(r"\bph\s*(?:of|is|=|:|~|about|around)?\s*(\d+(?:\.\d+)?)", re.IGNORECASE)
+    _NITROGEN = re.compile(r"\bnitrogen\s*(?:of|is|=|:)?\s*(\d+(?:\.\d+)?)\s*%?", re.IGNORECASE)
+    _ELEVATION = re.compile(r"(\d{3,4})\s*(?:m|masl|metres|meters)\b(?:\s*(?:above sea level|elevation|altitude))?", re.IGNORECASE)
+
+    def __init__(self, zone_regions: Optional[Dict[str, str]] = None, crop_synonyms: Optional[Dict[str, str]] = None,
+                 gazetteer: Optional[Gazetteer] = None):
+        self.zone_regions = zone_regions or ZONE_REGIONS
+        self.gazetteer = gazetteer or get_gazetteer()
+        self.crop_synonyms = {k.lower(): v for k, v in (crop_synonyms or CROP_SYNONYMS).items()}
+        self._zones_lower = {z.lower(): z for z in self.zone_regions}
+        self._regions_lower = {r.lower(): r for r in REGIONS}
+        self._crop_re = _phrase_regex(self.crop_synonyms)
+        self._zone_re = _phrase_regex(self.zone_regions)
+        self._region_re = _phrase_regex(REGIONS)
+        self._reaction_re = _phrase_regex([phrase for phrase, _ in SOIL_REACTIONS])
+        self._reaction_ph = dict(SOIL_REACTIONS)
+        units = "|".join(sorted(AREA_UNITS_HA, key=len, reverse=True))
+        self._area_re = re.compile(rf"(\d+(?:\.\d+)?)\s*({units})\b", re.IGNORECASE)
+
+    def _crop(self, text: str) -> Optional[str]:
+        m = self._crop_re.search(text)
+        return self.crop_synonyms[m.group().lower()] if m else None
+
+    def _zone(self, text: str) -> Optional[str]:
+        m = self._zone_re.search(text)
+        return self.canonical_zone(m.group()) if m else None
+
+    def canonical_zone(self, name: str) -> Optional[str]:
+        """Canonical zone name; misspellings ("E. Gojam") resolve through the gazetteer's fuzzy index."""
+        zone = self._zones_lower.get(name.strip().lower())
+        if zone is None:
+            place = self.gazetteer.lookup(name, "zone")
+            zone = place.name if place is not None else None
+        return zone
+
+    def _zone_region(self, zone: str) -> Optional[str]:
+        region = self.zone_regions.get(zone)
+        if region is None:
+            place = self.gazetteer.lookup(zone, "zone")
+            region = place.region if place is not None else None
+        return region
+
+    def _region(self, text: str) -> Optional[str]:
+        m = self._region_re.search(text)
+        return self._regions_lower[m.group().lower()] if m else None
+
+    def _area(self, text: str) -> Optional[float]:
+        m = self._area_re.search(text)
+        if not m:
+            return None
+        return float(m.group(1)) * AREA_UNITS_HA[m.group(2).lower()]
+
+    def _soil_ph(self, text: str) -> Optional[float]:
+        m = self._PH.search(text)
+        if m and 3.0 <= float(m.group(1)) <= 10.0:
+            return float(m.group(1))
+        m = self._reaction_re.search(text)
+        return self._reaction_ph[m.group().lower()] if m else None
+
+    def parse_form(self, text: str) -> Dict[str, Any]:
+        """
+        Fields from key/value pairs ("KEY:VALUE" or "key=value", separated by ; | , # or newlines).
+        Unknown keys are ignored; values that do not parse are dropped.
+        """
+        fields: Dict[str, Any] = {}
+        for m in self._FORM_FIELD.finditer(text):
+            field = FORM_KEYS.get(m.group("key").strip().lower())
+            if field is None or field in fields:
+                continue
+            value = m.group("value").strip()
+            if field == "crop_type":
+                fields[field] = self.crop_synonyms.get(value.lower(), value.lower())
+            elif field == "zone":
+                fields[field] = self.canonical_zone(value) or value.title()
+            elif field == "region":
+                fields[field] = self._regions_lower.get(value.lower(), value.title())
+            elif field == "woreda":
+                fields[field] = value.title()
+            elif field == "area_ha":
+                area = self._area(value)
+                number = self._NUMBER.search(value)
+                if area is not None or number:
+                    fields[field] = area if area is not None else float(number.group())
+            else:
+                number = self._NUMBER.search(value)
+                if number:
+                    fields[field] = float(number.group())
+        return fields
+
+    def parse_text(self, text: str) -> Dict[str, Any]:
+        """Best-effort fields from free text."""
+        fields = {
+            "crop_type": self._crop(text),
+            "zone": self._zone(text),
+            "region": self._region(text),
+            "soil_ph": self._soil_ph(text),
+            "area_ha": self._area(text)
+        }
+        m = self._NITROGEN.search(text)
+        if m:
+            fields["soil_nitrogen"] = float(m.group(1))
+        m = self._ELEVATION.search(text)
+        if m:
+            fields["elevation"] = float(m.group(1))
+        return {k: v for k, v in fields.items() if v is not None}
+
+    def extract(self, text: str) -> Tuple[FarmFeatures, bool]:
+        """
+        Returns (features, complete). `complete` is True when the input is a structured form
+        whose required fields were all recognized, i.e. no LLM call is needed.
+        """
+        form = self.parse_form(text)
+        structured = len(form) >= 2
+        fields = form if structured else self.parse_text(text)
+        if fields.get("woreda") and not fields.get("zone"):
+            # A woreda alone is enough: the gazetteer knows its zone and region.
+            place = self.gazetteer.lookup(fields["woreda"], "woreda")
+            if place is not None:
+                fields["woreda"], fields["zone"] = place.name, place.parent
+                fields.setdefault("region", place.region)
+        if fields.get("zone") and not fields.get("region"):
+            fields["region"] = self._zone_region(fields["zone"])
+        fields = {k: v for k, v in fields.items() if v is not None}
+        try:
+            features = FarmFeatures(**fields)
+        except ValueError:
+            # Out-of-range values (e.g. a pH of 14) are dropped rather than trusted.
+            features = FarmFeatures(**{k: v for k, v in fields.items() if k not in ("soil_ph", "soil_nitrogen", "area_ha")})
+        complete = structured and all(getattr(features, f) for f in REQUIRED_FIELDS)
+        if complete:
+            features.summary = self.summarize(features)
+        return features, complete
+
+    @staticmethod
+    def summarize(features: FarmFeatures) -> str:
+        """Deterministic, PII-free summary used when the LLM is skipped."""
+        parts = [f"Farm growing {features.crop_type or 'an unspecified crop'}"]
+        if features.zone:
+            parts.append(f"in {features.zone}" + (f" ({features.region})" if features.region else ""))
+        details = []
+        if features.soil_ph is not None:
+            details.append(f"soil pH {features.soil_ph:g}")
+        if features.soil_nitrogen is not None:
+            details.append(f"soil nitrogen {features.soil_nitrogen:g}%")
+        if features.area_ha is not None:
+            details.append(f"{features.area_ha:g} ha")
+        return " ".join(parts) + (f"; {', '.join(details)}." if details else ".")
+
+# Example usage
+if __name__ == "__main__":
+    extractor = FastFeatureExtractor()
+    print(extractor.extract("CROP:teff;ZONE:East Gojjam;PH:5.8;AREA:8 timad"))
+    print(extractor.extract("I am a farmer in East Gojjam, Amhara. I have 2 hectares. The soil is slightly acidic. I plant Teff."))
@@ -0,0 +1,178 @@
+import csv
+import difflib
+import os
+import re
+import numpy as np
+from bisect import bisect_left
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+from ethio_agri_advisor.config import settings
+from ethio_agri_advisor.core.weather_service import grid_cell
+
+GAZETTEER_LEVELS = ("region", "zone", "woreda")
+
+# Fixed-width record layout so the compiled index can be memory-mapped (no object arrays).
+GAZETTEER_DTYPE = np.dtype([
+    ("key", "U48"), ("name", "U48"), ("level", "i1"), ("parent", "U48"), ("region", "U32"),
+    ("latitude", "f4"), ("longitude", "f4"), ("elevation", "f4")
+])
+
+_SUFFIXES = re.compile(r"\s+(?:zone|woreda|wereda|district|region|kilil)$")
+_PUNCTUATION = re.compile(r"[.'’`]")
+
+class Place(NamedTuple):
+    name: str
+    level: str
+    parent: str
+    region: str
+    latitude: float
+    longitude: float
+    elevation: float
+
+def normalize_name(name: str) -> str:
+    """Lookup key: lower case, no punctuation, single spaces, no trailing "zone"/"woreda"."""
+    key = " ".join(_PUNCTUATION.sub("", name).replace("-", " ").lower().split())
+    return _SUFFIXES.sub("", key)
+
+def compile_gazetteer(csv_path: Union[str, Path], index_path: Union[str, Path]) -> Path:
+    """
+    Compiles the gazetteer CSV into a sorted .npy record array.
+    Rows are sorted by lookup key, so name search is a bisect over the mapped array.
+    """
+    rows = []
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            rows.append((normalize_name(row["name"]), row["name"], GAZETTEER_LEVELS.index(row["level"]),
+                         row["parent"], row["region"], float(row["latitude"]), float(row["longitude"]),
+                         float(row["elevation_m"])))
+    table = np.array(sorted(rows, key=lambda r: (r[0], r[2])), dtype=GAZETTEER_DTYPE)
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename, so a concurrent reader never maps a half-written file.
+    tmp_path = index_path.with_name(f"{index_path.stem}.{os.getpid()}.tmp.npy")
+    np.save(tmp_path, table)
+    os.replace(tmp_path, index_path)
+    return index_path
+
+class Gazetteer:
+    """
+    Memory-mapped index of Ethiopian regions, zones and woredas with centroids and elevation.
+
+    The CSV in data/ is compiled once into a sorted .npy file and mapped read-only, so
+    start-up does not parse the CSV. Names resolve by exact match, then unique prefix, then
+    fuzzy match (difflib), and resolved lookups are memoized. A place resolves to its
+    centroid's weather grid cell, which gives weather context without exact farm GPS.
+    """
+
+    def __init__(self, csv_path: Optional[Union[str, Path]] = None, index_path: Optional[Union[str, Path]] = None,
+                 fuzzy_cutoff: float = None):
+        self.csv_path = Path(csv_path or settings.GAZETTEER_FILE)
+        self.index_path = Path(index_path or settings.GAZETTEER_INDEX_PATH)
+        self.fuzzy_cutoff = settings.GAZETTEER_FUZZY_CUTOFF if fuzzy_cutoff is None else fuzzy_cutoff
+        self.table = self._load()
+        # Keys as a Python list: bisect on it costs ~1 µs, versus far more for NumPy scalar compares.
+        self._keys: List[str] = self.table["key"].tolist()
+        self._levels: List[int] = self.table["level"].tolist()
+        self.lookup = lru_cache(maxsize=4096)(self._lookup)
+
+    def _load(self) -> np.ndarray:
+        try:
+            stale = (not self.index_path.exists()
+                     or self.index_path.stat().st_mtime < self.csv_path.stat().st_mtime)
+            if stale:
+                compile_gazetteer(self.csv_path, self.index_path)
+            return np.load(self.index_path, mmap_mode="r")
+        except OSError as e:
+            # Read-only install or missing cache dir: build the table in memory instead.
+            print(f"Gazetteer index unavailable ({e}); loading the CSV directly.")
+        try:
+            tmp_index = Path(os.getenv("TMPDIR", "/tmp")) / f"ethio_gazetteer.{os.getpid()}.npy"
+            table = np.load(compile_gazetteer(self.csv_path, tmp_index))
+            tmp_index.unlink(missing_ok=True)
+            return table
+        except OSError as e:
+            print(f"Error loading gazetteer: {e}")
+            return np.zeros(0, dtype=GAZETTEER_DTYPE)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _place(self, i: int) -> Place:
+        row = self.table[i]
+        return Place(str(row["name"]), GAZETTEER_LEVELS[int(row["level"])], str(row["parent"]), str(row["region"]),
+                     round(float(row["latitude"]), 4), round(float(row["longitude"]), 4), float(row["elevation"]))
+
+    def _range(self, key: str, prefix: bool = False) -> range:
+        lo = bisect_left(self._keys, key)
+        hi = lo
+        while hi < len(self._keys) and (self._keys[hi].startswith(key) if prefix else self._keys[hi] == key):
+            hi += 1
+        return range(lo, hi)
+
+    def _pick(self, rows: range, level: Optional[str]) -> Optional[int]:
+        """Row for the requested level or, without one, the finest level among rows sharing a name."""
+        if level is not None:
+            wanted = GAZETTEER_LEVELS.index(level)
+            return next((i for i in rows if self._levels[i] == wanted), None)
+        return max(rows, key=lambda i: self._levels[i], default=None)
+
+    def places(self, level: Optional[str] = None) -> List[Place]:
+        """Every place, or every place at one level, in name order."""
+        wanted = GAZETTEER_LEVELS.index(level) if level is not None else None
+        return [self._place(i) for i, lv in enumerate(self._levels) if wanted is None or lv == wanted]
+
+    def prefix(self, text: str, limit: int = 10, level: Optional[str] = None) -> List[Place]:
+        """Places whose name starts with text, in name order."""
+        wanted = GAZETTEER_LEVELS.index(level) if level is not None else None
+        rows = [i for i in self._range(normalize_name(text), prefix=True) if wanted is None or self._levels[i] == wanted]
+        return [self._place(i) for i in rows[:limit]]
+
+    def _lookup(self, name: str, level: Optional[str] = None) -> Optional[Place]:
+        """
+        Best match for name (optionally restricted to one level): exact, then a unique
+        prefix, then the closest fuzzy match above the cutoff. None if nothing is close.
+        """
+        key = normalize_name(name)
+        if not key:
+            return None
+        i = self._pick(self._range(key), level)
+        if i is None:
+            rows = self._range(key, prefix=True)
+            names = {self._keys[j] for j in rows}
+            if len(names) == 1:
+                i = self._pick(rows, level)
+        if i is None and self.fuzzy_cutoff < 1.0:
+            wanted = GAZETTEER_LEVELS.index(level) if level is not None else None
+            candidates = [k for k, lv in zip(self._keys, self._levels) if wanted is None or lv == wanted]
+            match = difflib.get_close_matches(key, candidates, n=1, cutoff=self.fuzzy_cutoff)
+            if match:
+                i = self._pick(self._range(match[0]), level)
+        return self._place(i) if i is not None else None
+
+    def resolve(self, features: Dict[str, Any]) -> Optional[Place]:
+        """The most specific place named in features: woreda, then zone, then region."""
+        for level in reversed(GAZETTEER_LEVELS):
+            name = features.get(level)
+            if name:
+                place = self.lookup(name, level)
+                if place is not None:
+                    return place
+        return None
+
+    def cell(self, features: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        """Weather grid cell of the place named in features, or None if it cannot be resolved."""
+        place = self.resolve(features)
+        return grid_cell(place.latitude, place.longitude) if place is not None else None
+
+@lru_cache(maxsize=1)
+def get_gazetteer() -> Gazetteer:
+    """Returns the shared gazetteer, compiled and mapped on first use."""
+    return Gazetteer()
+
+# Example usage
+if __name__ == "__main__":
+    gazetteer = get_gazetteer()
+    print(gazetteer.lookup("East Gojam"))
+    print(gazetteer.prefix("west", level="zone"))
+    print(gazetteer.cell({"zone": "Arsi", "region": "Oromia"}))
@@ -0,0 +1,317 @@
+import hashlib
+import json
+import math
+import re
+import sqlite3
+import threading
+import zlib
+import numpy as np
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+from ethio_agri_advisor.config import settings
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+# Dropped at index and query time. "ethiopia" and "resilience" appear in every planner query.
+STOPWORDS = frozenset({
+    "the", "and", "for", "with", "from", "that", "this", "are", "was", "were", "has", "have", "can", "use",
+    "its", "into", "than", "when", "where", "which", "such", "also", "not", "but", "all", "each", "per",
+    "ethiopia", "ethiopian", "resilience"
+})
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if len(t) > 2 and t not in STOPWORDS]
+
+def split_passages(text: str, max_words: int = 80) -> List[str]:
+    """Groups whole sentences into passages of at most max_words words (a longer sentence stands alone)."""
+    passages, current, words = [], [], 0
+    for sentence in _SENTENCE.split(text.strip()):
+        n = len(sentence.split())
+        if current and words + n > max_words:
+            passages.append(" ".join(current))
+            current, words = [], 0
+        current.append(sentence)
+        words += n
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+def _top_k(scores: np.ndarray, candidates: np.ndarray, k: int) -> np.ndarray:
+    """The k candidates with the highest scores, best first (argpartition, then a sort of k)."""
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+class HashedVectorIndex:
+    """
+    Int8-quantized vectors of signed, hashed character trigrams, searched by cosine similarity.
+    It needs no embedding model and catches spelling variants BM25 misses ("tef", "wolayta").
+    Pass `embed` to use real embeddings instead; they are quantized the same way.
+    """
+
+    def __init__(self, dim: int = 256, embed=None):
+        self.dim = dim
+        self.embed = embed or self._hashed_trigrams
+        self.vectors = np.zeros((0, dim), dtype=np.int8)
+        self.scales = np.zeros(0, dtype=np.float32)
+        self.size = 0
+
+    def _hashed_trigrams(self, text: str) -> np.ndarray:
+        v = np.zeros(self.dim, dtype=np.float32)
+        for token in tokenize(text):
+            padded = f"#{token}#"
+            for i in range(len(padded) - 2):
+                h = zlib.crc32(padded[i:i + 3].encode("utf-8"))
+                v[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return v
+
+    def quantize(self, text: str) -> Tuple[np.ndarray, float]:
+        """(int8 vector, scale) of the unit-normalized embedding; vector * scale recovers it."""
+        v = np.asarray(self.embed(text), dtype=np.float32)
+        norm = float(np.linalg.norm(v))
+        if norm == 0.0:
+            return np.zeros(self.dim, dtype=np.int8), 0.0
+        v /= norm
+        scale = float(np.abs(v).max()) / 127.0
+        return np.round(v / scale).astype(np.int8), scale
+
+    def add(self, row: int, vector: np.ndarray, scale: float):
+        if row >= len(self.vectors):
+            capacity = max(16, 2 * len(self.vectors), row + 1)
+            self.vectors = np.resize(self.vectors, (capacity, self.dim))
+            self.scales = np.resize(self.scales, capacity)
+        self.vectors[row] = vector
+        self.scales[row] = scale
+        self.size = max(self.size, row + 1)
+
+    def scores(self, text: str) -> np.ndarray:
+        """Cosine similarity of text to every stored row."""
+        q, q_scale = self.quantize(text)
+        dots = self.vectors[:self.size].astype(np.int32) @ q.astype(np.int32)
+        return dots.astype(np.float32) * self.scales[:self.size] * np.float32(q_scale)
+
+class GuidelineIndex:
+    """
+    On-disk BM25 index of guideline passages, with an optional quantized vector index.
+
+    Documents are split into passages. Passages, postings and vectors are stored in SQLite
+    and held in memory as per-term arrays, so a query touches only the postings of its own
+    terms and returns in well under a millisecond. Adds are incremental: a document with
+    a known URL and unchanged content is skipped, and changed content replaces (tombstones)
+    its old passages.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, vectors: Optional[bool] = None,
+                 k1: float = 1.5, b: float = 0.75, max_passage_words: int = 80):
+        self.path = Path(path or settings.GUIDELINE_INDEX_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.k1 = k1
+        self.b = b
+        self.max_passage_words = max_passage_words
+        self.vector_index = HashedVectorIndex() if (settings.GUIDELINE_VECTOR_INDEX if vectors is None else vectors) else None
+        self._lock = threading.RLock()
+        self._passages: List[Tuple[str, str, str]] = []
+        self._lengths: List[int] = []
+        self._live: List[bool] = []
+        self._hashes: Dict[str, str] = {}
+        self._postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._dense: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._total_length = 0
+        self._live_count = 0
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS passages ("
+            "id INTEGER PRIMARY KEY, url TEXT NOT NULL, title TEXT NOT NULL, content TEXT NOT NULL, "
+            "length INTEGER NOT NULL, live INTEGER NOT NULL DEFAULT 1);"
+            "CREATE INDEX IF NOT EXISTS passages_url ON passages(url);"
+            "CREATE TABLE IF NOT EXISTS sources (url TEXT PRIMARY KEY, content_hash TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, passage_id INTEGER NOT NULL, tf INTEGER NOT NULL, PRIMARY KEY (term, passage_id)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS vectors (passage_id INTEGER PRIMARY KEY, vector BLOB NOT NULL, scale REAL NOT NULL);"
+        )
+        self._conn.commit()
+        self._load()
+
+    def _load(self):
+        rows = self._conn.execute("SELECT id, url, title, content, length, live FROM passages ORDER BY id").fetchall()
+        for passage_id, url, title, content, length, live in rows:
+            self._passages.append((url, title, content))
+            self._lengths.append(length)
+            self._live.append(bool(live))
+            if live:
+                self._total_length += length
+                self._live_count += 1
+        self._hashes = dict(self._conn.execute("SELECT url, content_hash FROM sources").fetchall())
+        for term, passage_id, tf in self._conn.execute("SELECT term, passage_id, tf FROM postings"):
+            ids, tfs = self._postings.setdefault(term, ([], []))
+            ids.append(passage_id)
+            tfs.append(tf)
+        if self.vector_index is not None:
+            stored = {pid: (vec, scale) for pid, vec, scale in self._conn.execute("SELECT passage_id, vector, scale FROM vectors")}
+            for passage_id, (url, title, content) in enumerate(self._passages):
+                if passage_id in stored:
+                    vec, scale = stored[passage_id]
+                    self.vector_index.add(passage_id, np.frombuffer(vec, dtype=np.int8), scale)
+                else:
+                    # Index built before vectors were enabled: embed now and persist.
+                    self._add_vector(passage_id, f"{title} {content}")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    def _add_vector(self, passage_id: int, text: str):
+        vector, scale = self.vector_index.quantize(text)
+        self.vector_index.add(passage_id, vector, scale)
+        self._conn.execute("INSERT OR REPLACE INTO vectors (passage_id, vector, scale) VALUES (?, ?, ?)",
+                           (passage_id, vector.tobytes(), scale))
+
+    def add_documents(self, documents: List[Dict[str, Any]]) -> int:
+        """
+        Indexes documents ({url, content, optional title}). Returns the number of passages added.
+        """
+        added = 0
+        with self._lock:
+            for doc in documents:
+                url, title, content = doc["url"], doc.get("title") or "", doc.get("content") or ""
+                digest = hashlib.sha256(f"{title}\n{content}".encode("utf-8")).hexdigest()
+                if not content.strip() or self._hashes.get(url) == digest:
+                    continue
+                if url in self._hashes:
+                    self._retire(url)
+                self._hashes[url] = digest
+                self._conn.execute("INSERT OR REPLACE INTO sources (url, content_hash) VALUES (?, ?)", (url, digest))
+                for passage in split_passages(content, self.max_passage_words):
+                    self._add_passage(url, title, passage)
+                    added += 1
+            self._conn.commit()
+        return added
+
+    def _add_passage(self, url: str, title: str, content: str):
+        passage_id = len(self._passages)
+        terms = tokenize(f"{title} {content}")
+        counts: Dict[str, int] = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        self._conn.execute("INSERT INTO passages (id, url, title, content, length) VALUES (?, ?, ?, ?, ?)",
+                           (passage_id, url, title, content, len(terms)))
+        self._conn.executemany("INSERT INTO postings (term, passage_id, tf) VALUES (?, ?, ?)",
+                               [(term, passage_id, tf) for term, tf in counts.items()])
+        self._passages.append((url, title, content))
+        self._lengths.append(len(terms))
+        self._live.append(True)
+        self._total_length += len(terms)
+        self._live_count += 1
+        for term, tf in counts.items():
+            ids, tfs = self._postings.setdefault(term, ([], []))
+            ids.append(passage_id)
+            tfs.append(tf)
+            self._arrays.pop(term, None)
+        self._dense = None
+        if self.vector_index is not None:
+            self._add_vector(passage_id, f"{title} {content}")
+
+    def _retire(self, url: str):
+        """Tombstones a source's passages; their postings stay but never score."""
+        self._conn.execute("UPDATE passages SET live = 0 WHERE url = ?", (url,))
+        for passage_id, (passage_url, _, _) in enumerate(self._passages):
+            if passage_url == url and self._live[passage_id]:
+                self._live[passage_id] = False
+                self._total_length -= self._lengths[passage_id]
+                self._live_count -= 1
+        self._arrays.clear()
+        self._dense = None
+
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            ids, tfs = self._postings[term]
+            live = self._live
+            kept = [(i, tf) for i, tf in zip(ids, tfs) if live[i]]
+            arrays = (np.fromiter((i for i, _ in kept), dtype=np.int64, count=len(kept)),
+                      np.fromiter((tf for _, tf in kept), dtype=np.float32, count=len(kept)))
+            self._arrays[term] = arrays
+        return arrays
+
+    def search(self, query: str, k: int = None, hybrid: Optional[bool] = None) -> List[Dict[str, Any]]:
+        """
+        Top-k passages by BM25 (fused with vector similarity by reciprocal rank when hybrid).
+        Each result has url, title, content, score and coverage: the fraction of the query's
+        terms the passage contains.
+        """
+        k = k or settings.GUIDELINE_TOP_K
+        terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            if not self._live_count or not terms:
+                return []
+            if self._dense is None:
+                self._dense = (np.asarray(self._lengths, dtype=np.float32), np.asarray(self._live, dtype=bool))
+            lengths, live = self._dense
+            n = len(self._passages)
+            avg_length = self._total_length / self._live_count
+            scores = np.zeros(n, dtype=np.float32)
+            matched = np.zeros(n, dtype=np.int16)
+            for term in terms:
+                if term not in self._postings:
+                    continue
+                ids, tfs = self._term_arrays(term)
+                if not len(ids):
+                    continue
+                idf = math.log(1 + (self._live_count - len(ids) + 0.5) / (len(ids) + 0.5))
+                dl = lengths[ids]
+                scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + self.k1 * (1 - self.b + self.b * dl / avg_length))
+                matched[ids] += 1
+
+            use_vectors = self.vector_index is not None and (hybrid if hybrid is not None else True)
+            if use_vectors:
+                similarity = self.vector_index.scores(query)
+                similarity[~live] = -np.inf
+                ranking = self._fuse(scores, similarity, k)
+            else:
+                ranking = _top_k(scores, np.flatnonzero(scores), k)
+            return [{"url": self._passages[i][0], "title": self._passages[i][1], "content": self._passages[i][2],
+                     "score": float(scores[i]), "coverage": matched[i] / len(terms)} for i in ranking]
+
+    @staticmethod
+    def _fuse(bm25: np.ndarray, similarity: np.ndarray, k: int, c: int = 60) -> np.ndarray:
+        """Reciprocal-rank fusion of the BM25 and vector rankings."""
+        depth = min(len(bm25), 4 * k)
+        fused: Dict[int, float] = {}
+        for rank, i in enumerate(_top_k(bm25, np.flatnonzero(bm25), depth)):
+            fused[int(i)] = fused.get(int(i), 0.0) + 1.0 / (c + rank)
+        for rank, i in enumerate(_top_k(similarity, np.flatnonzero(np.isfinite(similarity)), depth)):
+            if np.isfinite(similarity[i]) and similarity[i] > 0:
+                fused[int(i)] = fused.get(int(i), 0.0) + 1.0 / (c + rank)
+        return np.array(sorted(fused, key=lambda i: -fused[i])[:k], dtype=np.int64)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"passages": self._live_count, "sources": len(self._hashes), "terms": len(self._postings),
+                    "vectors": self.vector_index is not None}
+
+@lru_cache(maxsize=1)
+def get_guideline_index() -> GuidelineIndex:
+    """Returns the shared index, seeded from the bundled guideline corpus on first use."""
+    index = GuidelineIndex()
+    if not len(index):
+        load_corpus(index, settings.GUIDELINES_CORPUS_FILE)
+    return index
+
+def load_corpus(index: GuidelineIndex, corpus_path: Union[str, Path]) -> int:
+    """Adds a JSONL corpus of {url, title, content} documents. Returns the passages added."""
+    try:
+        with open(corpus_path, "r", encoding="utf-8") as f:
+            return index.add_documents([json.loads(line) for line in f if line.strip()])
+    except (OSError, ValueError) as e:
+        print(f"Error loading guideline corpus: {e}")
+        return 0
+
+# Example usage
+if __name__ == "__main__":
+    index = get_guideline_index()
+    for hit in index.search("drought tolerant maize varieties"):
+        print(f"{hit['score']:.2f} {hit['url']}: {hit['content'][:80]}")
@@ -0,0 +1,294 @@
+import os
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+from ethio_agri_advisor.config import settings
+from ethio_agri_advisor.tools.privacy_engine import PrivacyEngine, SecureAggregationSimulator
+
+LEVELS = ("zone", "region", "national")
+
+# A zone's farm updates: a list (keyed by position) or {farm id: update}.
+FarmUpdates = Union[Sequence[Dict[str, Any]], Mapping[str, Dict[str, Any]]]
+
+def zone_partial(keys: Sequence[str], updates: Sequence[Dict[str, Any]],
+                 secure_neighbors: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, Optional[Dict[str, Any]]]:
+    """
+    Per-feature (sums, counts) over one zone's farm updates.
+    With secure_neighbors, the zone's sums come out of a pairwise-masked secure-aggregation
+    round, so no single farm's update is seen in the clear; the round report is returned too.
+    Module-level so it can run in a worker process.
+    """
+    values, mask = PrivacyEngine.pack_updates(updates, keys)
+    if not secure_neighbors or len(updates) < 2:
+        return np.where(mask, values, 0.0).sum(axis=0), mask.sum(axis=0), None
+    inputs = np.concatenate([np.where(mask, values, 0.0), mask.astype(np.float64)], axis=1)
+    report = SecureAggregationSimulator(neighbors=secure_neighbors).run_round(inputs)
+    totals = report.pop("sum")
+    return totals[:len(keys)], np.rint(totals[len(keys):]).astype(np.int64), report
+
+def _zone_partial_task(args):
+    return zone_partial(*args)
+
+class HierarchicalAggregator:
+    """
+    Zone -> region -> national federated aggregation tree.
+
+    Each zone keeps its latest update per farm and contributes per-feature partial sums
+    and counts over them. Region and national nodes hold the running totals of their
+    children and are updated incrementally, so when one zone's farms change only that
+    zone is recomputed and the delta is pushed up its path. Zone partials can be computed
+    in parallel across a process pool.
+
+    Features fall into two groups. Insight features (values in [0,1]) get Laplace noise
+    on their sums, via PrivacyEngine, once per round (a window of `round_seconds`) for
+    each node at `noise_level`, from its exact sums at the first release of the round;
+    every later release in that round reuses it. Nodes above it are built from their
+    children's noisy sums, which is post-processing and costs no extra budget, and
+    released means are clipped to [0,1]. Nodes below it are never released.
+    Model-update features (names starting with `vector_prefix`, clipped on-device to
+    `clip_norm` in L2 norm) are released only nationally, as one vector with Gaussian
+    noise scaled to the clip norm, once per round. Counts are treated as public
+    participation numbers. With an accountant on the engine, each draw goes through
+    accountant.answer, as "<level>:<name>" for insights and "model" for the update,
+    so it is charged once and cached.
+    """
+
+    def __init__(self, keys: Optional[Sequence[str]] = None, privacy_engine: Optional[PrivacyEngine] = None,
+                 noise_level: str = None, max_workers: Optional[int] = None,
+                 parallel_min_farms: Optional[int] = None, secure_neighbors: Optional[int] = None,
+                 round_seconds: Optional[float] = None, max_farms_per_zone: Optional[int] = None,
+                 vector_prefix: str = "delta_", clip_norm: Optional[float] = None,
+                 noise_multiplier: Optional[float] = None):
+        self.keys = list(keys) if keys is not None else None
+        self.privacy_engine = privacy_engine or PrivacyEngine()
+        self.noise_level = noise_level or settings.FEDERATED_NOISE_LEVEL
+        if self.noise_level not in LEVELS:
+            raise ValueError(f"Unknown noise level: {self.noise_level}. Expected one of {LEVELS}.")
+        self.max_workers = max_workers or settings.FEDERATED_MAX_WORKERS or os.cpu_count()
+        self.parallel_min_farms = settings.FEDERATED_PARALLEL_MIN_FARMS if parallel_min_farms is None else parallel_min_farms
+        self.secure_neighbors = secure_neighbors
+        self.round_seconds = settings.FEDERATED_ROUND_SECONDS if round_seconds is None else round_seconds
+        self.max_farms_per_zone = settings.FEDERATED_MAX_FARMS_PER_ZONE if max_farms_per_zone is None else max_farms_per_zone
+        self.vector_prefix = vector_prefix
+        self.clip_norm = settings.LOCAL_MODEL_CLIP_NORM if clip_norm is None else clip_norm
+        self.noise_multiplier = settings.FEDERATED_MODEL_NOISE_MULTIPLIER if noise_multiplier is None else noise_multiplier
+        self._zone_region: Dict[str, str] = {}
+        self._farms: Dict[str, "OrderedDict[str, Dict[str, Any]]"] = {}
+        self._sums: Dict[Tuple[str, str], np.ndarray] = {}
+        self._counts: Dict[Tuple[str, str], np.ndarray] = {}
+        # Releases of the current round when there is no accountant to cache them: node -> (round, release).
+        self._released: Dict[Tuple[str, str], Tuple[int, Dict[str, List[float]]]] = {}
+        self._lock = threading.RLock()
+        self.zone_reports: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.zone_recomputations = 0
+
+    @staticmethod
+    def _path(zone: str, region: str) -> List[Tuple[str, str]]:
+        return [("zone", zone), ("region", region), ("national", "")]
+
+    def current_round(self) -> int:
+        """Index of the current release round (always 0 when round_seconds is not positive)."""
+        return int(time.time() // self.round_seconds) if self.round_seconds > 0 else 0
+
+    def _zero(self) -> Tuple[np.ndarray, np.ndarray]:
+        return np.zeros(len(self.keys)), np.zeros(len(self.keys), dtype=np.int64)
+
+    def _add(self, node: Tuple[str, str], sums: np.ndarray, counts: np.ndarray, sign: int):
+        zero_sums, zero_counts = self._zero()
+        self._sums[node] = self._sums.get(node, zero_sums) + sign * sums
+        self._counts[node] = self._counts.get(node, zero_counts) + sign * counts
+
+    def _apply(self, zone: str, region: str, sums: np.ndarray, counts: np.ndarray):
+        """Replaces one zone's partial and pushes the change up the tree."""
+        with self._lock:
+            old_region = self._zone_region.get(zone)
+            if old_region is not None:
+                old_sums, old_counts = self._sums[("zone", zone)], self._counts[("zone", zone)]
+                for node in self._path(zone, old_region):
+                    self._add(node, old_sums, old_counts, -1)
+            for node in self._path(zone, region):
+                self._add(node, sums, counts, +1)
+            self._zone_region[zone] = region
+
+    def _ensure_keys(self, updates: Sequence[Dict[str, Any]]):
+        if self.keys is None:
+            if not updates:
+                raise ValueError("Cannot infer feature keys from an empty update set.")
+            self.keys = list(updates[0].keys())
+
+    @staticmethod
+    def _as_farms(updates: FarmUpdates) -> "OrderedDict[str, Dict[str, Any]]":
+        if isinstance(updates, Mapping):
+            return OrderedDict(updates)
+        return OrderedDict((str(i), update) for i, update in enumerate(updates))
+
+    def _set_farms(self, zone: str, farms: "OrderedDict[str, Dict[str, Any]]") -> List[Dict[str, Any]]:
+        """Stores a zone's farms, dropping the least recently updated beyond max_farms_per_zone."""
+        while len(farms) > self.max_farms_per_zone:
+            farms.popitem(last=False)
+        self._farms[zone] = farms
+        return list(farms.values())
+
+    def update_zone(self, zone: str, region: str, updates: FarmUpdates):
+        """
+        Sets one zone's farm updates (replacing its earlier ones) and incrementally updates
+        its region and the national total.
+        """
+        with self._lock:
+            updates = self._set_farms(zone, self._as_farms(updates))
+            self._ensure_keys(updates)
+            sums, counts, report = zone_partial(self.keys, updates, self.secure_neighbors)
+            self.zone_reports[zone] = report
+            self.zone_recomputations += 1
+            self._apply(zone, region, sums, counts)
+
+    def upsert_farms(self, zone: str, region: str, farm_updates: Mapping[str, Dict[str, Any]]):
+        """
+        Adds or replaces the updates of the given farms, keeping the zone's other farms,
+        and recomputes the zone. A farm that reports again replaces its earlier update.
+        """
+        with self._lock:
+            farms = OrderedDict(self._farms.get(zone, ()))
+            for farm_id, update in farm_updates.items():
+                farms.pop(farm_id, None)
+                farms[farm_id] = update
+            self.update_zone(zone, region, farms)
+
+    def update_zones(self, zone_updates: Dict[str, Tuple[str, FarmUpdates]]):
+        """
+        Sets many zones at once: {zone: (region, updates)}. Zone partials are computed in a
+        process pool when there are enough farms to pay for it, then folded in.
+        """
+        if not zone_updates:
+            return
+        zones = list(zone_updates)
+        with self._lock:
+            farm_lists = [self._set_farms(zone, self._as_farms(zone_updates[zone][1])) for zone in zones]
+            self._ensure_keys(farm_lists[0])
+        tasks = [(self.keys, updates, self.secure_neighbors) for updates in farm_lists]
+        total_farms = sum(len(updates) for updates in farm_lists)
+        if len(zones) > 1 and self.max_workers > 1 and total_farms >= self.parallel_min_farms:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(zones))) as pool:
+                partials = list(pool.map(_zone_partial_task, tasks, chunksize=max(1, len(zones) // (4 * self.max_workers))))
+        else:
+            partials = [zone_partial(*task) for task in tasks]
+        for zone, (sums, counts, report) in zip(zones, partials):
+            self.zone_reports[zone] = report
+            self.zone_recomputations += 1
+            self._apply(zone, zone_updates[zone][0], sums, counts)
+
+    def _columns(self, vector: bool) -> np.ndarray:
+        """Indices of the model-update (vector=True) or insight features in self.keys."""
+        return np.array([j for j, key in enumerate(self.keys) if key.startswith(self.vector_prefix) == vector], dtype=np.int64)
+
+    def _cached_release(self, node: Tuple[str, str], round_id: int, compute, **cost) -> Dict[str, List[float]]:
+        """
+        Runs compute once per (node, round): through the accountant when there is one
+        (charged to the node's entity and cached), otherwise cached here for the round.
+        """
+        engine = self.privacy_engine
+        level, name = node
+        if engine.accountant is not None:
+            query = engine.accountant.query_key("release", level, name, round_id, self.keys)
+            return engine.accountant.answer(f"{level}:{name}" if name else level, query, compute, **cost)
+        with self._lock:
+            cached = self._released.get(node)
+            if cached is None or cached[0] != round_id:
+                cached = (round_id, compute())
+                self._released[node] = cached
+            return cached[1]
+
+    def _noisy_release(self, node: Tuple[str, str], round_id: int) -> Dict[str, List[float]]:
+        """
+        Noisy insight sums and the counts behind them for a node at the noise level, drawn
+        on the first request of the round and reused for the rest of it.
+        """
+        columns = self._columns(vector=False)
+
+        def compute() -> Dict[str, List[float]]:
+            with self._lock:
+                sums, counts = self._sums[node][columns], self._counts[node][columns]
+            # Sensitivity of a sum is 1 per feature when each farm's value lies in [0,1].
+            noisy = self.privacy_engine.add_differential_privacy_noise(sums, sensitivity=1.0)
+            return {"sums": noisy.tolist(), "counts": counts.tolist()}
+
+        return self._cached_release(node, round_id, compute, epsilon=self.privacy_engine.epsilon,
+                                    releases=len(columns))
+
+    def _noise_nodes(self, level: str, name: str) -> List[Tuple[str, str]]:
+        """Nodes at the noise level whose noisy sums make up the release of (level, name)."""
+        if level == self.noise_level:
+            return [(level, name)]
+        with self._lock:
+            if self.noise_level == "zone":
+                zones = [z for z, r in self._zone_region.items() if level == "national" or r == name]
+                return [("zone", z) for z in sorted(zones)]
+            return [("region", r) for r in sorted(set(self._zone_region.values()))]
+
+    def release(self, level: str, name: str = "", round_id: Optional[int] = None) -> Dict[str, float]:
+        """
+        Noisy insight means, clipped to [0,1], for a zone, a region or the nation (name
+        ignored), as of the first release of the round (the current one by default).
+        Raises ValueError for levels below the configured noise level, which are never released.
+        """
+        if LEVELS.index(level) < LEVELS.index(self.noise_level):
+            raise ValueError(f"{level} aggregates are not released when noise is applied at the {self.noise_level} level.")
+        name = name if level != "national" else ""
+        if (level, name) not in self._counts:
+            return {}
+        round_id = self.current_round() if round_id is None else round_id
+        columns = self._columns(vector=False)
+        sums, counts = np.zeros(len(columns)), np.zeros(len(columns))
+        for node in self._noise_nodes(level, name):
+            noisy = self._noisy_release(node, round_id)
+            sums += np.asarray(noisy["sums"])
+            counts += np.asarray(noisy["counts"])
+        means = np.clip(sums / np.maximum(counts, 1), 0.0, 1.0)
+        return {self.keys[j]: float(means[i]) for i, j in enumerate(columns) if counts[i] > 0}
+
+    def release_model(self, round_id: Optional[int] = None) -> Dict[str, float]:
+        """
+        The national mean model update: every farm's clipped delta summed, then one
+        Gaussian release for the whole vector (sigma = noise_multiplier * clip_norm), once per round.
+        """
+        columns = self._columns(vector=True)
+        node = ("national", "")
+        if not len(columns) or node not in self._counts:
+            return {}
+        engine = self.privacy_engine
+
+        def compute() -> Dict[str, List[float]]:
+            with self._lock:
+                sums, counts = self._sums[node][columns], self._counts[node][columns]
+            noisy = engine.add_gaussian_noise(sums, self.clip_norm, self.noise_multiplier)
+            return {"sums": noisy.tolist(), "counts": counts.tolist()}
+
+        round_id = self.current_round() if round_id is None else round_id
+        noisy = self._cached_release(("model", ""), round_id, compute, epsilon=0.0, delta=engine.delta,
+                                     noise_multiplier=self.noise_multiplier)
+        counts = np.asarray(noisy["counts"])
+        means = np.asarray(noisy["sums"]) / np.maximum(counts, 1)
+        return {self.keys[j]: float(means[i]) for i, j in enumerate(columns) if counts[i] > 0}
+
+    def farm_count(self, level: str = "national", name: str = "") -> int:
+        """Participating farms under a node (the largest per-feature count)."""
+        counts = self._counts.get((level, name if level != "national" else ""))
+        return int(counts.max()) if counts is not None and len(counts) else 0
+
+    def regions(self) -> List[str]:
+        return sorted(set(self._zone_region.values()))
+
+# Example usage
+if __name__ == "__main__":
+    tree = HierarchicalAggregator(privacy_engine=PrivacyEngine(epsilon=1.0), noise_level="region")
+    tree.update_zones({
+        "East Gojjam": ("Amhara", [{"yield_gain": 0.15}, {"yield_gain": 0.18}]),
+        "West Gojjam": ("Amhara", [{"yield_gain": 0.12}]),
+        "Arsi": ("Oromia", [{"yield_gain": 0.20}, {"yield_gain": 0.22}])
+    })
+    print(f"Amhara: {tree.release('region', 'Amhara')}")
+    tree.upsert_farms("Arsi", "Oromia", {"new-farm": {"yield_gain": 0.25}})
+    print(f"National (next round): {tree.release('national', round_id=tree.current_round() + 1)}")
@@ -0,0 +1,220 @@
+import hashlib
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from ethio_agri_advisor.config import settings
+from ethio_agri_advisor.tools.yield_simulator import YieldSimulationTool
+
+FEATURE_NAMES = ("bias", "ph_dev", "ph_dev_sq", "rain_ratio", "rain_ratio_sq", "nitrogen")
+
+def featurize(soil_ph, rainfall_mm, soil_nitrogen, optimal_ph, water_requirement_mm) -> np.ndarray:
+    """
+    Model inputs for the yield-index regression, shape (..., len(FEATURE_NAMES)).
+    pH and rainfall are expressed relative to the crop's optimum, so one model serves every crop.
+    """
+    ph_dev = np.asarray(soil_ph, dtype=np.float64) - optimal_ph
+    rain_ratio = np.asarray(rainfall_mm, dtype=np.float64) / water_requirement_mm
+    nitrogen = np.broadcast_to(np.asarray(soil_nitrogen, dtype=np.float64), ph_dev.shape)
+    return np.stack([np.ones_like(ph_dev), ph_dev, ph_dev ** 2, rain_ratio, rain_ratio ** 2, nitrogen], axis=-1)
+
+def generate_farm_history(profile: Dict[str, Any], n_seasons: int, rng: np.random.Generator,
+                          tool: Optional[YieldSimulationTool] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Synthetic season-by-season history for one farm: (features, yield index).
+    The yield index is realized yield over the crop's base yield (1 - risk score), in [0, 1].
+    Stands in for the records a farm keeps on-device.
+    """
+    tool = tool or _yield_tool()
+    code = tool.crop_codes.get(str(profile.get("crop_type", "")).lower(), tool.fallback_code)
+    mean_rain = profile.get("mean_rainfall_mm", 700.0)
+    rainfall = np.maximum(rng.normal(mean_rain, 0.3 * mean_rain, n_seasons), 50.0)
+    soil_ph = rng.normal(profile.get("soil_ph", 6.5), 0.15, n_seasons)
+    nitrogen = np.maximum(rng.normal(profile.get("soil_nitrogen", 0.15), 0.02, n_seasons), 0.0)
+    index = 1.0 - tool._compute_batch(soil_ph, rainfall, code)["risk_score"]
+    index = np.clip(index + rng.normal(0, 0.03, n_seasons), 0.0, 1.0)
+    X = featurize(soil_ph, rainfall, nitrogen, tool._optimal_ph_avg[code], tool._water_req[code])
+    return X, index
+
+@lru_cache(maxsize=1)
+def _yield_tool() -> YieldSimulationTool:
+    return YieldSimulationTool()
+
+def local_sgd(weights: np.ndarray, X: np.ndarray, y: np.ndarray, epochs: int = 1, batch_size: int = 8,
+              learning_rate: float = 0.05, grad_clip: float = 1.0, update_clip: float = 1.0,
+              rng: Optional[np.random.Generator] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mini-batch SGD on many farms at once, starting every farm from `weights`.
+
+    X has shape (farms, seasons, features) and y (farms, seasons). Every step updates all
+    farms with one batched einsum, so the Python loop runs over mini-batches only.
+    Per-example gradients are clipped to `grad_clip` (DP-SGD style), and each farm's final
+    weight delta is clipped to `update_clip` in L2 norm before it leaves the device.
+
+    Returns (deltas of shape (farms, features), per-farm training MSE after the update).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    n_farms, n_seasons, _ = X.shape
+    w = np.broadcast_to(weights, (n_farms, len(weights))).copy()
+    for _ in range(epochs):
+        order = rng.permuted(np.broadcast_to(np.arange(n_seasons), (n_farms, n_seasons)), axis=1)
+        for start in range(0, n_seasons, batch_size):
+            idx = order[:, start:start + batch_size]
+            Xb = np.take_along_axis(X, idx[..., None], axis=1)
+            yb = np.take_along_axis(y, idx, axis=1)
+            residual = np.einsum("fbd,fd->fb", Xb, w) - yb
+            grads = residual[..., None] * Xb
+            norms = np.linalg.norm(grads, axis=2, keepdims=True)
+            grads *= np.minimum(1.0, grad_clip / np.maximum(norms, 1e-12))
+            w -= learning_rate * grads.mean(axis=1)
+
+    deltas = w - weights
+    norms = np.linalg.norm(deltas, axis=1, keepdims=True)
+    deltas *= np.minimum(1.0, update_clip / np.maximum(norms, 1e-12))
+    residual = np.einsum("fsd,fd->fs", X, weights + deltas) - y
+    return deltas, np.mean(residual ** 2, axis=1)
+
+def _local_sgd_task(args):
+    weights, X, y, params, seed = args
+    return local_sgd(weights, X, y, rng=np.random.default_rng(seed), **params)
+
+class FederatedYieldTrainer:
+    """
+    Federated training of the linear yield-index model over simulated farms.
+
+    Each round, the sampled farms run local_sgd from the current global weights, and the
+    server averages their clipped deltas (DP-FedAvg: Gaussian noise scaled to the clip norm
+    when noise_multiplier > 0). With enough farms, clients are split into chunks and trained
+    in a process pool; each chunk is itself trained as one batched NumPy computation.
+    """
+
+    def __init__(self, X: np.ndarray, y: np.ndarray, epochs: int = None, batch_size: int = None,
+                 learning_rate: float = None, grad_clip: float = None, update_clip: float = None,
+                 noise_multiplier: float = 0.0, max_workers: Optional[int] = None,
+                 parallel_min_farms: int = 5000, seed: Optional[int] = None):
+        self.X = X
+        self.y = y
+        self.params = {
+            "epochs": epochs or settings.LOCAL_MODEL_EPOCHS,
+            "batch_size": batch_size or settings.LOCAL_MODEL_BATCH_SIZE,
+            "learning_rate": learning_rate or settings.LOCAL_MODEL_LEARNING_RATE,
+            "grad_clip": grad_clip or settings.LOCAL_MODEL_CLIP_NORM,
+            "update_clip": update_clip or settings.LOCAL_MODEL_CLIP_NORM
+        }
+        self.noise_multiplier = noise_multiplier
+        self.max_workers = max_workers or os.cpu_count()
+        self.parallel_min_farms = parallel_min_farms
+        self.rng = np.random.default_rng(seed)
+        self.weights = np.zeros(X.shape[2])
+        self.rounds = 0
+
+    @classmethod
+    def synthetic(cls, n_farms: int, n_seasons: int = None, seed: Optional[int] = None, **kwargs) -> "FederatedYieldTrainer":
+        """
+        Trainer over n_farms random farm profiles (crop, soil, climate) with synthetic histories.
+        """
+        rng = np.random.default_rng(seed)
+        tool = _yield_tool()
+        n_seasons = n_seasons or settings.LOCAL_MODEL_HISTORY_SEASONS
+        crops = rng.choice(tool.crop_names or ["teff"], n_farms)
+        X = np.empty((n_farms, n_seasons, len(FEATURE_NAMES)))
+        y = np.empty((n_farms, n_seasons))
+        for i in range(n_farms):
+            profile = {
+                "crop_type": crops[i],
+                "soil_ph": rng.uniform(4.8, 8.0),
+                "soil_nitrogen": rng.uniform(0.05, 0.3),
+                "mean_rainfall_mm": rng.uniform(250, 1400)
+            }
+            X[i], y[i] = generate_farm_history(profile, n_seasons, rng, tool)
+        return cls(X, y, seed=seed, **kwargs)
+
+    def client_deltas(self, farms: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Clipped deltas and training losses for the given farm indices."""
+        seeds = self.rng.integers(0, 2 ** 32, size=self.max_workers)
+        if len(farms) >= self.parallel_min_farms and self.max_workers > 1:
+            chunks = np.array_split(farms, self.max_workers)
+            tasks = [(self.weights, self.X[c], self.y[c], self.params, int(s)) for c, s in zip(chunks, seeds)]
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                results = list(pool.map(_local_sgd_task, tasks))
+            return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+        return local_sgd(self.weights, self.X[farms], self.y[farms], rng=np.random.default_rng(int(seeds[0])), **self.params)
+
+    def run_round(self, fraction: float = 1.0) -> Dict[str, Any]:
+        """
+        One federated round over a random `fraction` of the farms. Returns round statistics.
+        """
+        n_farms = self.X.shape[0]
+        m = max(1, int(round(fraction * n_farms)))
+        farms = np.sort(self.rng.choice(n_farms, m, replace=False)) if m < n_farms else np.arange(n_farms)
+        deltas, losses = self.client_deltas(farms)
+        update = deltas.mean(axis=0)
+        if self.noise_multiplier > 0:
+            update += self.rng.normal(0, self.noise_multiplier * self.params["update_clip"] / m, update.shape)
+        self.weights = self.weights + update
+        self.rounds += 1
+        return {"round": self.rounds, "clients": m, "client_loss": float(losses.mean()),
+                "update_norm": float(np.linalg.norm(update))}
+
+    def evaluate(self, weights: Optional[np.ndarray] = None) -> float:
+        """Pooled MSE of the yield index over every farm's history."""
+        weights = self.weights if weights is None else weights
+        return float(np.mean((self.X @ weights - self.y) ** 2))
+
+    def centralized_baseline(self) -> Tuple[np.ndarray, float]:
+        """Least-squares fit on all farms' pooled data: what federated training should approach."""
+        X = self.X.reshape(-1, self.X.shape[2])
+        weights = np.linalg.lstsq(X, self.y.reshape(-1), rcond=None)[0]
+        return weights, self.evaluate(weights)
+
+@lru_cache(maxsize=1)
+def global_weights() -> np.ndarray:
+    """
+    Current global model, standing in for the result of earlier federated rounds:
+    a least-squares fit over a seeded synthetic farm population.
+    """
+    trainer = FederatedYieldTrainer.synthetic(200, seed=2024)
+    return trainer.centralized_baseline()[0]
+
+def _profile_seed(profile: Dict[str, Any]) -> int:
+    digest = hashlib.sha256(repr(sorted(profile.items())).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "little")
+
+def farm_update(profile: Dict[str, Any], weights: Optional[np.ndarray] = None, seed: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Trains the on-device model on one farm's history and returns its federated update:
+    the clipped weight delta per feature ("delta_<feature>") and the farm's
+    yield_improvement_potential, the model's relative yield gain from correcting soil pH
+    to the crop optimum at the farm's typical rainfall.
+    """
+    tool = _yield_tool()
+    weights = global_weights() if weights is None else weights
+    rng = np.random.default_rng(_profile_seed(profile) if seed is None else seed)
+    X, y = generate_farm_history(profile, settings.LOCAL_MODEL_HISTORY_SEASONS, rng, tool)
+    deltas, _ = local_sgd(
+        weights, X[None], y[None], epochs=settings.LOCAL_MODEL_EPOCHS, batch_size=settings.LOCAL_MODEL_BATCH_SIZE,
+        learning_rate=settings.LOCAL_MODEL_LEARNING_RATE, grad_clip=settings.LOCAL_MODEL_CLIP_NORM,
+        update_clip=settings.LOCAL_MODEL_CLIP_NORM, rng=rng
+    )
+    local_weights = weights + deltas[0]
+
+    code = tool.crop_codes.get(str(profile.get("crop_type", "")).lower(), tool.fallback_code)
+    optimal_ph, water_req = tool._optimal_ph_avg[code], tool._water_req[code]
+    rain, nitrogen = profile.get("mean_rainfall_mm", 700.0), profile.get("soil_nitrogen", 0.15)
+    current = featurize(profile.get("soil_ph", optimal_ph), rain, nitrogen, optimal_ph, water_req) @ local_weights
+    corrected = featurize(optimal_ph, rain, nitrogen, optimal_ph, water_req) @ local_weights
+    potential = float(np.clip((corrected - current) / max(float(current), 0.05), 0.0, 1.0))
+
+    update = {"yield_improvement_potential": round(potential, 4)}
+    update.update({f"delta_{name}": float(d) for name, d in zip(FEATURE_NAMES, deltas[0])})
+    return update
+
+# Example usage
+if __name__ == "__main__":
+    trainer = FederatedYieldTrainer.synthetic(500, seed=0)
+    _, baseline = trainer.centralized_baseline()
+    for _ in range(10):
+        stats = trainer.run_round(fraction=0.2)
+    print(f"Federated MSE after {trainer.rounds} rounds: {trainer.evaluate():.4f} (centralized: {baseline:.4f})")
+    print(farm_update({"crop_type": "teff", "soil_ph": 5.2, "soil_nitrogen": 0.15, "mean_rainfall_mm": 650}))
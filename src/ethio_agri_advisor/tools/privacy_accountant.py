@@ -0,0 +1,301 @@
+import hashlib
+import json
+import math
+import threading
+import time
+import numpy as np
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+from ethio_agri_advisor.config import settings
+
+# Renyi orders tracked for RDP accounting. A fixed grid keeps every budget check O(1).
+RDP_ORDERS = np.array([1.25, 1.5, 1.75, 2, 2.5, 3, 4, 5, 6, 8, 10, 12, 16, 20, 32, 64, 128, 256], dtype=np.float64)
+
+COMPOSITIONS = ("basic", "advanced", "rdp")
+
+class PrivacyBudgetExceededError(Exception):
+    """Raised when a query would take an entity past its privacy budget."""
+
+def laplace_rdp(epsilon: float, orders: np.ndarray = RDP_ORDERS) -> np.ndarray:
+    """
+    RDP curve of the Laplace mechanism with scale sensitivity/epsilon (Mironov, 2017, Prop. 6).
+    """
+    a = orders
+    log_terms = np.logaddexp(np.log(a / (2 * a - 1)) + (a - 1) * epsilon,
+                             np.log((a - 1) / (2 * a - 1)) - a * epsilon)
+    return np.minimum(log_terms / (a - 1), epsilon)
+
+def gaussian_rdp(noise_multiplier: float, orders: np.ndarray = RDP_ORDERS) -> np.ndarray:
+    """
+    RDP curve of the Gaussian mechanism with sigma = noise_multiplier * sensitivity.
+    """
+    return orders / (2 * noise_multiplier ** 2)
+
+def gaussian_epsilon(noise_multiplier: float, delta: float) -> float:
+    """
+    Classical (epsilon, delta) guarantee of one Gaussian release, used for basic/advanced composition.
+    """
+    return math.sqrt(2 * math.log(1.25 / delta)) / noise_multiplier
+
+class PrivacyAccountant:
+    """
+    Tracks cumulative privacy spend per entity (a farm or a zone) across calls and sessions.
+
+    Every spend is appended to a JSONL ledger and folded into a fixed-size running
+    aggregate per entity (sums for basic and advanced composition, an RDP curve over a
+    fixed order grid), so checking a budget costs O(1) whatever the history length.
+    The ledger is replayed on start-up.
+
+    Noisy answers are cached by (entity, query) and persisted in the ledger. Asking the
+    same question again returns the earlier answer and spends nothing, even once the
+    budget is used up. Query keys are stored as SHA-256 digests, never as raw values.
+
+    Budgets are cumulative for all time by default. A positive window_seconds is an
+    opt-in relaxation: an entity's totals start from zero in each fixed time window, so
+    its total epsilon grows without bound and the guarantee holds per window only.
+    Cached answers carry over, since repeating them costs nothing.
+    """
+
+    def __init__(self, budget_epsilon: float = None, budget_delta: float = None,
+                 composition: str = None, ledger_path: Optional[Union[str, Path]] = None,
+                 window_seconds: Optional[float] = None):
+        self.budget_epsilon = settings.PRIVACY_BUDGET_EPSILON if budget_epsilon is None else budget_epsilon
+        self.budget_delta = settings.PRIVACY_BUDGET_DELTA if budget_delta is None else budget_delta
+        self.window_seconds = settings.PRIVACY_BUDGET_WINDOW_SECONDS if window_seconds is None else window_seconds
+        self.composition = composition or settings.PRIVACY_COMPOSITION
+        if self.composition not in COMPOSITIONS:
+            raise ValueError(f"Unknown composition: {self.composition}. Expected one of {COMPOSITIONS}.")
+        self.ledger_path = Path(ledger_path) if ledger_path else None
+        # Running totals per entity for the window they were accumulated in.
+        self._totals: Dict[str, Dict[str, Any]] = {}
+        self._windows: Dict[str, int] = {}
+        self._answers: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.RLock()
+        self.cache_hits = 0
+        self.refused = 0
+        if self.ledger_path is not None:
+            self.ledger_path.parent.mkdir(parents=True, exist_ok=True)
+            self._replay()
+
+    @staticmethod
+    def query_key(*parts: Any) -> str:
+        """Stable digest for a query; raw values never reach the ledger."""
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _empty_totals() -> Dict[str, Any]:
+        return {"count": 0, "epsilon": 0.0, "delta": 0.0, "epsilon_sq": 0.0, "epsilon_expm1": 0.0,
+                "rdp": np.zeros_like(RDP_ORDERS)}
+
+    def _window(self, ts: float) -> int:
+        return int(ts // self.window_seconds) if self.window_seconds > 0 else 0
+
+    def _current(self, entity: str, window: int) -> Dict[str, Any]:
+        """Entity's totals in window; totals from an earlier window no longer count."""
+        if self._windows.get(entity) != window:
+            return self._empty_totals()
+        return self._totals[entity]
+
+    @staticmethod
+    def _cost(epsilon: float, delta: float, noise_multiplier: Optional[float]) -> Tuple[float, float, np.ndarray]:
+        """Per-query (epsilon, delta, RDP curve) for a Laplace or, with noise_multiplier, Gaussian release."""
+        if noise_multiplier is not None:
+            return gaussian_epsilon(noise_multiplier, delta), delta, gaussian_rdp(noise_multiplier)
+        return epsilon, delta, laplace_rdp(epsilon)
+
+    @staticmethod
+    def _add(totals: Dict[str, Any], epsilon: float, delta: float, rdp: np.ndarray, releases: int = 1) -> Dict[str, Any]:
+        return {
+            "count": totals["count"] + releases,
+            "epsilon": totals["epsilon"] + releases * epsilon,
+            "delta": totals["delta"] + releases * delta,
+            "epsilon_sq": totals["epsilon_sq"] + releases * epsilon ** 2,
+            "epsilon_expm1": totals["epsilon_expm1"] + releases * epsilon * math.expm1(epsilon),
+            "rdp": totals["rdp"] + releases * rdp
+        }
+
+    def _compose(self, totals: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Composed (epsilon, delta) of an entity's history under each rule.
+        Advanced composition spends half of the delta budget as slack; RDP converts
+        at the full delta budget (its Laplace terms carry no delta of their own).
+        """
+        if totals["count"] == 0:
+            return {"basic": 0.0, "advanced": 0.0, "rdp": 0.0, "basic_delta": 0.0, "advanced_delta": 0.0, "rdp_delta": 0.0}
+        slack = self.budget_delta / 2
+        basic = totals["epsilon"]
+        advanced = math.sqrt(2 * math.log(1 / slack) * totals["epsilon_sq"]) + totals["epsilon_expm1"]
+        rdp = float(np.min(totals["rdp"] + math.log(1 / self.budget_delta) / (RDP_ORDERS - 1)))
+        # Each rule falls back to the basic bound when that is tighter.
+        return {
+            "basic": basic,
+            "advanced": min(basic, advanced),
+            "rdp": min(basic, rdp),
+            "basic_delta": totals["delta"],
+            "advanced_delta": totals["delta"] + slack if advanced < basic else totals["delta"],
+            "rdp_delta": self.budget_delta if rdp < basic else totals["delta"]
+        }
+
+    def _within_budget(self, totals: Dict[str, Any]) -> bool:
+        composed = self._compose(totals)
+        return (composed[self.composition] <= self.budget_epsilon + 1e-12
+                and composed[f"{self.composition}_delta"] <= self.budget_delta + 1e-15)
+
+    def can_spend(self, entity: str, epsilon: float, delta: float = 0.0, noise_multiplier: Optional[float] = None,
+                  releases: int = 1) -> bool:
+        with self._lock:
+            totals = self._current(entity, self._window(time.time()))
+            return self._within_budget(self._add(totals, *self._cost(epsilon, delta, noise_multiplier), releases))
+
+    def _reserve(self, entity: str, cost: Tuple[float, float, np.ndarray], releases: int) -> float:
+        """
+        Adds a spend to entity's totals in the current window, or raises if it would exceed
+        the budget. Returns the reservation's timestamp. Caller holds the lock.
+        """
+        ts = time.time()
+        window = self._window(ts)
+        updated = self._add(self._current(entity, window), *cost, releases)
+        if not self._within_budget(updated):
+            self.refused += 1
+            raise PrivacyBudgetExceededError(
+                f"Privacy budget exhausted for {entity}: epsilon {self.budget_epsilon} under {self.composition} composition."
+            )
+        self._totals[entity] = updated
+        self._windows[entity] = window
+        return ts
+
+    def _rollback(self, entity: str, cost: Tuple[float, float, np.ndarray], releases: int, ts: float):
+        """Undoes a reservation whose answer was never released. Caller holds the lock."""
+        if self._windows.get(entity) == self._window(ts):
+            self._totals[entity] = self._add(self._totals[entity], *cost, -releases)
+
+    def _commit(self, entity: str, epsilon: float, delta: float, noise_multiplier: Optional[float], releases: int,
+                query: Optional[str], answer: Any, ts: float):
+        """Records a reserved spend (and its answer) in the cache and the ledger. Caller holds the lock."""
+        if query is not None:
+            self._answers[(entity, query)] = answer
+        self._append({"entity": entity, "epsilon": epsilon, "delta": delta, "noise_multiplier": noise_multiplier,
+                      "releases": releases, "query": query, "answer": answer, "ts": ts})
+
+    def spend(self, entity: str, epsilon: float, delta: float = 0.0, noise_multiplier: Optional[float] = None,
+              releases: int = 1, query: Optional[str] = None, answer: Any = None):
+        """
+        Charges `releases` identical releases against entity's budget and records them in the ledger.
+        Raises PrivacyBudgetExceededError, and records nothing, if the budget would be exceeded.
+        """
+        with self._lock:
+            ts = self._reserve(entity, self._cost(epsilon, delta, noise_multiplier), releases)
+            self._commit(entity, epsilon, delta, noise_multiplier, releases, query, answer, ts)
+
+    def answer(self, entity: str, query: str, compute: Callable[[], Any], epsilon: float, delta: float = 0.0,
+               noise_multiplier: Optional[float] = None, releases: int = 1) -> Any:
+        """
+        Returns the cached noisy answer for (entity, query), or computes it with `compute`
+        and charges the budget. The answer must be JSON-serializable to survive restarts.
+
+        The budget is reserved under the lock but `compute` runs outside it, so a slow
+        aggregation round never blocks other entities. If `compute` raises, the
+        reservation is rolled back; if a concurrent call answered the same query first,
+        its answer is returned and this one is discarded unreleased.
+        """
+        cost = self._cost(epsilon, delta, noise_multiplier)
+        with self._lock:
+            if (entity, query) in self._answers:
+                self.cache_hits += 1
+                return self._answers[(entity, query)]
+            ts = self._reserve(entity, cost, releases)
+        try:
+            result = compute()
+        except BaseException:
+            with self._lock:
+                self._rollback(entity, cost, releases, ts)
+            raise
+        with self._lock:
+            if (entity, query) in self._answers:
+                self._rollback(entity, cost, releases, ts)
+                self.cache_hits += 1
+                return self._answers[(entity, query)]
+            self._commit(entity, epsilon, delta, noise_multiplier, releases, query, result, ts)
+        return result
+
+    def spent(self, entity: str) -> Dict[str, Any]:
+        """
+        Spend report for an entity in the current window under every composition rule,
+        plus what remains under the configured one.
+        """
+        with self._lock:
+            totals = self._current(entity, self._window(time.time()))
+            composed = self._compose(totals)
+            return {
+                "releases": totals["count"],
+                "epsilon": composed[self.composition],
+                "basic_epsilon": composed["basic"],
+                "advanced_epsilon": composed["advanced"],
+                "rdp_epsilon": composed["rdp"],
+                "remaining_epsilon": max(0.0, self.budget_epsilon - composed[self.composition]),
+                "composition": self.composition
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entities": len(self._totals),
+                "cached_answers": len(self._answers),
+                "cache_hits": self.cache_hits,
+                "refused": self.refused
+            }
+
+    def _append(self, record: Dict[str, Any]):
+        if self.ledger_path is None:
+            return
+        with open(self.ledger_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def _replay(self):
+        if not self.ledger_path.exists():
+            return
+        # Only spends in the current window count against budgets; cached answers all carry over.
+        current = self._window(time.time())
+        with open(self.ledger_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted write; the spend it described never completed.
+                    continue
+                entity = record["entity"]
+                window = self._window(record.get("ts", 0.0))
+                if window == current:
+                    cost = self._cost(record["epsilon"], record["delta"], record.get("noise_multiplier"))
+                    self._totals[entity] = self._add(self._current(entity, window), *cost, record.get("releases", 1))
+                    self._windows[entity] = window
+                if record.get("query") is not None:
+                    self._answers[(entity, record["query"])] = record.get("answer")
+
+_accountant: Optional[PrivacyAccountant] = None
+_accountant_lock = threading.Lock()
+
+def get_privacy_accountant() -> Optional[PrivacyAccountant]:
+    """
+    Returns the process-wide privacy accountant, or None when accounting is disabled.
+    """
+    global _accountant
+    if not settings.PRIVACY_ACCOUNTING_ENABLED:
+        return None
+    with _accountant_lock:
+        if _accountant is None:
+            _accountant = PrivacyAccountant(ledger_path=settings.PRIVACY_LEDGER_PATH)
+        return _accountant
+
+# Example usage
+if __name__ == "__main__":
+    accountant = PrivacyAccountant(budget_epsilon=1.0, budget_delta=1e-5, composition="rdp")
+    for i in range(50):
+        try:
+            accountant.spend("zone:East Gojjam", epsilon=0.1)
+        except PrivacyBudgetExceededError as e:
+            print(f"Refused after {i} queries: {e}")
+            break
+    print(accountant.spent("zone:East Gojjam"))
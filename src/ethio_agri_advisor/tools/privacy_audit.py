@@ -1,29 +1,157 @@
 import re
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+DEFAULT_PRIVATE_KEYS = ("name", "phone", "gps", "coordinates")
+
+# Structured PII patterns as (label, first-character class, regex), in reporting order.
+# Patterns that share a first-character class are gated behind one lookahead, so most
+# positions in ordinary prose are rejected by a single character test. Leading lookbehinds
+# anchor each pattern to the start of a token, so a failed attempt inside a long run of
+# digits or letters fails immediately and the scan stays linear in the text length.
+STRUCTURED_PATTERNS: List[Tuple[str, Optional[str], str]] = [
+    ("exact_coordinates", r"\d+", r"\d{1,2}\.\d{4,},\s?\d{1,2}\.\d{4,}"),
+    ("ethiopian_phone", r"\d+", r"(?<![\d+])(?:\+?251[\s-]?|0)[79]\d{2}[\s-]?\d{3}[\s-]?\d{3}(?!\d)"),
+    ("email", None, r"(?<![\w.%+-])[\w.%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"),
+    # Fayda national ID numbers: 12-digit FIN or 16-digit FAN, optionally grouped in fours.
+    ("national_id", r"\d+", r"(?<!\d)\d{4}[ -]?\d{4}[ -]?\d{4}(?:[ -]?\d{4})?(?!\d)"),
+]
+
+class PIIScanner:
+    """
+    Precompiled single-pass scanner for PII.
+    All patterns are combined into one alternation and compiled once, so a scan is a
+    single finditer over the text. Structured patterns take precedence over keywords
+    when both match at the same position.
+    """
+
+    def __init__(self, private_keys: Sequence[str] = DEFAULT_PRIVATE_KEYS,
+                 patterns: Optional[List[Tuple[str, Optional[str], str]]] = None):
+        self._keywords = {key.lower(): key for key in private_keys}
+        self._structured = list(STRUCTURED_PATTERNS if patterns is None else patterns)
+        self._compile()
+
+    def _compile(self):
+        self._group_labels: Dict[str, str] = {}
+        gates: Dict[Optional[str], List[str]] = {}
+        for i, (label, first_chars, pattern) in enumerate(self._structured):
+            self._group_labels[f"p{i}"] = label
+            gates.setdefault(first_chars, []).append(f"(?P<p{i}>{pattern})")
+
+        branches = []
+        for first_chars, groups in gates.items():
+            alternation = "|".join(groups)
+            branches.append(f"(?=[{first_chars}])(?:{alternation})" if first_chars else alternation)
+        if self._keywords:
+            words = "|".join(re.escape(key) for key in self._keywords)
+            branches.append(f"(?P<kw>(?i:\\b(?:{words})\\b))")
+        self._regex = re.compile("|".join(branches))
+        # Reporting order: keywords first, then structured patterns (matches the legacy audit output).
+        self.labels = list(dict.fromkeys(list(self._keywords.values()) + [label for label, _, _ in self._structured]))
+
+    def add_pattern(self, label: str, pattern: str, first_chars: Optional[str] = None):
+        """
+        Registers an extra structured pattern. Recompiles once, not on every scan.
+        first_chars, if given, is a character class every match starts with.
+        """
+        self._structured.append((label, first_chars, pattern))
+        self._compile()
+
+    def scan(self, text: str) -> List[Tuple[str, int, int]]:
+        """
+        Returns (label, start, end) for every non-overlapping match, in text order.
+        """
+        labels = self._group_labels
+        keywords = self._keywords
+        spans = []
+        for m in self._regex.finditer(text):
+            group = m.lastgroup
+            label = keywords[m.group().lower()] if group == "kw" else labels[group]
+            spans.append((label, m.start(), m.end()))
+        return spans
+
+    def redact(self, text: str, mask: str = "[REDACTED]") -> str:
+        return self._regex.sub(mask, text)
+
+@lru_cache(maxsize=32)
+def get_scanner(private_keys: Tuple[str, ...] = DEFAULT_PRIVATE_KEYS) -> PIIScanner:
+    """
+    Returns a shared scanner for the given keys, compiled on first use.
+    """
+    return PIIScanner(private_keys)
+
+class StreamingRedactor:
+    """
+    Masks PII in a token stream as it arrives, using a PIIScanner's patterns.
+    The last `lookback` characters are held back so a match that crosses a chunk
+    boundary is still caught; matches longer than the lookback may slip through,
+    which is why the full audit still runs on the finished text.
+    """
+
+    def __init__(self, scanner: Optional[PIIScanner] = None, lookback: int = 64, mask: str = "[REDACTED]"):
+        self.scanner = scanner or get_scanner()
+        self.lookback = lookback
+        self.mask = mask
+        self.redactions = 0
+        self.redacted_labels: List[str] = []
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> str:
+        """
+        Adds a chunk and returns the text that is now safe to emit (possibly empty).
+        """
+        self._buffer += chunk
+        return self._drain(final=False)
+
+    def flush(self) -> str:
+        """
+        Returns the remaining buffered text, redacted. Call once at the end of the stream.
+        """
+        return self._drain(final=True)
+
+    def _drain(self, final: bool) -> str:
+        text = self._buffer
+        cut = len(text) if final else max(0, len(text) - self.lookback)
+        out = []
+        pos = 0
+        for label, start, end in self.scanner.scan(text):
+            if end > cut:
+                # The match may still grow with the next chunk; keep it buffered.
+                cut = min(cut, start)
+                break
+            out.append(text[pos:start])
+            out.append(self.mask)
+            pos = end
+            self.redactions += 1
+            self.redacted_labels.append(label)
+        out.append(text[pos:cut])
+        self._buffer = text[cut:]
+        return "".join(out)
 
 class PrivacyAuditTool:
     """
     Monitors inter-agent communication for potential privacy leaks or ungrounded claims.
     """
 
-    def audit_content(self, content: str, private_keys: List[str] = ["name", "phone", "gps", "coordinates"]) -> Dict[str, Any]:
+    def __init__(self, scanner: Optional[PIIScanner] = None):
+        self.scanner = scanner
+
+    def audit_content(self, content: str, private_keys: Sequence[str] = DEFAULT_PRIVATE_KEYS) -> Dict[str, Any]:
         """
         Checks if any sensitive keys or patterns are present in the content.
+        Runs one precompiled pass covering the keys, coordinates, Ethiopian phone
+        numbers, emails and national ID numbers, and reports span offsets.
         """
-        leaks = []
-        for key in private_keys:
-            if re.search(rf"\b{key}\b", content, re.IGNORECASE):
-                leaks.append(key)
-        
-        # Check for coordinate-like patterns
-        coord_pattern = r"\d{1,2}\.\d{4,},\s?\d{1,2}\.\d{4,}"
-        if re.search(coord_pattern, content):
-            leaks.append("exact_coordinates")
+        scanner = self.scanner or get_scanner(tuple(private_keys))
+        spans = scanner.scan(content)
+        found = {label for label, _, _ in spans}
+        leaks = [label for label in scanner.labels if label in found]
 
         is_safe = len(leaks) == 0
         return {
             "is_safe": is_safe,
             "detected_leaks": leaks,
+            "spans": [{"label": label, "start": start, "end": end} for label, start, end in spans],
             "recommendation": "Proceed" if is_safe else "REJECT: Potential data exposure detected."
         }
 
@@ -1,18 +1,34 @@
 import numpy as np
-from typing import List, Dict, Any
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple
 import logging
+import time
+from ethio_agri_advisor.tools.privacy_accountant import PrivacyAccountant, PrivacyBudgetExceededError
 
 class PrivacyEngine:
     """
     Simulates privacy-preserving mechanisms for federated learning in agriculture.
     Implements differential privacy mechanisms for federated learning.
+    With an accountant, every noisy release is charged to an entity's (farm or zone)
+    budget, and repeated questions are answered from the accountant's cache.
     """
     
-    def __init__(self, epsilon: float = 0.1, delta: float = 1e-5):
+    def __init__(self, epsilon: float = 0.1, delta: float = 1e-5, accountant: Optional[PrivacyAccountant] = None):
         self.epsilon = epsilon
         self.delta = delta
+        self.accountant = accountant
         self.logger = logging.getLogger(__name__)
 
+    def _accounted(self, entity: Optional[str], query: Sequence[Any], compute, releases: int = 1):
+        """
+        Runs a noisy computation through the accountant when one is set and an entity is given.
+        Raises PrivacyBudgetExceededError when the entity's budget is used up and the query is new.
+        """
+        if self.accountant is None or entity is None:
+            return compute()
+        key = self.accountant.query_key(*query)
+        return self.accountant.answer(entity, key, compute, epsilon=self.epsilon, releases=releases)
+
     def add_differential_privacy_noise(self, data: np.ndarray, sensitivity: float = 1.0) -> np.ndarray:
         """
         Adds Laplacian noise to data to achieve epsilon-differential privacy.
@@ -21,7 +37,15 @@ class PrivacyEngine:
         noise = np.random.laplace(0, scale, data.shape)
         return data + noise
 
-    def simulate_federated_averaging(self, client_updates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    @staticmethod
+    def add_gaussian_noise(vector: np.ndarray, l2_sensitivity: float, noise_multiplier: float) -> np.ndarray:
+        """
+        Gaussian mechanism for a whole vector whose contributions are clipped to l2_sensitivity
+        in L2 norm: one (epsilon, delta) release however many coordinates it has.
+        """
+        return vector + np.random.normal(0, noise_multiplier * l2_sensitivity, vector.shape)
+
+    def simulate_federated_averaging(self, client_updates: List[Dict[str, Any]], entity: Optional[str] = None) -> Dict[str, Any]:
         """
         Simulates the Federated Averaging (FedAvg) algorithm.
         Aggregates gradients/insights from multiple 'farms' without raw data exposure.
@@ -30,24 +54,102 @@ class PrivacyEngine:
             return {}
 
         # Assume updates are dictionaries of numeric features (e.g., yield predictions, soil trends)
-        keys = client_updates[0].keys()
-        aggregated_update = {}
+        return self._accounted(entity, ("fedavg", client_updates), lambda: self.aggregate_updates(client_updates),
+                               releases=len(client_updates[0]))
+
+    @staticmethod
+    def pack_updates(client_updates: Sequence[Dict[str, Any]], keys: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Packs client updates into a dense (clients x features) matrix ordered by keys.
+        Returns the matrix (NaN where a client did not report a feature) and its presence mask.
+        """
+        n = len(client_updates)
+        values = np.empty((n, len(keys)), dtype=np.float64)
+        for j, key in enumerate(keys):
+            values[:, j] = np.fromiter((update.get(key, np.nan) for update in client_updates), dtype=np.float64, count=n)
+        return values, ~np.isnan(values)
 
-        for key in keys:
-            values = [update[key] for update in client_updates if key in update]
-            if values:
-                # Aggregate with DP noise
-                mean_val = np.mean(values)
-                # Sensitivity for mean is 1/N if range is [0,1]
-                dp_val = self.add_differential_privacy_noise(np.array([mean_val]), sensitivity=1.0/len(values))[0]
-                aggregated_update[key] = float(dp_val)
+    def _noisy_means(self, sums: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """
+        Means with Laplace noise drawn for every feature in one call.
+        Sensitivity for a mean over [0,1] values is 1/N per feature.
+        """
+        present = counts > 0
+        safe_counts = np.where(present, counts, 1)
+        means = sums / safe_counts
+        noisy = means + np.random.laplace(0, (1.0 / safe_counts) / self.epsilon)
+        return np.where(present, noisy, np.nan)
 
-        return aggregated_update
+    def aggregate_dense(self, values: np.ndarray, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        DP-FedAvg over a dense (clients x features) matrix. Missing entries are
+        excluded via mask (default: non-NaN entries). Features no client reported come back as NaN.
+        """
+        mask = ~np.isnan(values) if mask is None else mask
+        sums = np.where(mask, values, 0.0).sum(axis=0)
+        counts = mask.sum(axis=0)
+        return self._noisy_means(sums, counts)
 
-    def anonymize_local_data(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+    def aggregate_updates(self, client_updates: Iterable[Dict[str, Any]], keys: Optional[Sequence[str]] = None,
+                          chunk_size: int = 65536) -> Dict[str, float]:
+        """
+        Vectorized, streaming DP-FedAvg.
+        Consumes updates chunk by chunk, so an iterator over a very large client set
+        never has to sit in memory. Keys default to those of the first update.
+        """
+        iterator = iter(client_updates)
+        sums = counts = None
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if not chunk:
+                break
+            if keys is None:
+                keys = list(chunk[0].keys())
+            values, mask = self.pack_updates(chunk, keys)
+            chunk_sums = np.where(mask, values, 0.0).sum(axis=0)
+            chunk_counts = mask.sum(axis=0)
+            sums = chunk_sums if sums is None else sums + chunk_sums
+            counts = chunk_counts if counts is None else counts + chunk_counts
+
+        if sums is None:
+            return {}
+        noisy = self._noisy_means(sums, counts)
+        return {key: float(noisy[j]) for j, key in enumerate(keys) if counts[j] > 0}
+
+    def secure_federated_averaging(self, client_updates: Sequence[Dict[str, Any]], keys: Optional[Sequence[str]] = None,
+                                   simulator: Optional["SecureAggregationSimulator"] = None,
+                                   dropout_rate: float = 0.0, entity: Optional[str] = None) -> Tuple[Dict[str, float], Dict[str, Any]]:
+        """
+        DP-FedAvg where the server only ever sees the masked sum of client updates.
+        Each client contributes its values plus a presence indicator per key, so missing
+        values are handled without revealing which client omitted what. Returns the noisy
+        means and the secure-aggregation round report ({"cached": True} when the
+        accountant answered a repeated round from its cache).
+        """
+        if not client_updates:
+            return {}, {}
+        keys = list(client_updates[0].keys()) if keys is None else list(keys)
+        round_report = {"cached": True}
+
+        def compute():
+            values, mask = self.pack_updates(client_updates, keys)
+            inputs = np.concatenate([np.where(mask, values, 0.0), mask.astype(np.float64)], axis=1)
+            report = (simulator or SecureAggregationSimulator()).run_round(inputs, dropout_rate=dropout_rate)
+            totals = report.pop("sum")
+            sums, counts = totals[:len(keys)], np.rint(totals[len(keys):]).astype(np.int64)
+            round_report.clear()
+            round_report.update(report)
+            noisy = self._noisy_means(sums, counts)
+            return {key: float(noisy[j]) for j, key in enumerate(keys) if counts[j] > 0}
+
+        trends = self._accounted(entity, ("secure_fedavg", client_updates, keys), compute, releases=len(keys))
+        return trends, round_report
+
+    def anonymize_local_data(self, raw_data: Dict[str, Any], entity: Optional[str] = None) -> Dict[str, Any]:
         """
         Extracts features and anonymizes local data before sharing.
         Removes PII and exact coordinates, keeping only regional/zonal context.
+        Noisy features are charged to entity's budget; once it is spent they are withheld.
         """
         # Example: Keep 'Zone', 'CropType', but remove 'FarmerName', 'ExactGPS'
         safe_keys = ['zone', 'region', 'soil_ph', 'soil_nitrogen', 'crop_type', 'elevation']
@@ -55,10 +157,212 @@ class PrivacyEngine:
         
         # Add noise to sensitive numeric features
         if 'soil_ph' in anonymized:
-            anonymized['soil_ph'] = float(self.add_differential_privacy_noise(np.array([anonymized['soil_ph']]), sensitivity=0.5)[0])
+            soil_ph = anonymized['soil_ph']
+            try:
+                anonymized['soil_ph'] = self._accounted(
+                    # Keyed on the attribute: a farm asked again gets its earlier noisy value, not a fresh draw.
+                    entity, ("soil_ph",),
+                    lambda: float(self.add_differential_privacy_noise(np.array([soil_ph]), sensitivity=0.5)[0])
+                )
+            except PrivacyBudgetExceededError as e:
+                print(f"Withholding soil_ph: {e}")
+                del anonymized['soil_ph']
             
         return anonymized
 
+class LocalTransport:
+    """
+    In-process stand-in for the client/server network of a secure-aggregation round.
+    Messages are not actually delivered; the transport only accounts for the bytes
+    each client sends and receives, per protocol stage.
+    """
+
+    def __init__(self, n_clients: int):
+        self.sent = np.zeros(n_clients, dtype=np.int64)
+        self.received = np.zeros(n_clients, dtype=np.int64)
+        self.bytes_by_stage: Dict[str, int] = {}
+
+    def send(self, stage: str, senders: np.ndarray, nbytes: Any, receivers: Optional[np.ndarray] = None):
+        """
+        Records one message per sender of nbytes (scalar or per-message array). Messages go
+        to the server, which relays them to `receivers` when given.
+        """
+        nbytes = np.broadcast_to(np.asarray(nbytes, dtype=np.int64), senders.shape)
+        np.add.at(self.sent, senders, nbytes)
+        if receivers is not None:
+            np.add.at(self.received, receivers, nbytes)
+        self.bytes_by_stage[stage] = self.bytes_by_stage.get(stage, 0) + int(nbytes.sum())
+
+    def broadcast(self, stage: str, receivers: np.ndarray, nbytes: Any):
+        """Records server-to-client messages."""
+        nbytes = np.broadcast_to(np.asarray(nbytes, dtype=np.int64), receivers.shape)
+        np.add.at(self.received, receivers, nbytes)
+        self.bytes_by_stage[stage] = self.bytes_by_stage.get(stage, 0) + int(nbytes.sum())
+
+class SecureAggregationSimulator:
+    """
+    Simulates one round of secure aggregation with pairwise additive masks and
+    dropout recovery (after Bonawitz et al., 2017, with the sparse neighbour graph of
+    Bell et al., 2020).
+
+    Inputs are fixed-point encoded into uint64, so masking and summation wrap modulo 2^64
+    and masks cancel exactly. Each client is paired with `neighbors` others on a seeded
+    random k-regular (circulant) graph, and every mask is expanded from a 64-bit seed by a
+    counter-mode splitmix64 PRG. Each step runs vectorized over all pairs, so a round
+    costs O(n * k * dim) NumPy work and no per-pair Python code.
+
+    Key agreement and Shamir sharing are simulated. Pair and self-mask seeds are derived
+    from the round seed, and recovery only checks that enough neighbours survived to reach
+    the share threshold. The transport still accounts for the bytes those messages would
+    carry.
+    """
+
+    KEY_BYTES = 32     # one public key
+    SHARE_BYTES = 16   # one Shamir share of a 128-bit seed
+    VALUE_BYTES = 8    # one fixed-point uint64 coordinate
+
+    _GAMMA = np.uint64(0x9E3779B97F4A7C15)
+    _MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+    _MIX2 = np.uint64(0x94D049BB133111EB)
+
+    def __init__(self, neighbors: int = 16, threshold: Optional[int] = None, scale_bits: int = 16,
+                 seed: Optional[int] = None, chunk_pairs: int = 65536):
+        self.neighbors = neighbors
+        self.threshold = threshold
+        self.scale = float(2 ** scale_bits)
+        self.chunk_pairs = chunk_pairs
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.transport: Optional[LocalTransport] = None
+
+    @classmethod
+    def _splitmix(cls, z: np.ndarray) -> np.ndarray:
+        z = (z ^ (z >> np.uint64(30))) * cls._MIX1
+        z = (z ^ (z >> np.uint64(27))) * cls._MIX2
+        return z ^ (z >> np.uint64(31))
+
+    @classmethod
+    def expand_masks(cls, seeds: np.ndarray, dim: int) -> np.ndarray:
+        """
+        Expands each 64-bit seed into `dim` pseudorandom uint64 words (rows follow seeds).
+        """
+        counters = np.arange(1, dim + 1, dtype=np.uint64) * cls._GAMMA
+        return cls._splitmix(seeds[:, None] + counters[None, :])
+
+    def encode(self, values: np.ndarray) -> np.ndarray:
+        """Fixed-point encodes floats into uint64 (two's complement for negatives)."""
+        return np.rint(values * self.scale).astype(np.int64).view(np.uint64)
+
+    def decode(self, encoded: np.ndarray) -> np.ndarray:
+        return encoded.view(np.int64) / self.scale
+
+    def neighbor_pairs(self, n_clients: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Edges (i, j), i < j, of a random k-regular circulant graph over a permutation
+        of the clients. Duplicate edges (when k approaches n) are removed.
+        """
+        half = min(self.neighbors // 2, n_clients // 2)
+        if n_clients < 2 or half == 0:
+            return np.empty((0, 2), dtype=np.int64)
+        order = rng.permutation(n_clients)
+        positions = np.arange(n_clients)
+        offsets = np.arange(1, half + 1)
+        a = order[np.repeat(positions, half)]
+        b = order[(positions[:, None] + offsets[None, :]).ravel() % n_clients]
+        pairs = np.stack([np.minimum(a, b), np.maximum(a, b)], axis=1)
+        return np.unique(pairs, axis=0)
+
+    def _apply_pair_masks(self, target: np.ndarray, rows_plus: np.ndarray, rows_minus: Optional[np.ndarray],
+                          seeds: np.ndarray, dim: int):
+        """
+        Adds each pair's mask to target[rows_plus] and, when given, subtracts it from
+        target[rows_minus]. Works in chunks so memory stays bounded for large graphs.
+        """
+        for start in range(0, len(seeds), self.chunk_pairs):
+            stop = start + self.chunk_pairs
+            masks = self.expand_masks(seeds[start:stop], dim)
+            np.add.at(target, rows_plus[start:stop], masks)
+            if rows_minus is not None:
+                np.subtract.at(target, rows_minus[start:stop], masks)
+
+    def run_round(self, inputs: np.ndarray, dropout_rate: float = 0.0,
+                  dropped: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """
+        Runs one round over a (clients x dim) float matrix and returns the decoded sum over
+        the surviving clients, plus the round report. Clients in `dropped` (or a random
+        `dropout_rate` fraction) drop out after sharing keys, before sending masked input.
+        Raises ValueError when a client has too few surviving neighbours to recover its masks.
+        """
+        inputs = np.atleast_2d(np.asarray(inputs, dtype=np.float64))
+        n, dim = inputs.shape
+        cpu_start = time.process_time()
+        rng = np.random.default_rng(self.seed_sequence.spawn(1)[0])
+        round_keys = rng.integers(0, 2 ** 63, size=2, dtype=np.uint64)
+        transport = self.transport = LocalTransport(n)
+
+        survived = np.ones(n, dtype=bool)
+        if dropped is not None:
+            survived[np.asarray(dropped, dtype=np.int64)] = False
+        elif dropout_rate > 0:
+            survived = rng.random(n) >= dropout_rate
+        clients = np.arange(n)
+
+        # Stage 0: neighbour graph, and pairwise and self-mask seeds.
+        pairs = self.neighbor_pairs(n, rng)
+        lo, hi = pairs[:, 0], pairs[:, 1]
+        pair_seeds = self._splitmix(round_keys[0] ^ (lo.astype(np.uint64) * np.uint64(n) + hi.astype(np.uint64)))
+        self_seeds = self._splitmix(round_keys[1] + clients.astype(np.uint64))
+        degree = np.bincount(pairs.ravel(), minlength=n)
+
+        # Stage 1: advertise two public keys; the server relays them to each neighbour.
+        transport.send("advertise_keys", clients, 2 * self.KEY_BYTES)
+        transport.broadcast("advertise_keys", clients, 2 * self.KEY_BYTES * degree)
+        # Stage 2: each client sends every neighbour shares of its self-mask seed and secret key.
+        transport.send("share_keys", np.concatenate([lo, hi]), 2 * self.SHARE_BYTES, receivers=np.concatenate([hi, lo]))
+
+        # Stage 3: survivors upload x + self mask + sum(+m_ij for j > i) - sum(m_ij for j < i).
+        masked = self.encode(inputs)
+        masked += self.expand_masks(self_seeds, dim)
+        self._apply_pair_masks(masked, lo, hi, pair_seeds, dim)
+        transport.send("masked_input", clients[survived], dim * self.VALUE_BYTES)
+        total = masked[survived].sum(axis=0, dtype=np.uint64)
+
+        # Stage 4: survivors reveal self-mask shares of surviving neighbours and
+        # secret-key shares of dropped ones; the server removes what did not cancel.
+        alive_lo, alive_hi = survived[lo], survived[hi]
+        surviving_neighbors = (np.bincount(lo[alive_hi], minlength=n) + np.bincount(hi[alive_lo], minlength=n))
+        threshold = self.threshold or (int(degree.min()) // 2 + 1 if n > 1 else 0)
+        short = np.flatnonzero(surviving_neighbors < threshold)
+        if len(short) and survived.any():
+            raise ValueError(f"Secure aggregation aborted: {len(short)} clients have fewer than "
+                             f"{threshold} surviving neighbours to recover their masks.")
+        revealers = np.concatenate([lo[alive_lo & alive_hi], hi[alive_lo & alive_hi], lo[alive_lo & ~alive_hi], hi[~alive_lo & alive_hi]])
+        transport.send("unmasking", revealers, self.SHARE_BYTES)
+
+        total -= self.expand_masks(self_seeds[survived], dim).sum(axis=0, dtype=np.uint64)
+        orphaned = alive_lo ^ alive_hi
+        # Orphaned pairs: a surviving lo client added +m and a surviving hi client added -m.
+        # recovered[0] sums the former and recovered[1] the latter.
+        recovered = np.zeros((2, dim), dtype=np.uint64)
+        self._apply_pair_masks(recovered, alive_hi[orphaned].astype(np.int64), None, pair_seeds[orphaned], dim)
+        total -= recovered[0]
+        total += recovered[1]
+        total = self.decode(total)
+
+        cpu_seconds = time.process_time() - cpu_start
+        return {
+            "sum": total,
+            "clients": n,
+            "survivors": int(survived.sum()),
+            "dropped": int(n - survived.sum()),
+            "neighbors_per_client": float(degree.mean()) if n else 0.0,
+            "threshold": threshold,
+            "recovered_pair_masks": int(orphaned.sum()),
+            "cpu_seconds": cpu_seconds,
+            "bytes_sent_per_client": float(transport.sent.mean()) if n else 0.0,
+            "bytes_received_per_client": float(transport.received.mean()) if n else 0.0,
+            "bytes_by_stage": dict(transport.bytes_by_stage)
+        }
+
 # Example usage for verification
 if __name__ == "__main__":
     engine = PrivacyEngine(epsilon=0.5)
@@ -1,34 +1,78 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from ethio_agri_advisor.config import settings
-from typing import Dict
+from ethio_agri_advisor.core.llm_registry import get_chat_model
+from ethio_agri_advisor.core.instrumentation import get_instrumentation
+from functools import cached_property
+from typing import Dict, List, Optional
 
 class MultilingualTranslatorTool:
     """
     Translates agricultural recommendations into Amharic and Afaan Oromoo.
     Performs high-quality contextual translation.
+    All target languages are translated concurrently through a single chain.
     """
     
-    def __init__(self, model_name: str = None):
+    def __init__(self, model_name: str = None, llm=None, max_concurrency: Optional[int] = None, use_cache: bool = True):
         self.model_name = model_name or settings.DEFAULT_MODEL_NAME
-        self.llm = ChatGoogleGenerativeAI(model=self.model_name, google_api_key=settings.GOOGLE_API_KEY)
+        self.use_cache = use_cache
+        if llm is not None:
+            self.llm = llm
+        self.max_concurrency = max_concurrency or settings.TRANSLATION_MAX_CONCURRENCY
         self.prompt = ChatPromptTemplate.from_template(
             "Translate the following agricultural advice into {language}. "
             "Ensure the tone is helpful and culturally appropriate for Ethiopian smallholders.\n\n"
             "Advice: {text}"
         )
 
-    def translate(self, text: str, target_languages: list = ["Amharic", "Afaan Oromoo"]) -> Dict[str, str]:
+    @cached_property
+    def llm(self):
+        return get_chat_model(self.model_name, use_cache=self.use_cache)
+
+    @cached_property
+    def chain(self):
+        return self.prompt | self.llm
+
+    @staticmethod
+    def _collect(languages: List[str], responses: list) -> Dict[str, str]:
         """
-        Translates text into multiple languages.
+        Maps responses back to languages. A failed language gets a placeholder
+        instead of discarding the translations that succeeded.
         """
         translations = {}
-        for lang in target_languages:
-            chain = self.prompt | self.llm
-            response = chain.invoke({"language": lang, "text": text})
-            translations[lang] = response.content
+        for lang, response in zip(languages, responses):
+            if isinstance(response, Exception):
+                print(f"Translation to {lang} failed: {response}")
+                translations[lang] = f"[Translation to {lang} unavailable]"
+            else:
+                translations[lang] = response.content
         return translations
 
+    def translate(self, text: str, target_languages: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Translates text into multiple languages.
+        """
+        languages = list(target_languages or settings.TRANSLATION_LANGUAGES)
+        with get_instrumentation().timer("advisor_external_seconds", service="translation"):
+            responses = self.chain.batch(
+                [{"language": lang, "text": text} for lang in languages],
+                config={"max_concurrency": self.max_concurrency},
+                return_exceptions=True
+            )
+        return self._collect(languages, responses)
+
+    async def atranslate(self, text: str, target_languages: Optional[List[str]] = None) -> Dict[str, str]:
+        """
+        Async variant of translate.
+        """
+        languages = list(target_languages or settings.TRANSLATION_LANGUAGES)
+        with get_instrumentation().timer("advisor_external_seconds", service="translation"):
+            responses = await self.chain.abatch(
+                [{"language": lang, "text": text} for lang in languages],
+                config={"max_concurrency": self.max_concurrency},
+                return_exceptions=True
+            )
+        return self._collect(languages, responses)
+
 # Example usage
 if __name__ == "__main__":
     tool = MultilingualTranslatorTool()
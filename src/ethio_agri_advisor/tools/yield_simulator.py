@@ -1,8 +1,33 @@
 import numpy as np
 import json
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence, Union
 from ethio_agri_advisor.config import settings
 
+# Parameters used when a crop is missing from crop_yields.json.
+DEFAULT_CROP_PARAMS = {
+    "base_yield_q_ha": 20,
+    "optimal_ph_min": 6.0,
+    "optimal_ph_max": 7.5,
+    "water_requirement_mm": 500,
+}
+
+def _round_half_even(values: np.ndarray, ndigits: int = 2) -> np.ndarray:
+    """
+    Rounds an array exactly like Python's built-in round(x, ndigits).
+    np.round scales before rounding, so values that land exactly on a .5
+    after scaling may round differently; those rare ties are re-rounded in Python.
+    """
+    scale = 10.0 ** ndigits
+    scaled = np.asarray(values * scale)
+    rounded = np.asarray(np.rint(scaled) / scale)
+    ties = np.flatnonzero(np.abs(scaled - np.trunc(scaled)) == 0.5)
+    if ties.size:
+        flat_values = values.reshape(-1)
+        flat_rounded = rounded.reshape(-1)
+        for i in ties:
+            flat_rounded[i] = round(float(flat_values[i]), ndigits)
+    return rounded
+
 class YieldSimulationTool:
     """
     Simulates crop yield and risk based on environmental factors.
@@ -11,6 +36,7 @@ class YieldSimulationTool:
     
     def __init__(self):
         self.crop_data = self._load_crop_data()
+        self._index_crop_params()
 
     def _load_crop_data(self) -> Dict[str, Any]:
         """Load crop yield data from JSON file."""
@@ -21,6 +47,35 @@ class YieldSimulationTool:
             print(f"Error loading crop data: {e}")
             return {}
 
+    def _index_crop_params(self):
+        """
+        Pre-indexes crop parameters into per-crop arrays for the batch path.
+        Crop code i refers to self.crop_names[i]; the last row holds the fallback parameters.
+        """
+        self.crop_names: List[str] = list(self.crop_data.keys())
+        self.crop_codes: Dict[str, int] = {name: i for i, name in enumerate(self.crop_names)}
+        self.fallback_code = len(self.crop_names)
+
+        rows = [self.crop_data[name] for name in self.crop_names] + [DEFAULT_CROP_PARAMS]
+        self._base_yield = np.array([r.get("base_yield_q_ha", 20) for r in rows], dtype=np.float64)
+        ph_min = np.array([r.get("optimal_ph_min", 6.0) for r in rows], dtype=np.float64)
+        ph_max = np.array([r.get("optimal_ph_max", 7.5) for r in rows], dtype=np.float64)
+        self._optimal_ph_avg = (ph_min + ph_max) / 2
+        self._water_req = np.array([r.get("water_requirement_mm", 500) for r in rows], dtype=np.float64)
+
+    def encode_crops(self, crop_types: Union[Sequence[str], np.ndarray]) -> np.ndarray:
+        """
+        Maps crop names to integer crop codes. Unknown crops map to the fallback code.
+        Each distinct name is looked up once, so this is cheap for large columns.
+        """
+        names = np.asarray(crop_types)
+        unique, inverse = np.unique(names, return_inverse=True)
+        unique_codes = np.array(
+            [self.crop_codes.get(str(name).lower(), self.fallback_code) for name in unique],
+            dtype=np.intp
+        )
+        return unique_codes[inverse].reshape(names.shape)
+
     def calculate_yield_risk(self, soil_ph: float, rainfall_mm: float, crop_type: str) -> Dict[str, Any]:
         """
         Calculates estimated yield and risk score.
@@ -64,7 +119,108 @@ class YieldSimulationTool:
             }
         }
 
+    def _compute_batch(self, soil_ph: np.ndarray, rainfall_mm: np.ndarray, crop_codes: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Vectorized core of the yield model. Returns unrounded arrays.
+        Mirrors calculate_yield_risk operation for operation so results are bit-identical.
+        """
+        base = self._base_yield[crop_codes]
+        optimal_ph_avg = self._optimal_ph_avg[crop_codes]
+        water_req = self._water_req[crop_codes]
+
+        ph_factor = 1.0 - np.abs(soil_ph - optimal_ph_avg) * 0.2
+        ph_factor = np.clip(ph_factor, 0.5, 1.0)
+
+        rain_factor = np.where(
+            rainfall_mm < water_req,
+            rainfall_mm / water_req,
+            np.where(rainfall_mm > water_req * 3, 0.7, 1.0)
+        )
+
+        return {
+            "estimated_yield_q_ha": base * ph_factor * rain_factor,
+            "risk_score": 1.0 - (ph_factor * rain_factor),
+            "ph_factor": ph_factor,
+            "rain_factor": rain_factor
+        }
+
+    def calculate_yield_risk_batch(self, soil_ph, rainfall_mm, crop_type) -> Dict[str, Any]:
+        """
+        Vectorized counterpart of calculate_yield_risk for zone-wide sweeps.
+
+        Args:
+            soil_ph: Array-like of soil pH values (a NumPy array or a pandas column).
+            rainfall_mm: Array-like of seasonal rainfall values, same length as soil_ph.
+            crop_type: Array-like of crop names, or integer crop codes from encode_crops.
+                A single name or code is broadcast to every row.
+
+        Returns:
+            Dictionary of arrays matching the keys of calculate_yield_risk.
+        """
+        soil_ph = np.asarray(soil_ph, dtype=np.float64)
+        rainfall_mm = np.asarray(rainfall_mm, dtype=np.float64)
+        crops = np.asarray(crop_type)
+        crop_codes = crops.astype(np.intp) if np.issubdtype(crops.dtype, np.integer) else self.encode_crops(crops)
+
+        result = self._compute_batch(soil_ph, rainfall_mm, crop_codes)
+        risk_score = result["risk_score"]
+
+        return {
+            "estimated_yield_q_ha": _round_half_even(result["estimated_yield_q_ha"]),
+            "risk_score": _round_half_even(risk_score),
+            "status": np.where(risk_score > 0.4, "High Risk", "Stable"),
+            "factors": {
+                "ph_factor": _round_half_even(result["ph_factor"]),
+                "rain_factor": _round_half_even(result["rain_factor"])
+            }
+        }
+
+    def simulate_yield_distribution(
+        self,
+        soil_ph: float,
+        rainfall_mm: float,
+        crop_type: str,
+        rainfall_std: float,
+        ph_std: float = 0.3,
+        n_samples: int = 10000,
+        seed: Optional[int] = None,
+        rng: Optional[np.random.Generator] = None
+    ) -> Dict[str, Any]:
+        """
+        Monte Carlo estimate of the yield distribution under rainfall and pH uncertainty.
+
+        Draws n_samples scenarios from normal distributions centred on the given values
+        (rainfall clipped at 0) and evaluates them in one vectorized pass.
+
+        Args:
+            rainfall_std: Standard deviation of seasonal rainfall in mm.
+            ph_std: Standard deviation of soil pH.
+            seed: Seed for a fresh Generator; the same seed gives the same result.
+            rng: Existing Generator to draw from (takes precedence over seed).
+
+        Returns:
+            Dictionary with P10/P50/P90 yields, mean yield and the probability of "High Risk".
+        """
+        rng = rng if rng is not None else np.random.default_rng(seed)
+        rain_draws = np.maximum(rng.normal(rainfall_mm, rainfall_std, n_samples), 0.0)
+        ph_draws = rng.normal(soil_ph, ph_std, n_samples)
+        crop_code = self.crop_codes.get(crop_type.lower(), self.fallback_code)
+
+        result = self._compute_batch(ph_draws, rain_draws, crop_code)
+        p10, p50, p90 = np.percentile(result["estimated_yield_q_ha"], [10, 50, 90])
+
+        return {
+            "n_samples": n_samples,
+            "yield_p10_q_ha": round(float(p10), 2),
+            "yield_p50_q_ha": round(float(p50), 2),
+            "yield_p90_q_ha": round(float(p90), 2),
+            "mean_yield_q_ha": round(float(result["estimated_yield_q_ha"].mean()), 2),
+            "prob_high_risk": round(float(np.mean(result["risk_score"] > 0.4)), 4)
+        }
+
 # Example usage
 if __name__ == "__main__":
     tool = YieldSimulationTool()
     print(tool.calculate_yield_risk(5.5, 400, "teff"))
+    print(tool.calculate_yield_risk_batch([5.5, 6.8], [400, 1600], ["teff", "maize"]))
+    print(tool.simulate_yield_distribution(5.5, 400, "teff", rainfall_std=80, seed=7))
@@ -1,5 +1,92 @@
 import sys
 import os
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
 
 # Add src to path so tests can import the package
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../src")))
+
+class _StubWeatherHandler(BaseHTTPRequestHandler):
+    """Serves a canned Open-Meteo forecast and counts requests."""
+
+    def do_GET(self):
+        self.server.request_count += 1
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        body = json.dumps({
+            "current_weather": {"temperature": 18.5, "windspeed": 7.0},
+            "daily": {
+                "rain_sum": [1.0, 0.0, 3.5, 12.0, 4.0, 0.0, 2.5],
+                "temperature_2m_max": [24.0] * 7,
+                "temperature_2m_min": [11.0] * 7
+            }
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def weather_stub():
+    """Local stand-in for the Open-Meteo API. Yields the server; its URL is server.url."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubWeatherHandler)
+    server.request_count = 0
+    server.delay = 0.0
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/v1/forecast"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+class StubSearchTool:
+    """Stand-in for ClimateSearchTool that never touches the network."""
+
+    def search_agri_data(self, query, region=None):
+        return "Source: local\nContent: Sow early-maturing, drought-tolerant varieties."
+
+    async def asearch_agri_data(self, query, region=None):
+        return self.search_agri_data(query)
+
+    def snapshot_context(self, query):
+        return self.search_agri_data(query)
+
+@pytest.fixture
+def no_network(monkeypatch):
+    """Makes every outbound socket connection and DNS lookup fail."""
+    import socket
+
+    def refuse(*args, **kwargs):
+        raise OSError("network disabled in test")
+
+    monkeypatch.setattr(socket.socket, "connect", refuse)
+    monkeypatch.setattr(socket.socket, "connect_ex", refuse)
+    monkeypatch.setattr(socket, "create_connection", refuse)
+    monkeypatch.setattr(socket, "getaddrinfo", refuse)
+
+@pytest.fixture
+def offline_graph(weather_stub, tmp_path):
+    """AgriAdvisorGraph wired to the local fake model, a stub search tool and the weather stub."""
+    from unittest.mock import patch
+    from ethio_agri_advisor.core.cache import MemoryCache
+    from ethio_agri_advisor.core.graph import AgriAdvisorGraph
+    from ethio_agri_advisor.core.weather_service import WeatherService
+
+    with patch("ethio_agri_advisor.config.settings.DEFAULT_MODEL_NAME", "fake"), \
+         patch("ethio_agri_advisor.config.settings.TAVILY_API_KEY", "test-key"), \
+         patch("ethio_agri_advisor.config.settings.PRIVACY_LEDGER_PATH", tmp_path / "privacy_ledger.jsonl"), \
+         patch("ethio_agri_advisor.config.settings.METRICS_DUMP_DIR", str(tmp_path / "metrics")), \
+         patch("ethio_agri_advisor.config.settings.FARM_ID_KEY", "test-farm-id-key"), \
+         patch("ethio_agri_advisor.tools.privacy_accountant._accountant", None):
+        graph = AgriAdvisorGraph()
+        graph.crop_planner.search_tool = StubSearchTool()
+        graph.crop_planner.weather_service = WeatherService(cache=MemoryCache(), base_url=weather_stub.url)
+        yield graph
@@ -26,3 +26,810 @@ def test_privacy_engine_noise():
     data = np.array([10.0])
     noisy_data = engine.add_differential_privacy_noise(data)
     assert noisy_data[0] != 10.0
+
+def test_fedavg_vectorized_handles_missing_and_streams():
+    """Vectorized FedAvg matches the plain mean per key, skips missing values and accepts iterators."""
+    import numpy as np
+    engine = PrivacyEngine(epsilon=1e9)
+    updates = [{"a": 0.1, "b": 0.2}, {"a": 0.3}, {"b": 0.4, "c": 1.0}]
+    result = engine.simulate_federated_averaging(updates)
+    assert set(result) == {"a", "b"}
+    assert result["a"] == pytest.approx(0.2, abs=1e-6)
+    assert result["b"] == pytest.approx(0.3, abs=1e-6)
+
+    streamed = engine.aggregate_updates(({"a": i % 2} for i in range(10001)), chunk_size=1000)
+    assert streamed["a"] == pytest.approx(5000 / 10001, abs=1e-6)
+
+    dense = engine.aggregate_dense(np.array([[0.1, np.nan], [0.3, np.nan]]))
+    assert dense[0] == pytest.approx(0.2, abs=1e-6) and np.isnan(dense[1])
+
+def test_secure_aggregation_masks_cancel_with_dropouts():
+    """Pairwise masks cancel exactly, including after dropout recovery; too many dropouts abort."""
+    import numpy as np
+    from ethio_agri_advisor.tools.privacy_engine import SecureAggregationSimulator
+    simulator = SecureAggregationSimulator(neighbors=8, seed=7)
+    inputs = np.random.default_rng(0).uniform(-1, 1, (500, 6))
+    dropped = np.arange(0, 500, 25)
+    survived = np.ones(500, dtype=bool)
+    survived[dropped] = False
+
+    report = simulator.run_round(inputs, dropped=dropped)
+    expected = np.rint(inputs[survived] * simulator.scale).sum(axis=0) / simulator.scale
+    assert np.array_equal(report["sum"], expected)
+    assert report["survivors"] == 480 and report["recovered_pair_masks"] > 0
+    assert report["bytes_sent_per_client"] > 0
+
+    with pytest.raises(ValueError):
+        simulator.run_round(inputs, dropout_rate=0.7)
+
+def test_privacy_accountant_budgets_and_replays(tmp_path):
+    """Spend is composed per entity, refused past the budget, cached for repeats and replayed from the ledger."""
+    from ethio_agri_advisor.tools.privacy_accountant import PrivacyAccountant, PrivacyBudgetExceededError
+    ledger = tmp_path / "ledger.jsonl"
+    accountant = PrivacyAccountant(budget_epsilon=0.5, budget_delta=1e-5, composition="basic", ledger_path=ledger)
+    engine = PrivacyEngine(epsilon=0.2, accountant=accountant)
+    updates = [{"a": 0.1}, {"a": 0.3}]
+
+    first = engine.simulate_federated_averaging(updates, entity="zone:A")
+    assert engine.simulate_federated_averaging(updates, entity="zone:A") == first  # cached, no new spend
+    engine.simulate_federated_averaging([{"a": 0.5}], entity="zone:A")
+    with pytest.raises(PrivacyBudgetExceededError):
+        engine.simulate_federated_averaging([{"a": 0.7}], entity="zone:A")
+    assert accountant.spent("zone:A")["releases"] == 2
+    assert accountant.spent("zone:B")["releases"] == 0
+
+    replayed = PrivacyAccountant(budget_epsilon=0.5, budget_delta=1e-5, composition="basic", ledger_path=ledger)
+    assert replayed.spent("zone:A")["basic_epsilon"] == pytest.approx(0.4)
+    assert PrivacyEngine(epsilon=0.2, accountant=replayed).simulate_federated_averaging(updates, entity="zone:A") == first
+
+    rdp = PrivacyAccountant(budget_epsilon=3.0, budget_delta=1e-5, composition="rdp")
+    for _ in range(20):
+        rdp.spend("zone:A", 0.0, delta=1e-6, noise_multiplier=20.0)
+    report = rdp.spent("zone:A")
+    assert report["rdp_epsilon"] < report["basic_epsilon"]
+
+    # compute runs outside the lock; a failed compute rolls its reservation back.
+    import threading
+    def slow_compute():
+        other = threading.Thread(target=accountant.spend, args=("zone:C", 0.1))
+        other.start()
+        other.join(timeout=2)
+        assert not other.is_alive()
+        raise RuntimeError("aggregation round failed")
+    with pytest.raises(RuntimeError):
+        accountant.answer("zone:B", "q", slow_compute, epsilon=0.2)
+    assert accountant.spent("zone:B")["releases"] == 0
+    assert accountant.spent("zone:C")["releases"] == 1
+
+    # Budgets never reset by default; an opt-in window resets them and replays only its own spend.
+    assert PrivacyAccountant(budget_epsilon=0.5).window_seconds == 0
+    from unittest.mock import patch
+    windowed = PrivacyAccountant(budget_epsilon=0.5, composition="basic", ledger_path=tmp_path / "windowed.jsonl",
+                                 window_seconds=3600)
+    with patch("ethio_agri_advisor.tools.privacy_accountant.time.time", return_value=7200.0):
+        windowed.spend("region:A", 0.5)
+        with pytest.raises(PrivacyBudgetExceededError):
+            windowed.spend("region:A", 0.1)
+    with patch("ethio_agri_advisor.tools.privacy_accountant.time.time", return_value=10900.0):
+        windowed.spend("region:A", 0.1)
+        replayed = PrivacyAccountant(budget_epsilon=0.5, composition="basic", ledger_path=tmp_path / "windowed.jsonl",
+                                     window_seconds=3600)
+        assert replayed.spent("region:A")["basic_epsilon"] == pytest.approx(0.1)
+
+def test_hierarchical_aggregation_updates_incrementally():
+    """Zone/region/national means match a flat average, single-zone updates are incremental and low levels stay unreleased."""
+    import numpy as np
+    from ethio_agri_advisor.tools.hierarchical_aggregator import HierarchicalAggregator
+    from ethio_agri_advisor.tools.privacy_accountant import PrivacyAccountant
+    tree = HierarchicalAggregator(privacy_engine=PrivacyEngine(epsilon=1e9), noise_level="region", max_workers=1)
+    zones = {
+        "East Gojjam": ("Amhara", [{"a": 0.1}, {"a": 0.3}]),
+        "West Gojjam": ("Amhara", [{"a": 0.5}]),
+        "Arsi": ("Oromia", [{"a": 0.9}, {"a": 0.7}])
+    }
+    tree.update_zones(zones)
+    assert tree.release("region", "Amhara")["a"] == pytest.approx(0.3, abs=1e-6)
+    assert tree.release("national")["a"] == pytest.approx(0.5, abs=1e-6)
+
+    tree.update_zone("Arsi", "Oromia", [{"a": 0.0}])
+    assert tree.zone_recomputations == 4
+    # Noisy totals are drawn once per round; the change shows in the next one.
+    assert tree.release("national")["a"] == pytest.approx(0.5, abs=1e-6)
+    next_round = tree.current_round() + 1
+    assert tree.release("national", round_id=next_round)["a"] == pytest.approx(0.9 / 4, abs=1e-6)
+    assert tree.release("region", "Amhara", round_id=next_round)["a"] == pytest.approx(0.3, abs=1e-6)
+    with pytest.raises(ValueError):
+        tree.release("zone", "Arsi")
+
+    # Farms accumulate by id; a farm reporting again replaces its own update.
+    tree.upsert_farms("Arsi", "Oromia", {"farm-1": {"a": 0.6}})
+    tree.upsert_farms("Arsi", "Oromia", {"farm-2": {"a": 0.3}})
+    tree.upsert_farms("Arsi", "Oromia", {"farm-1": {"a": 0.9}})
+    assert tree.farm_count("zone", "Arsi") == 3
+    assert tree.release("region", "Oromia", round_id=next_round + 1)["a"] == pytest.approx(0.4, abs=1e-6)
+
+    # With an accountant, each region is charged once per round however many sessions ask.
+    accountant = PrivacyAccountant(budget_epsilon=3.0, budget_delta=1e-5, composition="basic")
+    charged = HierarchicalAggregator(privacy_engine=PrivacyEngine(epsilon=0.1, accountant=accountant),
+                                     noise_level="region", max_workers=1)
+    charged.update_zones(zones)
+    for i in range(50):
+        charged.upsert_farms("Arsi", "Oromia", {f"farm-{i}": {"a": 0.5}})
+        charged.release("national")
+    assert accountant.spent("region:Oromia")["releases"] == 1
+    assert accountant.spent("region:Amhara")["releases"] == 1
+
+    # Model deltas leave as one Gaussian vector release, off the region budgets; insights stay in [0,1].
+    noisy = HierarchicalAggregator(privacy_engine=PrivacyEngine(epsilon=0.01, accountant=accountant),
+                                   noise_level="region", max_workers=1, clip_norm=1.0, noise_multiplier=4.0)
+    noisy.update_zones({"Bale": ("Oromia-2", [{"a": 0.5, "delta_w": 0.1, "delta_b": -0.2}])})
+    assert set(noisy.release("region", "Oromia-2")) == {"a"} and 0.0 <= noisy.release("national")["a"] <= 1.0
+    assert set(noisy.release_model()) == {"delta_w", "delta_b"}
+    assert accountant.spent("region:Oromia-2")["releases"] == 1
+    assert accountant.spent("model")["releases"] == 1
+
+def test_local_model_updates_are_clipped_and_converge():
+    """Farm deltas respect the clip norm and federated rounds approach the centralized fit."""
+    import numpy as np
+    from ethio_agri_advisor.tools.local_model import FEATURE_NAMES, FederatedYieldTrainer, farm_update, local_sgd
+    trainer = FederatedYieldTrainer.synthetic(200, n_seasons=16, seed=0, max_workers=1)
+    deltas, _ = local_sgd(np.zeros(len(FEATURE_NAMES)), trainer.X, trainer.y, epochs=3, update_clip=0.5,
+                          rng=np.random.default_rng(0))
+    assert np.all(np.linalg.norm(deltas, axis=1) <= 0.5 + 1e-9)
+
+    _, baseline = trainer.centralized_baseline()
+    for _ in range(30):
+        trainer.run_round(fraction=0.5)
+    assert trainer.evaluate() < 2 * baseline
+
+    update = farm_update({"crop_type": "teff", "soil_ph": 5.0, "soil_nitrogen": 0.15})
+    assert 0.0 <= update["yield_improvement_potential"] <= 1.0
+    assert {f"delta_{name}" for name in FEATURE_NAMES} <= set(update)
+
+def test_feature_extraction_fast_path_skips_llm(offline_graph):
+    """Structured SMS forms are parsed without the LLM; free text still goes through it."""
+    from unittest.mock import patch
+    from ethio_agri_advisor.tools.feature_extractor import FastFeatureExtractor
+    analyzer = offline_graph.local_analyzer
+    with patch.object(type(analyzer.llm), "invoke", side_effect=AssertionError("LLM called")):
+        result = analyzer.process("CROP:maize;ZONE:West Gojjam;PH:5.2;AREA:4 timad")
+    assert result["anonymized_features"]["crop_type"] == "maize"
+    assert result["anonymized_features"]["region"] == "Amhara"
+
+    features, complete = FastFeatureExtractor().extract("I grow teff in East Gojjam; the soil is acidic.")
+    assert not complete and features.crop_type == "teff" and features.zone == "East Gojjam"
+    result = analyzer.process("I grow teff in East Gojjam; the soil is acidic.")
+    assert result["anonymized_features"]["zone"] == "East Gojjam"
+    stats = analyzer.extraction_stats()
+    assert stats["fast_path_hits"] == 1 and stats["llm_calls"] == 1 and stats["hit_rate"] == 0.5
+
+    # Local noise is charged per farm and keyed on the attribute, so a zone's farms do not share a budget.
+    from ethio_agri_advisor.tools.privacy_accountant import PrivacyAccountant
+    from ethio_agri_advisor.tools.privacy_engine import PrivacyEngine
+    accountant = PrivacyAccountant(budget_epsilon=0.15, composition="basic")
+    analyzer.privacy_engine = PrivacyEngine(epsilon=0.1, accountant=accountant)
+    farms = [analyzer.process("CROP:teff;ZONE:Arsi;PH:5.1;AREA:2 timad", submitter=f"91100000{i}") for i in range(4)]
+    assert all("soil_ph" in farm["anonymized_features"] for farm in farms)
+    again = analyzer.process("CROP:teff;ZONE:Arsi;PH:5.3;AREA:2 timad", submitter="911000000")
+    assert again["anonymized_features"]["soil_ph"] == farms[0]["anonymized_features"]["soil_ph"]
+    assert accountant.spent(f"farm:{farms[0]['farm_id']}")["releases"] == 1
+
+    # Farm ids follow the submitter, not the reported values, and survive a restart.
+    from ethio_agri_advisor.agents import local_analyzer
+    assert len({farm["farm_id"] for farm in farms}) == 4 and again["farm_id"] == farms[0]["farm_id"]
+    assert local_analyzer.submitter_id("Call me on +251 911 000000.") == local_analyzer.submitter_id("0911000000") == "911000000"
+    local_analyzer._farm_id_key.cache_clear()
+    assert local_analyzer.farm_id("911000000") == farms[0]["farm_id"]
+    assert local_analyzer.farm_id(None) != local_analyzer.farm_id(None)
+
+def test_gazetteer_resolves_zones_to_grid_cells(tmp_path):
+    """Zone names resolve (exactly, by prefix or fuzzily) to a coarse cell instead of Addis Ababa."""
+    import numpy as np
+    from ethio_agri_advisor.agents.crop_planner import CropWeatherPlannerAgent
+    from ethio_agri_advisor.tools.gazetteer import Gazetteer
+    gazetteer = Gazetteer(index_path=tmp_path / "gazetteer.npy")
+    assert isinstance(gazetteer.table, np.memmap)
+    assert gazetteer.lookup("Wolayta Zone").name == "Wolaita"
+    assert gazetteer.lookup("machakel", "woreda").parent == "East Gojjam"
+    assert gazetteer.lookup("Illuba").name == "Illubabor"
+    assert gazetteer.lookup("Atlantis") is None
+    assert {p.name for p in gazetteer.prefix("west g", level="zone")} == {"West Gojjam", "West Gondar"}
+
+    planner = CropWeatherPlannerAgent()
+    planner.gazetteer = gazetteer
+    cell = planner._location({"zone": "Arsi", "region": "Oromia"})
+    assert cell == gazetteer.cell({"zone": "Arsi"}) and cell != (9.03, 38.74)
+    assert planner._location({"region": "Tigray"})[0] > 13
+    assert planner._location({}) == (9.03, 38.74)
+
+def test_climatology_store_ingests_and_feeds_planner(tmp_path):
+    """CSV rainfall is ingested into a mapped store whose season totals drive the yield simulation."""
+    import numpy as np
+    import pandas as pd
+    from ethio_agri_advisor.agents.crop_planner import CropWeatherPlannerAgent
+    from ethio_agri_advisor.tools.climatology import ClimatologyStore
+    rows = [(lat, lon, year, dekad, 30.0 + (year - 2000) if 16 <= dekad <= 27 else 5.0)
+            for lat in (7.5, 8.0) for lon in (39.0, 39.5) for year in range(2000, 2010) for dekad in range(1, 37)]
+    pd.DataFrame(rows, columns=["latitude", "longitude", "year", "dekad", "rain_mm"]).to_csv(tmp_path / "chirps.csv", index=False)
+    store = ClimatologyStore.ingest_csv([tmp_path / "chirps.csv"], path=tmp_path / "store")
+
+    reopened = ClimatologyStore(tmp_path / "store")
+    assert isinstance(reopened.dekadal, np.memmap)
+    stats = reopened.season_stats(7.95, 39.12, "kiremt")
+    assert stats["mean_mm"] == pytest.approx(12 * 34.5) and stats["years"] == 10
+    assert reopened.season_total(7.95, 39.12, "belg", year=2003) == pytest.approx(60.0)
+    assert reopened.percentile(7.95, 39.12, "kiremt", 12 * 30.0) == pytest.approx(5.0)
+    assert reopened.season_stats(12.0, 39.0) is None and store.cell_index(12.0, 39.0) is None
+
+    planner = CropWeatherPlannerAgent()
+    planner.climatology = reopened
+    rainfall, _, info = planner._seasonal_rainfall({"zone": "Arsi"}, {"daily_rain_sum": [0.0] * 7})
+    assert info["source"] == "climatology" and rainfall == pytest.approx(stats["mean_mm"])
+    assert planner._seasonal_rainfall({"zone": "Borena"}, {"daily_rain_sum": [0.0] * 7})[2]["source"] == "default"
+
+def test_graph_runs_offline_with_network_disabled(tmp_path, no_network):
+    """In offline mode the whole graph runs from the snapshot store with sockets disabled."""
+    from unittest.mock import patch
+    from ethio_agri_advisor.core.graph import AgriAdvisorGraph
+    from ethio_agri_advisor.core.snapshot_store import SnapshotStore, SnapshotSyncer
+    from ethio_agri_advisor.config import settings
+    from ethio_agri_advisor.tools.gazetteer import get_gazetteer
+    from ethio_agri_advisor.tools.guideline_index import GuidelineIndex, load_corpus
+    store = SnapshotStore(tmp_path / "snapshots.sqlite")
+    index = GuidelineIndex(tmp_path / "guidelines.sqlite")
+    load_corpus(index, settings.GUIDELINES_CORPUS_FILE)
+    zone = get_gazetteer().lookup("East Gojjam", "zone")
+    store.put_weather(zone.latitude, zone.longitude, {"current_temp": 17.0, "daily_rain_sum": [4.0] * 7})
+
+    with patch("ethio_agri_advisor.config.settings.OFFLINE_MODE", True), \
+         patch("ethio_agri_advisor.config.settings.DEFAULT_MODEL_NAME", "fake"), \
+         patch("ethio_agri_advisor.config.settings.PRIVACY_LEDGER_PATH", tmp_path / "privacy_ledger.jsonl"), \
+         patch("ethio_agri_advisor.tools.privacy_accountant._accountant", None), \
+         patch("ethio_agri_advisor.core.snapshot_store.get_snapshot_store", return_value=store), \
+         patch("ethio_agri_advisor.tools.guideline_index.get_guideline_index", return_value=index):
+        graph = AgriAdvisorGraph()
+        state = graph.app.invoke(graph.initial_state("CROP:teff;ZONE:East Gojjam;PH:5.6", max_iterations=1))
+        assert state["final_report"]["status"] == "Finalized"
+        weather = graph.crop_planner.weather_service.get_current_weather(zone.latitude, zone.longitude)
+        assert weather["current_temp"] == 17.0 and "Offline snapshot" in weather["note"]
+        search_tool = graph.crop_planner.search_tool
+        assert "local://guidelines/" in search_tool.search_agri_data("teff resilience Amhara")
+        assert search_tool.search_agri_data("cassava Gambela") == search_tool.NO_CONTEXT
+        assert search_tool.stats()["remote_searches"] == 0
+
+    # The planner's region-specific query is not covered by the bundled corpus either, so both are queued.
+    stats = store.stats()
+    assert stats["hits"] >= 1 and stats["pending_queries"] == 2
+    report = SnapshotSyncer(store).sync_once()
+    assert not report["online"] and report["weather_refreshed"] == report["queries_refreshed"] == 0
+
+def test_snapshot_sync_keeps_last_good_results_when_search_fails(tmp_path, weather_stub):
+    """A live search that fails (Tavily returns the error as a string) never replaces a synced snapshot."""
+    import pytest
+    from ethio_agri_advisor.core.cache import MemoryCache
+    from ethio_agri_advisor.core.snapshot_store import SnapshotStore, SnapshotSyncer
+    from ethio_agri_advisor.core.weather_service import WeatherService
+    from ethio_agri_advisor.tools.climate_search import ClimateSearchTool
+    from ethio_agri_advisor.tools.guideline_index import GuidelineIndex
+
+    class FailingTavily:
+        def invoke(self, payload):
+            return "HTTPError('429 Client Error: Too Many Requests')"
+
+    store = SnapshotStore(tmp_path / "snapshots.sqlite")
+    good = [{"url": "https://example.org/teff", "content": "Sow early-maturing teff after the first rains."}]
+    store.put_search("teff resilience Amhara", good)
+    tool = ClimateSearchTool(snapshots=store, offline=False, index=GuidelineIndex(tmp_path / "guidelines.sqlite"))
+    tool.search = FailingTavily()
+    with pytest.raises(RuntimeError):
+        tool.fetch_results("teff resilience Amhara")
+
+    # Searches that fail this way fall back to the snapshot in both the sync and async paths.
+    import asyncio
+
+    class AsyncFailingTavily(FailingTavily):
+        async def ainvoke(self, payload):
+            return self.invoke(payload)
+
+    tool.search = AsyncFailingTavily()
+    assert "Sow early-maturing teff" in tool.search_agri_data("teff resilience Amhara")
+    assert "Sow early-maturing teff" in asyncio.run(tool.asearch_agri_data("teff resilience Amhara"))
+    assert tool.search_agri_data("maize resilience Oromia") == tool.NO_CONTEXT
+    store.put_search("sorghum resilience Afar", "HTTPError('401 Unauthorized')")  # stored by an older release
+    assert tool.snapshot_context("sorghum resilience Afar") == tool.NO_CONTEXT
+    assert store.get_search("teff resilience Amhara") == good and store.get_search("maize resilience Oromia") is None
+
+    weather = WeatherService(cache=MemoryCache(), base_url=weather_stub.url, snapshots=store, offline=False)
+    report = SnapshotSyncer(store, weather_service=weather, search_tool=tool, max_age_seconds=0).sync_once()
+    assert report["online"] and report["queries_refreshed"] == 0 and report["failed"] == 3
+    assert store.get_search("teff resilience Amhara") == good
+
+def test_guideline_index_serves_locally_and_indexes_misses(tmp_path):
+    """BM25 answers covered queries locally; a miss goes to the live search once and is indexed."""
+    from ethio_agri_advisor.core.snapshot_store import SnapshotStore
+    from ethio_agri_advisor.tools.climate_search import ClimateSearchTool
+    from ethio_agri_advisor.tools.guideline_index import GuidelineIndex
+    index = GuidelineIndex(tmp_path / "guidelines.sqlite", vectors=True)
+    docs = [{"url": "u1", "title": "Teff", "content": "Row planting teff improves tillering. Weed teff early."},
+            {"url": "u2", "title": "Maize", "content": "Drought tolerant maize hybrids suit moisture stressed zones."}]
+    assert index.add_documents(docs) == 2 and index.add_documents(docs) == 0
+    assert index.search("teff weeding", hybrid=False)[0]["url"] == "u1"
+    assert index.search("drougth tolerant maze")[0]["url"] == "u2"
+
+    index.add_documents([{"url": "u1", "title": "Teff", "content": "Broadcast sorghum in lowlands."}])
+    reopened = GuidelineIndex(tmp_path / "guidelines.sqlite", vectors=True)
+    assert len(reopened) == 2 and reopened.search("sorghum lowlands")[0]["url"] == "u1"
+    assert not reopened.search("row planting tillering", hybrid=False)
+
+    class FakeTavily:
+        calls = 0
+        def invoke(self, payload):
+            FakeTavily.calls += 1
+            return [{"url": "https://example.org/barley", "content": "Lime acidic soils before sowing barley in Arsi."}]
+
+    tool = ClimateSearchTool(snapshots=SnapshotStore(tmp_path / "snapshots.sqlite"), offline=False, index=reopened)
+    tool.search = FakeTavily()
+    for _ in range(3):
+        assert "barley" in tool.search_agri_data("barley resilience Arsi")
+    assert FakeTavily.calls == 1 and tool.stats()["local_hits"] == 2
+
+    # A region-specific query is not answered by generic guidance that never mentions the region.
+    from ethio_agri_advisor.config import settings
+    from ethio_agri_advisor.tools.guideline_index import load_corpus
+    bundled = GuidelineIndex(tmp_path / "bundled.sqlite", vectors=False)
+    load_corpus(bundled, settings.GUIDELINES_CORPUS_FILE)
+    tool = ClimateSearchTool(snapshots=SnapshotStore(tmp_path / "snapshots.sqlite"), offline=False, index=bundled)
+    for crop, region in [("maize", "Tigray"), ("wheat", "Afar"), ("coffee", "Amhara")]:
+        assert tool.local_results(f"{crop} resilience {region}") is not None
+        assert tool.local_results(f"{crop} resilience {region}", region=region) is None
+    assert tool.local_results("barley resilience Arsi", region="Arsi") is None
+    bundled.add_documents([{"url": "u3", "title": "Barley", "content": "Lime acidic soils before sowing barley in Arsi."}])
+    assert tool.local_results("barley resilience Arsi", region="Arsi") is not None
+
+def test_refine_reuses_context_and_resumes_from_checkpoint(offline_graph):
+    """A rejected plan is rewritten from the audit reasons alone; an interrupted run resumes after its last node."""
+    import pytest
+    from langgraph.checkpoint.memory import MemorySaver
+    from ethio_agri_advisor.core.graph import AgriAdvisorGraph
+    planner = offline_graph.crop_planner
+    calls = {"context": 0, "revise": [], "audit": 0, "analysis": 0, "synthesis": 0}
+    prepare_context, revise, process = planner.prepare_context, planner.revise, offline_graph.local_analyzer.process
+
+    def counted_context(features):
+        calls["context"] += 1
+        return prepare_context(features)
+
+    def counted_revise(plan, feedback):
+        calls["revise"].append(feedback)
+        return revise(plan, feedback)
+
+    def audit(recommendation):
+        calls["audit"] += 1
+        approved = calls["audit"] > 1
+        return {"is_approved": approved, "audit_log": "Over-promises yields.", "decision": "APPROVED" if approved else "REJECTED",
+                "tool_audit": {"is_safe": True, "detected_leaks": [] if approved else ["name"]}}
+
+    def counted_process(raw_input):
+        calls["analysis"] += 1
+        return process(raw_input)
+
+    planner.prepare_context, planner.revise = counted_context, counted_revise
+    offline_graph.privacy_auditor.audit = audit
+    offline_graph.local_analyzer.process = counted_process
+    state = offline_graph.app.invoke(offline_graph.initial_state("Teff farmer in East Gojjam."))
+    assert state["iteration_count"] == 2 and state["final_report"]["status"] == "Finalized"
+    assert calls["context"] == 1 and len(calls["revise"]) == 1
+    assert "name" in calls["revise"][0] and "Over-promises yields." in calls["revise"][0]
+
+    graph = AgriAdvisorGraph(checkpointer=MemorySaver())
+    for agent in ["local_analyzer", "federated_collaborator", "crop_planner", "privacy_auditor", "synthesizer"]:
+        setattr(graph, agent, getattr(offline_graph, agent))
+    synthesize = graph.synthesizer.synthesize
+
+    def flaky_synthesize(**kwargs):
+        calls["synthesis"] += 1
+        if calls["synthesis"] == 1:
+            raise TimeoutError("translation service dropped")
+        return synthesize(**kwargs)
+
+    graph.synthesizer.synthesize = flaky_synthesize
+    calls.update(context=0, analysis=0, audit=1)
+    with pytest.raises(TimeoutError):
+        graph.run("Teff farmer Abebe (+251911223344) in East Gojjam.", thread_id="farm-1")
+    state = graph.resume("farm-1")
+    assert state["final_report"]["status"] == "Finalized"
+    assert calls["analysis"] == 1 and calls["context"] == 1 and calls["synthesis"] == 2
+    assert graph.resume("farm-1")["final_report"] == state["final_report"]
+    # No checkpoint in the thread's history, including the input step, holds the raw input.
+    history = list(graph.checkpointer.list({"configurable": {"thread_id": "farm-1"}}))
+    assert len(history) > 5 and "user_input" not in state and not graph._raw_inputs
+    assert not any("Abebe" in repr(t) or "911223344" in repr(t) for t in history)
+
+    # A second run on the same thread starts from a clean plan instead of the first run's context.
+    graph.run("Maize farmer in Jimma.", thread_id="farm-1")
+    assert calls["analysis"] == 2 and calls["context"] == 2
+    calls["audit"] = -10  # every audit rejects: the run ends at max iterations without a report
+    state = graph.run("Sorghum farmer in Wolaita.", max_iterations=1, thread_id="farm-1")
+    assert state["final_report"] is None and state["refine_loops_avoided"] == 0
+    assert state["messages"][0] == "Starting advisor session..." and len(state["messages"]) == 5
+
+def test_tiered_audit_reserves_llm_for_uncertain_plans():
+    """Rules and the local classifier settle clear plans; the LLM verdict is parsed, not substring-matched."""
+    from unittest.mock import patch
+    from ethio_agri_advisor.agents.privacy_auditor import PrivacyAuditorAgent
+    from ethio_agri_advisor.core.llm_registry import LocalFakeChatModel
+    from ethio_agri_advisor.tools.ethics_audit import parse_verdict
+    auditor = PrivacyAuditorAgent(model_name="fake", use_cache=False)
+    auditor.llm = LocalFakeChatModel(response="I disapprove of this plan: it promises too much.")
+    with patch.object(LocalFakeChatModel, "invoke", side_effect=AssertionError("LLM called")):
+        leak = auditor.audit("Call Abebe on +251911223344 before sowing.")
+        hype = auditor.audit("Sow early. This seed is guaranteed to double your yield.")
+        sound = auditor.audit("Plant drought-tolerant, early-maturing teff at the onset of the main rains "
+                              "and apply lime where the soil is acidic.")
+    assert (leak["tier"], leak["is_approved"]) == ("rules", False) and "ethiopian_phone" in leak["reasons"][0]
+    assert (hype["tier"], hype["is_approved"]) == ("rules", False) and len(hype["reasons"]) == 2
+    assert (sound["tier"], sound["decision"]) == ("classifier", "APPROVED")
+    assert set(sound["scores"]) == {"over_promising", "cultural_insensitivity"}
+
+    with patch("ethio_agri_advisor.config.settings.AUDIT_APPROVE_BELOW", 0.0):
+        uncertain = auditor.audit("Plant maize in June and scout weekly for fall armyworm.")
+    assert (uncertain["tier"], uncertain["is_approved"]) == ("llm", False)
+    assert uncertain["reasons"] == ["I disapprove of this plan: it promises too much."]
+    assert parse_verdict("VERDICT: APPROVE. Sound advice.") is True
+    assert parse_verdict("This cannot be approved.") is False and parse_verdict("Looks fine.") is None
+    assert parse_verdict("I see no reason to reject this plan; I approve it.") is True
+    assert parse_verdict("VERDICT: UNCERTAIN. I would approve with changes.") is None
+
+    stats = auditor.audit_stats()
+    assert stats["audits"] == 4 and stats["rules"] == 2 and stats["classifier"] == 1 and stats["llm"] == 1
+    assert stats["llm_share"] == 0.25
+
+    # Hedged or cautionary wording is not a rule hit; it goes on to the classifier.
+    from ethio_agri_advisor.tools.ethics_audit import rule_flags
+    hedged = ["Yields are not guaranteed.", "No variety is drought-proof.",
+              "There is no risk of frost at this elevation.", "Avoid calling local practices backward."]
+    assert all(rule_flags(text) == [] for text in hedged)
+    assert rule_flags("Zero cost, no risk!") == [("over_promising", "no risk")]
+    with patch.object(LocalFakeChatModel, "invoke", side_effect=AssertionError("LLM called")):
+        assert auditor.audit(" ".join(hedged))["tier"] != "rules"
+
+def test_instrumentation_times_nodes_and_calls(offline_graph, tmp_path):
+    """A run records per-node and external-call histograms plus token and cache counters, and dumps them."""
+    import json
+    import random
+    from ethio_agri_advisor.core.instrumentation import LatencyHistogram, get_instrumentation
+    histogram = LatencyHistogram()
+    rng = random.Random(0)
+    values = sorted(rng.lognormvariate(-4, 1) for _ in range(20000))
+    for v in values:
+        histogram.record(v)
+    for q in (50, 99):
+        exact = values[int(q / 100 * len(values)) - 1]
+        assert abs(histogram.percentile(q) - exact) / exact < 0.04
+
+    metrics = get_instrumentation()
+    metrics.reset()
+    offline_graph.run("Maize farmer in Arsi checking the instrumentation.")
+    assert not (tmp_path / "latest.json").exists()  # runs leave the writing to the dump thread and exit hook
+    metrics.dump(tmp_path)
+    snapshot = json.loads((tmp_path / "latest.json").read_text())
+    nodes = {h["labels"]["node"]: h for h in snapshot["histograms"]["advisor_node_seconds"]}
+    assert set(nodes) == {"local_analysis", "federated_collaboration", "crop_planning", "privacy_audit", "synthesis"}
+    assert all(h["count"] >= 1 and h["p99_seconds"] >= h["p50_seconds"] for h in nodes.values())
+    services = {h["labels"]["service"] for h in snapshot["histograms"]["advisor_external_seconds"]}
+    assert {"open_meteo", "translation"} <= services
+    tokens = {c["labels"]["direction"]: c["value"] for c in snapshot["counters"]["advisor_llm_tokens_total"]}
+    assert tokens["input"] > 0 and tokens["output"] > 0
+    caches = {(c["labels"]["cache"], c["labels"]["result"]) for c in snapshot["counters"]["advisor_cache_lookups_total"]}
+    assert ("weather", "miss") in caches and ("llm", "miss") in caches
+    prom = (tmp_path / "latest.prom").read_text()
+    assert 'advisor_node_seconds_bucket{node="synthesis",le="+Inf"} 1' in prom
+    assert "# TYPE advisor_llm_tokens_total counter" in prom
+
+def test_yield_batch_matches_scalar():
+    """Test that the vectorized yield path matches the scalar path exactly."""
+    import numpy as np
+    from ethio_agri_advisor.tools.yield_simulator import YieldSimulationTool
+
+    tool = YieldSimulationTool()
+    rng = np.random.default_rng(42)
+    n = 2000
+    soil_ph = np.round(rng.uniform(4.0, 9.0, n), 3)
+    rainfall = np.round(rng.uniform(0, 2000, n), 1)
+    crops = rng.choice(tool.crop_names + ["Teff", "cassava"], n)
+
+    batch = tool.calculate_yield_risk_batch(soil_ph, rainfall, crops)
+    for i in range(n):
+        scalar = tool.calculate_yield_risk(float(soil_ph[i]), float(rainfall[i]), str(crops[i]))
+        assert batch["estimated_yield_q_ha"][i] == scalar["estimated_yield_q_ha"]
+        assert batch["risk_score"][i] == scalar["risk_score"]
+        assert batch["status"][i] == scalar["status"]
+        assert batch["factors"]["ph_factor"][i] == scalar["factors"]["ph_factor"]
+        assert batch["factors"]["rain_factor"][i] == scalar["factors"]["rain_factor"]
+
+def test_yield_monte_carlo_is_seeded():
+    """Test that the Monte Carlo yield mode is reproducible and ordered."""
+    from ethio_agri_advisor.tools.yield_simulator import YieldSimulationTool
+
+    tool = YieldSimulationTool()
+    first = tool.simulate_yield_distribution(5.8, 420, "teff", rainfall_std=90, n_samples=100000, seed=7)
+    second = tool.simulate_yield_distribution(5.8, 420, "teff", rainfall_std=90, n_samples=100000, seed=7)
+    assert first == second
+    assert first["yield_p10_q_ha"] <= first["yield_p50_q_ha"] <= first["yield_p90_q_ha"]
+    assert 0.0 <= first["prob_high_risk"] <= 1.0
+
+def test_weather_cache_geo_buckets(weather_stub):
+    """Test that farms in the same grid cell share one upstream weather request."""
+    from ethio_agri_advisor.core.cache import MemoryCache
+    from ethio_agri_advisor.core.weather_service import WeatherService
+
+    service = WeatherService(cache=MemoryCache(max_entries=16, ttl_seconds=60), base_url=weather_stub.url)
+    first = service.get_current_weather(10.3292, 37.8742)
+    second = service.get_current_weather(10.3301, 37.8755)
+    assert first == second
+    assert first["current_temp"] == 18.5
+    assert weather_stub.request_count == 1
+    stats = service.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+def test_weather_sqlite_cache_survives_restart(weather_stub, tmp_path):
+    """Test that the on-disk weather cache is reused by a new service instance."""
+    from ethio_agri_advisor.core.cache import SQLiteCache
+    from ethio_agri_advisor.core.weather_service import WeatherService
+
+    path = tmp_path / "weather.sqlite"
+    WeatherService(cache=SQLiteCache(path, ttl_seconds=60), base_url=weather_stub.url).get_current_weather(9.03, 38.74)
+    restarted = WeatherService(cache=SQLiteCache(path, ttl_seconds=60), base_url=weather_stub.url)
+    assert restarted.get_current_weather(9.03, 38.74)["daily_rain_sum"][3] == 12.0
+    assert weather_stub.request_count == 1
+
+def test_async_weather_reuses_one_client_per_loop(weather_stub):
+    """Test that async lookups on one event loop share a pooled httpx client."""
+    import asyncio
+    from ethio_agri_advisor.core.cache import MemoryCache
+    from ethio_agri_advisor.core.weather_service import WeatherService
+
+    service = WeatherService(cache=MemoryCache(), base_url=weather_stub.url)
+
+    async def two_cells():
+        await asyncio.gather(service.aget_current_weather(9.03, 38.74), service.aget_current_weather(7.05, 38.47))
+        clients = len(service._async_clients)
+        client = service._async_client()
+        await service.aclose()
+        return clients, client
+
+    clients, client = asyncio.run(two_cells())
+    assert weather_stub.request_count == 2
+    assert clients == 1 and client.is_closed
+
+    # Sync callers go through run_sync, which reuses one loop and so one client.
+    from ethio_agri_advisor.core.async_utils import run_sync
+    run_sync(service.aget_current_weather(8.55, 39.27))
+    run_sync(service.aget_current_weather(11.59, 37.39))
+    assert weather_stub.request_count == 4 and len(service._async_clients) == 1
+
+def test_planner_fans_out_search_and_weather(weather_stub):
+    """Test that planning latency is max(search, weather) rather than the sum."""
+    import asyncio
+    import time
+    from unittest.mock import patch
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from ethio_agri_advisor.agents.crop_planner import CropWeatherPlannerAgent
+    from ethio_agri_advisor.core.cache import MemoryCache
+    from ethio_agri_advisor.core.weather_service import WeatherService
+
+    class SlowSearch:
+        async def asearch_agri_data(self, query, region=None):
+            await asyncio.sleep(0.3)
+            return "Source: local\nContent: Use early-maturing teff varieties."
+
+    weather_stub.delay = 0.3
+    with patch("ethio_agri_advisor.config.settings.GOOGLE_API_KEY", "test-key"), \
+         patch("ethio_agri_advisor.config.settings.TAVILY_API_KEY", "test-key"):
+        planner = CropWeatherPlannerAgent()
+    planner.llm = FakeListChatModel(responses=["Plant early-maturing teff."])
+    planner.search_tool = SlowSearch()
+    planner.weather_service = WeatherService(cache=MemoryCache(), base_url=weather_stub.url)
+
+    features = {"crop_type": "teff", "region": "Amhara", "soil_ph": 6.0}
+    start = time.perf_counter()
+    result = planner.plan("Teff farm", {"yield_improvement_potential": 0.1}, features)
+    elapsed = time.perf_counter() - start
+    assert result == "Plant early-maturing teff."
+    assert elapsed < 0.55
+    assert weather_stub.request_count == 1
+
+def test_translation_latency_flat_and_isolated():
+    """Test that languages are translated concurrently and one failure keeps the others."""
+    import time
+    from langchain_core.language_models.chat_models import SimpleChatModel
+    from ethio_agri_advisor.tools.translator import MultilingualTranslatorTool
+
+    class SleepyChatModel(SimpleChatModel):
+        @property
+        def _llm_type(self):
+            return "sleepy-fake"
+
+        def _call(self, messages, *args, **kwargs):
+            time.sleep(0.2)
+            if "Somali" in messages[0].content:
+                raise RuntimeError("provider error")
+            return "translated"
+
+    tool = MultilingualTranslatorTool(llm=SleepyChatModel(), max_concurrency=8)
+
+    start = time.perf_counter()
+    two = tool.translate("Plant teff early.", ["Amharic", "Afaan Oromoo"])
+    two_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    four = tool.translate("Plant teff early.", ["Amharic", "Afaan Oromoo", "Tigrinya", "Somali"])
+    four_elapsed = time.perf_counter() - start
+
+    assert two == {"Amharic": "translated", "Afaan Oromoo": "translated"}
+    assert four["Tigrinya"] == "translated"
+    assert "unavailable" in four["Somali"]
+    assert four_elapsed < two_elapsed + 0.15
+
+def test_llm_cache_is_content_addressed():
+    """Test that identical prompts hit the shared LLM cache and opt-out bypasses it."""
+    from langchain_core.language_models.chat_models import SimpleChatModel
+    from ethio_agri_advisor.core.cache import MemoryCache
+    from ethio_agri_advisor.core.llm_cache import LLMResponseCache
+
+    class CountingChatModel(SimpleChatModel):
+        calls: int = 0
+
+        @property
+        def _llm_type(self):
+            return "counting-fake"
+
+        def _call(self, messages, *args, **kwargs):
+            self.calls += 1
+            return f"audit of: {messages[0].content}"
+
+    cache = LLMResponseCache(MemoryCache(max_entries=8))
+    cached_llm = CountingChatModel(cache=cache)
+    assert cached_llm.invoke("approve plan A").content == cached_llm.invoke("approve plan A").content
+    cached_llm.invoke("approve plan B")
+    assert cached_llm.calls == 2
+    assert cache.stats()["hits"] == 1
+
+    opted_out = CountingChatModel(cache=False)
+    opted_out.invoke("approve plan A")
+    opted_out.invoke("approve plan A")
+    assert opted_out.calls == 2
+
+    # Misses whose call never completes do not pile up.
+    cache.MAX_PENDING_MISSES = 4
+    for i in range(10):
+        cache.lookup(f"failed prompt {i}", "counting-fake")
+    assert len(cache._miss_started) == 4
+
+def test_model_registry_shares_clients_and_limits_concurrency():
+    """Test that agents share one client per model and respect the global concurrency cap."""
+    from concurrent.futures import ThreadPoolExecutor
+    from ethio_agri_advisor.core.llm_registry import ModelRegistry
+
+    registry = ModelRegistry(max_concurrency=2, requests_per_second=0)
+    first = registry.get("fake-model", use_cache=False)
+    assert registry.get("fake-model", use_cache=False) is first
+    assert registry.get("fake-model", use_cache=True).inner is first.inner
+    first.inner.latency_seconds = 0.05
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        replies = list(pool.map(lambda i: first.invoke(f"plan {i}").content, range(8)))
+    assert all(reply.startswith("Approve") for reply in replies)
+    assert registry.stats()["peak_in_flight"] == 2
+    assert registry.stats()["clients"] == 1
+
+def test_streamed_plans_use_llm_cache_and_release_slots():
+    """Test that streamed calls read and fill the LLM cache and free their slot when abandoned."""
+    import asyncio
+    from ethio_agri_advisor.core.cache import MemoryCache
+    from ethio_agri_advisor.core.llm_cache import LLMResponseCache
+    from ethio_agri_advisor.core.llm_registry import ModelRegistry, PooledChatModel
+
+    registry = ModelRegistry(max_concurrency=2, requests_per_second=0)
+    inner = registry.get("fake-model", use_cache=False).inner
+    cache = LLMResponseCache(MemoryCache(max_entries=8))
+    model = PooledChatModel(inner=inner, limiter=registry.limiter, model_name="fake-model", cache=cache)
+    streamed = "".join(chunk.content for chunk in model.stream("plan for teff in Arsi"))
+    assert streamed == inner.response and cache.stats()["size"] == 1
+    assert model.invoke("plan for teff in Arsi").content == streamed
+    assert "".join(chunk.content for chunk in model.stream("plan for teff in Arsi")) == streamed
+
+    async def astreamed():
+        return "".join([chunk.content async for chunk in model.astream("plan for teff in Arsi")])
+
+    assert asyncio.run(astreamed()) == streamed
+    assert cache.stats()["hits"] == 3 and registry.stats()["peak_in_flight"] == 1
+
+    abandoned = model.stream("plan for maize in Jimma")
+    next(abandoned)
+    assert registry.stats()["in_flight"] == 1
+    abandoned.close()
+    assert registry.stats()["in_flight"] == 0
+
+def test_run_batch_reports_failures_without_aborting(offline_graph):
+    """Test that a batch streams every farm's result and isolates per-item failures."""
+    process = offline_graph.local_analyzer.process
+
+    def flaky_process(raw_input):
+        if "FAIL" in raw_input:
+            raise ValueError("unparseable input")
+        return process(raw_input)
+
+    offline_graph.local_analyzer.process = flaky_process
+    inputs = [f"Farmer {i} in East Gojjam plants teff." for i in range(5)] + ["FAIL"]
+    streamed = []
+    results = offline_graph.run_batch(inputs, max_concurrency=3, on_result=streamed.append)
+
+    assert len(streamed) == len(inputs)
+    assert [r["index"] for r in results] == list(range(len(inputs)))
+    assert all(r["ok"] for r in results[:5])
+    assert results[0]["state"]["final_report"]["status"] == "Finalized"
+    assert not results[5]["ok"] and "unparseable input" in results[5]["error"]
+
+def test_graph_builds_agents_lazily():
+    """Test that constructing the graph does not build agents, LLM clients or tools."""
+    graph = AgriAdvisorGraph()
+    for agent in ["local_analyzer", "federated_collaborator", "crop_planner", "privacy_auditor", "synthesizer"]:
+        assert agent not in vars(graph)
+    planner = graph.crop_planner
+    assert "crop_planner" in vars(graph)
+    assert "llm" not in vars(planner) and "search_tool" not in vars(planner)
+
+    # Concurrent first uses build the agent once.
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        auditors = list(pool.map(lambda _: graph.privacy_auditor, range(8)))
+    assert all(auditor is auditors[0] for auditor in auditors)
+
+def test_pii_scanner_single_pass_spans():
+    """Test that the compiled scanner labels keys and structured PII with span offsets."""
+    from ethio_agri_advisor.tools.privacy_audit import PIIScanner, PrivacyAuditTool
+
+    text = ("Name: Abebe, phone +251911223344, email abebe.k@example.et, "
+            "FIN 1234 5678 9012, farm at 10.3292, 37.8742.")
+    result = PrivacyAuditTool().audit_content(text)
+    assert result["detected_leaks"] == ["name", "phone", "exact_coordinates", "ethiopian_phone", "email", "national_id"]
+    for span in result["spans"]:
+        assert span["end"] > span["start"]
+    phone = next(s for s in result["spans"] if s["label"] == "ethiopian_phone")
+    assert text[phone["start"]:phone["end"]] == "+251911223344"
+
+    scanner = PIIScanner()
+    scanner.add_pattern("kebele_id", r"KB-\d{6}", first_chars="K")
+    assert scanner.scan("Registered as KB-123456.") == [("kebele_id", 14, 23)]
+    assert PrivacyAuditTool().audit_content("Plant teff before the Kiremt rains.")["is_safe"]
+
+def test_streaming_redaction_across_chunks():
+    """Test that streamed redaction matches whole-text redaction for any chunking."""
+    import random
+    from ethio_agri_advisor.tools.privacy_audit import StreamingRedactor, get_scanner
+
+    text = "Call Abebe on +251911223344; the plot at 10.3292, 37.8742 floods. Email a.b@example.et. " * 3
+    rng = random.Random(0)
+    for _ in range(50):
+        redactor = StreamingRedactor(lookback=64)
+        out, i = [], 0
+        while i < len(text):
+            n = rng.randint(1, 9)
+            out.append(redactor.feed(text[i:i + n]))
+            i += n
+        out.append(redactor.flush())
+        assert "".join(out) == get_scanner().redact(text)
+    assert redactor.redactions == 9
+
+def test_graph_masks_leaky_plan_instead_of_refining(offline_graph):
+    """Test that an in-stream redaction lets a leaky plan pass audit without a refine loop."""
+    from ethio_agri_advisor.core.llm_registry import LocalFakeChatModel
+
+    offline_graph.crop_planner.llm = LocalFakeChatModel(
+        response="Approve. Sow teff early and call the extension officer on +251911223344."
+    )
+    state = offline_graph.app.invoke(offline_graph.initial_state("Teff farmer in East Gojjam."))
+    assert "+251911223344" not in state["recommendation"]
+    assert state["iteration_count"] == 1
+    assert state["refine_loops_avoided"] == 1
+    assert state["final_report"]["status"] == "Finalized"